@@ -0,0 +1,481 @@
+# This Python file uses the following encoding: utf-8
+"""asyncio download core running on its own loop thread.
+
+The Qt event loop stays in the GUI thread; all network I/O happens on one
+``LoopThread`` whose asyncio loop multiplexes every transfer, so hundreds of
+downloads cost sockets, not threads.  Results cross back to Qt through
+``concurrent.futures.Future`` objects and queued signals (see ``bridge.py``).
+
+Only the I/O lives here.  Piece planning, the resume journal and response
+checks come from ``downloader.Transfer``, the job queue from
+``scheduler.JobQueue`` and store lookups from ``ContentStore``.  Anything
+that touches the disk (chunk writes, journal flushes, hashing, which may
+read earlier bytes back, and store lookups) runs in the loop's default
+executor, so one slow disk operation does not stall every other transfer.
+"""
+import asyncio
+import http.client
+import os
+import ssl
+import threading
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urljoin, urlsplit
+
+from cache import ContentStore
+from downloader import (DOWNLOAD_CHUNK_SIZE, MAX_REDIRECTS, USER_AGENT, ConnectionPool,
+                        DownloadError, RemoteChanged, RemoteFile, SourceMismatch, Transfer,
+                        digest_names, finish_download, restart_download, write_chunk)
+from hashing import Hashes, OrderedHasher
+from multisource import Piece
+from scheduler import CANCELLED, DONE, FAILED, Job, JobQueue
+
+
+class LoopThread:
+    """An asyncio event loop running in a daemon thread."""
+
+    def __init__(self, name: str = "asyncio"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the loop; returns a ``concurrent.futures.Future``."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, callback, *args):
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def stop(self):
+        """Cancel every task still on the loop, let them unwind, then close the loop."""
+        if self.loop.is_running():
+            self.submit(self._cancel_all()).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+        self.loop.close()
+
+    async def _cancel_all(self):
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Writes handed to the executor finish before the loop goes away.
+        await self.loop.shutdown_default_executor()
+
+
+class _Response:
+    def __init__(self, conn: "_Connection", status: int, headers: dict[str, str]):
+        self.conn = conn
+        self.status = status
+        self.headers = headers
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        length = headers.get("content-length")
+        self._remaining = int(length) if length and length.isdigit() else None
+        self._chunk_left = 0
+        self._eof = False
+        if headers.get("connection", "").lower() == "close" or (
+                self._remaining is None and not self._chunked):
+            conn.reusable = False
+
+    def header(self, name: str) -> str | None:
+        return self.headers.get(name.lower())
+
+    async def _read_raw(self, size: int) -> bytes:
+        return await asyncio.wait_for(self.conn.reader.read(size), self.conn.timeout)
+
+    async def read(self, size: int) -> bytes:
+        """Up to ``size`` bytes of body; ``b""`` at the end."""
+        if self._eof:
+            return b""
+        if self._chunked:
+            if not self._chunk_left:
+                line = await asyncio.wait_for(self.conn.reader.readline(), self.conn.timeout)
+                try:
+                    self._chunk_left = int(line.split(b";")[0].strip() or b"0", 16)
+                except ValueError:
+                    raise http.client.HTTPException(f"bad chunk size {line!r}") from None
+                if not self._chunk_left:
+                    while (await self.conn.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    self._eof = True
+                    return b""
+            data = await self._read_raw(min(size, self._chunk_left))
+            self._chunk_left -= len(data)
+            if not self._chunk_left:
+                await self.conn.reader.readexactly(2)
+        elif self._remaining is not None:
+            if not self._remaining:
+                self._eof = True
+                return b""
+            data = await self._read_raw(min(size, self._remaining))
+            self._remaining -= len(data)
+        else:
+            data = await self._read_raw(size)
+        if not data:
+            raise ConnectionError("connection closed before the body ended")
+        return data
+
+    @property
+    def complete(self) -> bool:
+        return self._eof or self._remaining == 0
+
+    async def drain(self):
+        while await self.read(DOWNLOAD_CHUNK_SIZE):
+            pass
+
+
+class _Connection:
+    def __init__(self, reader, writer, host: str, timeout: float):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.timeout = timeout
+        self.reusable = True
+
+    async def request(self, method: str, url: str, headers: dict) -> _Response:
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {parts.netloc}", f"User-Agent: {USER_AGENT}"]
+        lines += [f"{key}: {value}" for key, value in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await self.writer.drain()
+        status_line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+        if not status_line:
+            raise ConnectionError("connection closed before the response")
+        try:
+            status = int(status_line.split()[1])
+        except (IndexError, ValueError):
+            raise http.client.BadStatusLine(status_line.decode("latin-1")) from None
+        response_headers = {}
+        while True:
+            line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+        return _Response(self, status, response_headers)
+
+    def close(self):
+        self.reusable = False
+        self.writer.close()
+
+
+class AsyncConnectionPool:
+    """Keep-alive connections per host, capped like ``ConnectionPool``."""
+
+    def __init__(self, max_per_host: int = 8, timeout: float = 30):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle: dict[tuple, list[_Connection]] = {}
+        self._slots: dict[tuple, asyncio.Semaphore] = {}
+        self._ssl = None
+
+    async def _open(self, key: tuple) -> _Connection:
+        scheme, host, port = key
+        if scheme == "https" and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None),
+            self.timeout,
+        )
+        return _Connection(reader, writer, host, self.timeout)
+
+    @asynccontextmanager
+    async def connection(self, url: str):
+        """Borrow a connection; read the response to the end before leaving."""
+        key = ConnectionPool.key(url)
+        slot = self._slots.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with slot:
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else await self._open(key)
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            if conn.reusable:
+                self._idle.setdefault(key, []).append(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+
+
+# Transport and protocol failures only; anything else is a bug and must surface.
+_RETRYABLE = (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, http.client.HTTPException)
+
+
+class AsyncDownloader:
+    """Coroutine twin of ``SegmentedDownloader``."""
+
+    def __init__(self, pool: AsyncConnectionPool | None = None, segments: int = 8,
+                 chunk_size: int = DOWNLOAD_CHUNK_SIZE, retries: int = 3, limiter=None,
+                 mirrors=None, stall_timeout: float = 15):
+        self.pool = pool or AsyncConnectionPool(max_per_host=segments)
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.retries = retries
+        # A ``TokenBucket``; only its non-blocking ``reserve`` is used here.
+        self.limiter = limiter
+        self.mirrors = mirrors
+        self.stall_timeout = stall_timeout
+
+    async def probe(self, url: str) -> RemoteFile:
+        attempts = 0
+        redirects = 0
+        while True:
+            try:
+                async with self.pool.connection(url) as conn:
+                    response = await conn.request("GET", url, {"Range": "bytes=0-0"})
+                    if response.status in (301, 302, 303, 307, 308):
+                        await response.drain()
+                        redirects += 1
+                        if redirects > MAX_REDIRECTS:
+                            raise DownloadError(f"{url}: too many redirects")
+                        url = urljoin(url, response.header("Location"))
+                        continue
+                    if response.status not in (200, 206):
+                        await response.drain()
+                        raise DownloadError(f"{url}: HTTP {response.status}")
+                    content_range = response.header("Content-Range") or ""
+                    total = content_range.rsplit("/", 1)[-1]
+                    length = response.header("Content-Length") or ""
+                    size = int(total) if total.isdigit() else int(length) if length.isdigit() else None
+                    if response.status == 206:
+                        await response.drain()
+                    else:
+                        conn.close()
+                    return RemoteFile(url, size, response.status == 206,
+                                      response.header("ETag"), response.header("Last-Modified"))
+            except _RETRYABLE as exc:
+                # A reused keep-alive socket may have been closed by the server.
+                attempts += 1
+                if attempts > self.retries:
+                    raise DownloadError(f"{url}: {exc}") from exc
+
+    async def locate(self, url: str) -> tuple[RemoteFile, list[str]]:
+        """Same as ``SegmentedDownloader.locate``."""
+        sources = self.mirrors.candidates(url) if self.mirrors else [url]
+        error = None
+        for i, source in enumerate(sources):
+            try:
+                remote = await self.probe(source)
+            except DownloadError as exc:
+                error = exc
+                if self.mirrors:
+                    self.mirrors.report_failure(source)
+                continue
+            return remote, [remote.url] + sources[:i] + sources[i + 1:]
+        raise DownloadError(f"{url}: no mirror answered: {error}") from error
+
+    async def _throttle(self, amount: int):
+        if self.limiter:
+            wait = self.limiter.reserve(amount)
+            if wait:
+                await asyncio.sleep(wait)
+
+    async def _copy(self, response: _Response, fh, on_progress, hasher):
+        offset = 0
+        while chunk := await response.read(self.chunk_size):
+            await self._throttle(len(chunk))
+            await asyncio.to_thread(write_chunk, fh, offset, chunk, on_progress, None, hasher)
+            offset += len(chunk)
+
+    async def _fetch_piece(self, transfer: Transfer, url: str, fh, piece: Piece):
+        headers = transfer.headers(url, piece)
+        async with self.pool.connection(url) as conn:
+            conn.timeout = self.stall_timeout
+            response = await conn.request("GET", url, headers)
+            transfer.check(url, piece, headers, response.status, response.header("Content-Range"))
+            while (want := transfer.wanted(piece, self.chunk_size)) > 0:
+                chunk = await response.read(want)
+                if not chunk:
+                    raise ConnectionError("connection closed mid-piece")
+                await self._throttle(len(chunk))
+                await asyncio.to_thread(transfer.accept, fh, piece, chunk)
+            if not response.complete:
+                # The tail went to another connection; skip the rest of this body.
+                conn.close()
+
+    async def _connection_worker(self, transfer: Transfer, source: str):
+        planner = transfer.planner
+        failures = 0
+        try:
+            # One handle per connection: writes from several executor
+            # threads must not share a file position.
+            fh = await asyncio.to_thread(open, transfer.part, "r+b", buffering=0)
+            try:
+                while (piece := planner.take(source)) is not None:
+                    source = piece.source
+                    try:
+                        await self._fetch_piece(transfer, source, fh, piece)
+                        failures = 0
+                    except (*_RETRYABLE, SourceMismatch) as exc:
+                        failures = transfer.failed(source, exc, failures)
+                    finally:
+                        planner.release(piece)
+            finally:
+                fh.close()
+        except BaseException as exc:
+            planner.abort(exc)
+            raise
+
+    async def _fetch_segments(self, remote: RemoteFile, sources: list[str], part: str, on_progress,
+                              algorithms: list[str]) -> OrderedHasher | None:
+        transfer = await asyncio.to_thread(Transfer, remote, sources, part, on_progress, algorithms,
+                                           self.segments, self.retries, self.mirrors)
+        tasks = [asyncio.ensure_future(self._connection_worker(transfer, source))
+                 for source in transfer.connections]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            await asyncio.to_thread(transfer.journal.save)
+        return transfer.finish()
+
+    async def _fetch_whole(self, url: str, part: str, on_progress, hasher):
+        async with self.pool.connection(url) as conn:
+            response = await conn.request("GET", url, {})
+            if response.status != 200:
+                await response.drain()
+                raise DownloadError(f"{url}: HTTP {response.status}")
+            fh = await asyncio.to_thread(open, part, "wb", buffering=0)
+            try:
+                await self._copy(response, fh, on_progress, hasher)
+            finally:
+                fh.close()
+
+    async def download(self, url: str, dest: str | os.PathLike, on_progress=None,
+                       remote: RemoteFile | None = None, hashes: Hashes | None = None,
+                       algorithms=(), sources: list[str] | None = None) -> RemoteFile:
+        """Same contract as ``SegmentedDownloader.download``."""
+        dest = os.fspath(dest)
+        part = dest + ".part"
+        if remote is None:
+            remote, sources = await self.locate(url)
+        sources = sources or [remote.url]
+        names = digest_names(algorithms, hashes)
+        if not remote.accept_ranges or not remote.size:
+            hasher = OrderedHasher(names, part) if names else None
+            await self._fetch_whole(remote.url, part, on_progress, hasher)
+        else:
+            try:
+                hasher = await self._fetch_segments(remote, sources, part, on_progress, names)
+            except RemoteChanged:
+                await asyncio.to_thread(restart_download, part, on_progress)
+                remote, sources = await self.locate(url)
+                hasher = await self._fetch_segments(remote, sources, part, on_progress, names)
+        await asyncio.to_thread(finish_download, remote, part, dest, hasher, hashes)
+        return remote
+
+
+class AsyncScheduler(JobQueue):
+    """``DownloadScheduler`` on a ``LoopThread``: same jobs, no thread per job.
+
+    ``submit``, ``cancel``, ``jobs``, ``set_bandwidth`` and ``shutdown`` are
+    safe to call from any thread.  ``on_finished(job)`` runs on the loop
+    thread when a job ends.
+    """
+
+    def __init__(self, max_jobs: int = 4, bandwidth: float = 0, per_host: int = 8,
+                 segments: int = 8, store: ContentStore | None = None,
+                 loop_thread: LoopThread | None = None, on_finished=None, progress=None,
+                 mirrors=None):
+        super().__init__(bandwidth, progress)
+        self.max_jobs = max_jobs
+        self.store = store
+        self.on_finished = on_finished
+        self._own_loop = loop_thread is None
+        self.loop_thread = loop_thread or LoopThread()
+        self.pool = AsyncConnectionPool(max_per_host=per_host)
+        self.downloader = AsyncDownloader(self.pool, segments=segments, limiter=self.bucket,
+                                          mirrors=mirrors)
+        self._wakeup = asyncio.Event()
+        self._workers = self.loop_thread.submit(self._start())
+
+    async def _start(self):
+        return [asyncio.ensure_future(self._work()) for _ in range(self.max_jobs)]
+
+    def _wake(self):
+        self.loop_thread.call(self._wakeup.set)
+
+    async def _next(self) -> Job | None:
+        while True:
+            self._wakeup.clear()
+            with self._cond:
+                job = self._pop()
+                if job is not None:
+                    return job
+                if self._closed:
+                    self._wakeup.set()  # let the other workers see it too
+                    return None
+            await self._wakeup.wait()
+
+    async def _work(self):
+        while (job := await self._next()) is not None:
+            await self._run(job)
+
+    async def _run(self, job: Job):
+        job.started = time.monotonic()
+        try:
+            remote, sources = await self.downloader.locate(job.url)
+            job.size = remote.size
+            job.publish()
+            digest = await asyncio.to_thread(self.store.find, remote, job.hashes) if self.store else None
+            if digest:
+                # Without reflinks this is a full copy; it must not stall the loop.
+                await asyncio.to_thread(self.store.restore, digest, job.dest, remote, job.advance)
+                job.cached = True
+            else:
+                remote = await self.downloader.download(
+                    job.url, job.dest, on_progress=job.advance, remote=remote, hashes=job.hashes,
+                    algorithms=("sha256",) if self.store else (), sources=sources)
+                if self.store:
+                    await asyncio.to_thread(self.store.keep, job.dest, remote)
+            job.state = DONE
+        except asyncio.CancelledError:
+            job.state = CANCELLED
+            raise
+        except Exception as exc:
+            job.error = str(exc)
+            job.state = FAILED
+        finally:
+            job.finished = time.monotonic()
+            job.publish()
+        if self.on_finished:
+            self.on_finished(job)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop accepting jobs and end the worker tasks.
+
+        With ``wait``, queued jobs still run unless ``cancel_pending`` and
+        running ones finish.  Without it, queued jobs are dropped and running
+        transfers are cancelled and awaited, which saves their journals so
+        they resume next time.  Either way no task of this scheduler is
+        pending when this returns, so the loop may be closed.
+        """
+        self._close(cancel_pending or not wait)
+        workers = self._workers.result()
+
+        async def drain():
+            if not wait:
+                for worker in workers:
+                    worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            self.pool.close()
+
+        self.loop_thread.submit(drain()).result()
+        if self._own_loop:
+            self.loop_thread.stop()
@@ -0,0 +1,349 @@
+# This Python file uses the following encoding: utf-8
+"""QObjects that expose the catalog, the download machinery and the pip service to QML."""
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict
+from typing import Sequence
+
+from PySide6.QtCore import (Property, QAbstractListModel, QByteArray, QModelIndex, QObject,
+                            QStandardPaths, Qt, QTimer, Signal, Slot)
+
+from aio import AsyncScheduler, LoopThread
+from cache import ContentStore
+from catalog import CatalogEntry
+from hashing import load_manifest
+from indexcache import IndexCache
+from mirrors import MirrorRegistry
+from pipservice import PipService
+from progress import FINISHED, ProgressAggregator, RateEstimator
+from resolvecache import ResolutionCache
+from search import SearchIndex, SearchResults, SearchSession
+
+FRAME_INTERVAL = 16  # ms, about 60 updates per second
+
+
+class ProgressModel(QAbstractListModel):
+    """One row per download job, refreshed from a ``ProgressAggregator`` once per frame.
+
+    Every tick drains the aggregator and emits a single ``dataChanged`` over
+    the rows that moved, so the scene graph sees one update per frame no
+    matter how many jobs or chunks are in flight.  Rows are keyed by job id,
+    and only running rows are resampled, so finished jobs cost nothing.
+    """
+
+    NameRole = Qt.UserRole + 1
+    DoneRole = Qt.UserRole + 2
+    TotalRole = Qt.UserRole + 3
+    StateRole = Qt.UserRole + 4
+    ErrorRole = Qt.UserRole + 5
+    RateRole = Qt.UserRole + 6
+    EtaRole = Qt.UserRole + 7
+
+    _FIELDS = {NameRole: "name", DoneRole: "done", TotalRole: "total", StateRole: "state",
+               ErrorRole: "error", RateRole: "rate", EtaRole: "eta"}
+
+    def __init__(self, aggregator: ProgressAggregator, parent=None):
+        super().__init__(parent)
+        self._aggregator = aggregator
+        self._rows: list[dict] = []
+        self._index: dict[int, int] = {}  # job id -> row
+        self._active: set[int] = set()  # rows of running jobs
+        self._estimators: dict[int, RateEstimator] = {}
+        self._timer = QTimer(self)
+        self._timer.setInterval(FRAME_INTERVAL)
+        self._timer.timeout.connect(self._tick)
+
+    def roleNames(self):
+        return {role: QByteArray(name.encode()) for role, name in self._FIELDS.items()}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in self._FIELDS:
+            return None
+        return self._rows[index.row()][self._FIELDS[role]]
+
+    def start(self):
+        self._timer.start()
+
+    def _tick(self):
+        now = time.monotonic()
+        changed = self._aggregator.drain()
+        fresh = [(key, entry) for key, entry in changed if key not in self._index]
+        if fresh:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(fresh) - 1)
+            for key, entry in fresh:
+                self._index[key] = len(self._rows)
+                self._rows.append({**entry, "key": key, "rate": 0.0, "eta": -1.0})
+                self._estimators[key] = RateEstimator()
+            self.endInsertRows()
+        touched = set()
+        for key, entry in changed:
+            row = self._index[key]
+            self._rows[row].update(entry)
+            touched.add(row)
+            if entry["state"] == "running":
+                self._active.add(row)
+            else:
+                self._active.discard(row)
+            if entry["state"] in FINISHED:
+                self._estimators.pop(key, None)
+        for row in self._active:
+            # Rates are resampled even without new bytes so that stalls show.
+            values = self._rows[row]
+            estimator = self._estimators[values["key"]]
+            values["rate"] = estimator.sample(now, values["done"])
+            values["eta"] = estimator.eta(values["total"] - values["done"])
+            touched.add(row)
+        if touched:
+            self.dataChanged.emit(self.index(min(touched)), self.index(max(touched)),
+                                  list(self._FIELDS))
+        elif not self._active:
+            self._timer.stop()
+
+
+class CatalogModel(QAbstractListModel):
+    """The catalog for QML, exposed ``FETCH_BATCH`` rows at a time.
+
+    ``rowCount`` only covers the rows fetched so far and the view calls
+    ``fetchMore`` as it scrolls towards the end, so opening a catalog of
+    hundreds of thousands of names builds neither all rows nor all
+    delegates.  ``data`` reads a row from the source when it is displayed;
+    ``setSource`` swaps in another catalog and ``setFilter`` narrows the
+    current one to search results as the user types.
+
+    Indexing a large catalog takes seconds, so the ``SearchIndex`` is built
+    on a worker thread as soon as a source is set; ``indexing`` is true until
+    it is ready, and a filter typed before that is applied when it is.
+    """
+
+    FETCH_BATCH = 200
+
+    NameRole = Qt.UserRole + 1
+    DescriptionRole = Qt.UserRole + 2
+    KindRole = Qt.UserRole + 3
+    X64UrlRole = Qt.UserRole + 4
+    X86UrlRole = Qt.UserRole + 5
+
+    _FIELDS = {NameRole: "name", DescriptionRole: "description", KindRole: "kind",
+               X64UrlRole: "x64_url", X86UrlRole: "x86_url"}
+    _ROLE_NAMES = {NameRole: "name", DescriptionRole: "description", KindRole: "kind",
+                   X64UrlRole: "x64Url", X86UrlRole: "x86Url"}
+
+    countChanged = Signal()
+    indexingChanged = Signal()
+    _indexed = Signal(object, object)  # catalog, SearchIndex; emitted by the indexing thread
+
+    def __init__(self, source: Sequence[CatalogEntry] = (), parent=None):
+        super().__init__(parent)
+        self._source = source
+        self._fetched = 0
+        self._catalog = source
+        self._search: SearchSession | None = None
+        self._filter = ""
+        self._indexed.connect(self._on_indexed)
+        self._build_index()
+
+    def roleNames(self):
+        return {role: QByteArray(name.encode()) for role, name in self._ROLE_NAMES.items()}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._fetched
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._fetched < len(self._source)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._source) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._fetched:
+            return None
+        if role == Qt.DisplayRole:
+            role = self.NameRole
+        if role not in self._FIELDS:
+            return None
+        return getattr(self._source[index.row()], self._FIELDS[role])
+
+    def _show(self, source: Sequence[CatalogEntry]):
+        self.beginResetModel()
+        self._source = source
+        self._fetched = 0
+        self.endResetModel()
+        self.countChanged.emit()
+
+    def _build_index(self):
+        catalog = self._catalog
+        threading.Thread(target=lambda: self._indexed.emit(catalog, SearchIndex(catalog)),
+                         name="catalog-index", daemon=True).start()
+
+    def _on_indexed(self, catalog: Sequence[CatalogEntry], index: SearchIndex):
+        # Delivered queued, in the GUI thread.
+        if catalog is not self._catalog:
+            return  # superseded by setSource; that source has its own thread
+        self._search = SearchSession(index)
+        self.indexingChanged.emit()
+        if self._filter.strip():
+            self.setFilter(self._filter)
+
+    def setSource(self, source: Sequence[CatalogEntry]):
+        self._catalog = source
+        self._search = None
+        self.indexingChanged.emit()
+        self._show(source)
+        self._build_index()
+
+    @Slot(str)
+    def setFilter(self, text: str):
+        """Show the best search matches for ``text``, or everything if it is blank.
+
+        While the index is still being built the view stays as it is.
+        """
+        self._filter = text
+        if not text.strip():
+            self._show(self._catalog)
+        elif self._search is not None:
+            self._show(SearchResults(self._catalog, self._search.search(text)))
+
+    @Property(bool, notify=indexingChanged)
+    def indexing(self):
+        """Whether the search index for the current catalog is still being built."""
+        return self._search is None
+
+    @Property(int, notify=countChanged)
+    def count(self):
+        """Rows in the catalog, including those not fetched yet."""
+        return len(self._source)
+
+
+class DownloadQueue(QObject):
+    """QML front for the download scheduler.
+
+    Transfers run on the asyncio ``LoopThread``, never in the GUI thread.
+    ``model`` lists every job with name, done, total, state, error and the
+    smoothed rate and ETA; ``jobFinished`` is emitted from the loop thread
+    and delivered queued.  By default installers are kept in a content store
+    under the cache folder and fetched from all known mirrors at once,
+    with the fastest ones serving most of the bytes.  Installers listed in
+    ``installers.sha256`` there must match their checksums.
+    """
+
+    jobFinished = Signal(str, str, str)  # dest, state, error
+
+    def __init__(self, loop_thread: LoopThread, scheduler: AsyncScheduler | None = None, parent=None):
+        super().__init__(parent)
+        self._progress = ProgressAggregator()
+        if scheduler is None:
+            folder = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+            scheduler = AsyncScheduler(store=ContentStore(os.path.join(folder, "installers")),
+                                       loop_thread=loop_thread,
+                                       mirrors=MirrorRegistry(cache_path=os.path.join(folder, "mirrors.json")))
+            manifest = os.path.join(folder, "installers.sha256")
+            if os.path.exists(manifest):
+                scheduler.manifest = load_manifest(manifest)
+        scheduler.progress = self._progress
+        scheduler.on_finished = lambda job: self.jobFinished.emit(job.dest, job.state, job.error)
+        self._scheduler = scheduler
+        self._model = ProgressModel(self._progress, self)
+
+    @Property(QObject, constant=True)
+    def model(self):
+        return self._model
+
+    @Slot(str, int, result=str)
+    def enqueue(self, url: str, priority: int = 0) -> str:
+        """Queue ``url``; enqueuing a URL that is still downloading returns the same dest."""
+        folder = QStandardPaths.writableLocation(QStandardPaths.DownloadLocation)
+        base, ext = os.path.splitext(os.path.basename(url))
+        for n in itertools.count():
+            name = f"{base} ({n}){ext}" if n else base + ext
+            try:
+                job = self._scheduler.submit(url, os.path.join(folder, name), priority)
+                break
+            except ValueError:
+                continue  # another URL with the same file name is on its way there
+        self._model.start()
+        return job.dest
+
+    @Slot(float)
+    def setBandwidth(self, rate: float):
+        self._scheduler.set_bandwidth(rate)
+
+    def shutdown(self):
+        """Cancel every transfer and wait until their journals are saved."""
+        self._scheduler.shutdown(wait=False, cancel_pending=True)
+
+
+class PackageManager(QObject):
+    """QML front for ``PipService``.
+
+    Every slot returns a request id at once; the outcome arrives later
+    through ``finished`` with ``ok`` and either the result (lists and maps
+    of plain values) or the error message.  The default service keeps its
+    resolutions and index pages in the application's cache folder.
+    """
+
+    finished = Signal(int, bool, "QVariant")  # request id, ok, result or error
+
+    def __init__(self, service: PipService | None = None, parent=None):
+        super().__init__(parent)
+        if service is None:
+            folder = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+            os.makedirs(folder, exist_ok=True)
+            service = PipService(resolve_cache=ResolutionCache(
+                os.path.join(folder, "resolutions.sqlite3"), IndexCache(os.path.join(folder, "index.sqlite3"))))
+        self._service = service
+        self._requests: dict[int, Future] = {}
+        self._ids = itertools.count(1)
+
+    def _track(self, future: Future, convert) -> int:
+        request = next(self._ids)
+        self._requests[request] = future
+
+        def done(future: Future):
+            # Runs on the pip thread; the signal is delivered queued.
+            self._requests.pop(request, None)
+            if future.cancelled():
+                self.finished.emit(request, False, "cancelled")
+            elif future.exception() is not None:
+                self.finished.emit(request, False, str(future.exception()))
+            else:
+                self.finished.emit(request, True, convert(future.result()))
+
+        future.add_done_callback(done)
+        return request
+
+    @Slot(list, result=int)
+    def install(self, names: list) -> int:
+        return self._track(self._service.install(names),
+                           lambda installed: [f"{name}=={version}" for name, version in installed])
+
+    @Slot(result=int)
+    def listInstalled(self) -> int:
+        return self._track(self._service.list_installed(), lambda infos: [asdict(i) for i in infos])
+
+    @Slot(str, result=int)
+    def show(self, name: str) -> int:
+        return self._track(self._service.show(name), lambda info: asdict(info) if info else None)
+
+    @Slot(int, result=bool)
+    def cancel(self, request: int) -> bool:
+        future = self._requests.get(request)
+        return future is not None and self._service.cancel(future)
+
+    def shutdown(self):
+        # Let a running install stop at its next checkpoint rather than die
+        # with the daemon thread halfway through site-packages.
+        self._service.shutdown(wait=True, cancel_pending=True, cancel_current=True)
@@ -0,0 +1,221 @@
+# This Python file uses the following encoding: utf-8
+"""Content-addressed store for downloaded installers.
+
+Blobs live under ``blobs/<sha256[:2]>/<sha256>`` and an SQLite index maps
+``(url, validator, size)`` to a digest, where the validator is the ETag (or
+Last-Modified when the server sends no ETag) and the URL is the one the file
+was probed at.  Validators are per server, so a file fetched from one mirror
+is not found through another by them; a known sha256 finds it from anywhere.
+A repeated download of the same file is materialized from the store by
+reflink or, failing that, a copy.  Never a hardlink: the user may edit the
+download in place, and the blob must not change with it.  Least recently used
+blobs are evicted once the store grows past ``max_bytes``.
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from downloader import RemoteFile, SegmentedDownloader
+from hashing import Hashes, HashMismatch
+
+FICLONE = 0x40049409  # linux/fs.h
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            pass
+    os.remove(dst)
+    return False
+
+
+def clone_file(src: str, dst: str) -> str:
+    """Make ``dst`` a cheap copy of ``src``; returns the method that worked."""
+    tmp = f"{dst}.{threading.get_ident()}.tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    if _reflink(src, tmp):
+        method = "reflink"
+    else:
+        shutil.copyfile(src, tmp)
+        method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+class ContentStore:
+    """sha256-addressed blobs plus an index keyed by URL, validator and size."""
+
+    def __init__(self, root: str | os.PathLike, max_bytes: int = 10 * 1024 ** 3):
+        self.root = os.fspath(root)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(self.root, "blobs"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        with self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS sources (
+                    url TEXT NOT NULL, validator TEXT NOT NULL, size INTEGER NOT NULL,
+                    digest TEXT NOT NULL REFERENCES blobs(digest) ON DELETE CASCADE,
+                    PRIMARY KEY (url, validator, size));
+            """)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    @staticmethod
+    def _validator(remote: RemoteFile) -> str | None:
+        return remote.etag or remote.last_modified
+
+    def has(self, digest: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return row is not None and os.path.exists(self.blob_path(digest))
+
+    def lookup(self, url: str, validator: str, size: int) -> str | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM sources WHERE url = ? AND validator = ? AND size = ?",
+                (url, validator, size),
+            ).fetchone()
+        if row and os.path.exists(self.blob_path(row[0])):
+            return row[0]
+        return None
+
+    def add(self, path: str, url: str | None = None, validator: str | None = None,
+            digest: str | None = None) -> str:
+        """Store the file at ``path`` (left in place) and index it under ``url``."""
+        digest = digest or file_digest(path)
+        blob = self.blob_path(digest)
+        size = os.path.getsize(path)
+        if not os.path.exists(blob):
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            clone_file(path, blob)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO blobs VALUES (?, ?, ?) ON CONFLICT(digest) DO UPDATE SET last_used = excluded.last_used",
+                (digest, size, time.time()),
+            )
+            if url and validator:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)", (url, validator, size, digest)
+                )
+        self.evict()
+        return digest
+
+    def materialize(self, digest: str, dest: str | os.PathLike) -> str:
+        """Place blob ``digest`` at ``dest``; returns how it was done."""
+        method = clone_file(self.blob_path(digest), os.fspath(dest))
+        with self._lock, self._db:
+            self._db.execute("UPDATE blobs SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        return method
+
+    def total_size(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used blobs until the store fits ``max_bytes``."""
+        with self._lock:
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for digest, size in self._db.execute("SELECT digest, size FROM blobs ORDER BY last_used"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(digest)
+                total -= size
+            with self._db:
+                self._db.executemany("DELETE FROM blobs WHERE digest = ?", [(d,) for d in victims])
+        for digest in victims:
+            try:
+                os.remove(self.blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def verify(self, digest: str, hashes: Hashes | None) -> bool:
+        """Whether a stored blob satisfies ``hashes``, using its name when possible."""
+        if not hashes:
+            return True
+        if "sha256" in hashes.algorithms:
+            return hashes.is_hash_allowed("sha256", digest)
+        path = self.blob_path(digest)
+        hashers = {name: hashlib.new(name) for name in hashes.algorithms}
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                for hasher in hashers.values():
+                    hasher.update(chunk)
+        try:
+            hashes.check_against_hashers(path, hashers)
+            return True
+        except HashMismatch:
+            return False
+
+    def find(self, remote: RemoteFile, hashes: Hashes | None = None) -> str | None:
+        """Digest of a stored blob holding ``remote``'s file and satisfying ``hashes``."""
+        for digest in hashes.digests("sha256") if hashes else ():
+            if self.has(digest):
+                return digest
+        validator = self._validator(remote)
+        if not validator or not remote.size:
+            return None
+        digest = self.lookup(remote.url, validator, remote.size)
+        return digest if digest and self.verify(digest, hashes) else None
+
+    def restore(self, digest: str, dest: str | os.PathLike, remote: RemoteFile, on_progress=None):
+        """Materialize the blob ``find`` returned for ``remote`` as if it had been downloaded."""
+        self.materialize(digest, dest)
+        remote.digests = {"sha256": digest}
+        if on_progress:
+            on_progress(remote.size)
+
+    def keep(self, path: str | os.PathLike, remote: RemoteFile) -> str:
+        """Add a file just downloaded from ``remote`` (with its sha256 computed)."""
+        return self.add(os.fspath(path), remote.url, self._validator(remote), remote.digests["sha256"])
+
+    def fetch(self, downloader: SegmentedDownloader, url: str, dest: str | os.PathLike,
+              on_progress=None, remote: RemoteFile | None = None,
+              hashes: Hashes | None = None,
+              sources: list[str] | None = None) -> tuple[RemoteFile, bool]:
+        """Download ``url`` to ``dest`` unless the store already has it.
+
+        Returns the probed ``RemoteFile`` and whether it came from the store.
+        The sha256 used as the blob name is computed during the download.
+        """
+        if remote is None:
+            remote, sources = downloader.locate(url)
+        digest = self.find(remote, hashes)
+        if digest:
+            self.restore(digest, dest, remote, on_progress)
+            return remote, True
+        # A changed file is probed again, possibly at another mirror.
+        remote = downloader.download(url, dest, on_progress=on_progress, remote=remote,
+                                     hashes=hashes, algorithms=("sha256",), sources=sources)
+        self.keep(dest, remote)
+        return remote, False
+
+    def close(self):
+        with self._lock:
+            self._db.close()
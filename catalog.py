@@ -0,0 +1,62 @@
+# This Python file uses the following encoding: utf-8
+"""The package and application catalog behind the library browser.
+
+A catalog is any sequence of ``CatalogEntry``; views only ever ask for its
+length and for single rows, so a source can build entries on demand.
+``Catalog`` keeps the names and descriptions in flat lists and creates the
+entry for a row when it is first read.
+"""
+from dataclasses import dataclass
+from typing import Sequence
+
+PIP = "pip"
+APP = "app"
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    name: str
+    description: str = ""
+    kind: str = PIP  # PIP or APP
+    x64_url: str = ""  # APP only; empty if there is no such build
+    x86_url: str = ""
+
+
+class Catalog(Sequence):
+    """Catalog rows stored column-wise; ``CatalogEntry`` objects are built lazily."""
+
+    def __init__(self, names: list[str], descriptions: list[str] | None = None,
+                 kinds: list[str] | None = None, urls: list[tuple[str, str]] | None = None):
+        self._names = names
+        self._descriptions = descriptions
+        self._kinds = kinds
+        self._urls = urls
+
+    @classmethod
+    def from_mappings(cls, pip_libraries: dict[str, str], app_list: dict[str, list] | None = None) -> "Catalog":
+        """Build from ``inf``-style dicts: ``name -> description`` and ``name -> [x64, x86]``."""
+        app_list = app_list or {}
+        names = list(pip_libraries) + list(app_list)
+        descriptions = list(pip_libraries.values()) + [""] * len(app_list)
+        kinds = [PIP] * len(pip_libraries) + [APP] * len(app_list)
+        urls = [("", "")] * len(pip_libraries) + [(x64 or "", x86 or "") for x64, x86 in app_list.values()]
+        return cls(names, descriptions, kinds, urls)
+
+    @classmethod
+    def from_inf(cls) -> "Catalog":
+        """The curated catalog shipped in ``inf``."""
+        from inf import app_list, pip_libraries
+        return cls.from_mappings(pip_libraries, app_list)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __getitem__(self, row: int) -> CatalogEntry:
+        x64, x86 = self._urls[row] if self._urls else ("", "")
+        return CatalogEntry(self._names[row],
+                            self._descriptions[row] if self._descriptions else "",
+                            self._kinds[row] if self._kinds else PIP,
+                            x64, x86)
+
+    def names(self) -> Sequence[str]:
+        return self._names
@@ -0,0 +1,257 @@
+# This Python file uses the following encoding: utf-8
+"""Dependency tree and download size of a selection, without downloading it.
+
+Resolving ``transformers`` or ``tensorflow`` through pip downloads every
+wheel it picks, hundreds of MB, before anything can be shown.  The preview
+only reads each wheel's METADATA, from the PEP 658 ``.metadata`` file when
+the index serves one and otherwise with range requests through pip's
+``LazyZipOverHTTP``, and the wheel size from a ``HEAD`` request.  The tree
+is walked breadth first and every level is fetched in parallel.
+
+Metadata is parsed from a temporary directory of the preview's own rather
+than through pip's process-wide tempdir registry, so a preview can run
+while a ``BatchInstaller`` installs.  A wheel whose metadata cannot be read
+is shown without dependencies.
+
+The preview picks the best candidate for the first specifier that reaches a
+project, like a resolver that never has to backtrack; later specifiers that
+this version does not satisfy are reported as conflicts rather than
+resolved, so an actual install may choose other versions.
+"""
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from pip._internal.exceptions import HashMismatch, InvalidWheel, NetworkConnectionError, UnsupportedWheel
+from pip._internal.metadata import (BaseDistribution, MemoryWheel, get_directory_distribution,
+                                   get_wheel_distribution)
+from pip._internal.models.link import Link
+from pip._internal.network.lazy_wheel import HTTPRangeRequestUnsupported, LazyZipOverHTTP
+from pip._internal.network.utils import HEADERS, raise_for_status
+from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+from pip._vendor.packaging.specifiers import SpecifierSet
+from pip._vendor.packaging.utils import canonicalize_name
+from pip._vendor.requests.exceptions import RequestException
+
+from installed import InstalledDist, InstalledIndex
+from pipbatch import DOWNLOAD_JOBS, BatchInstaller
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PreviewNode:
+    name: str
+    version: str | None  # None if no candidate matches
+    filename: str | None = None
+    size: int | None = None  # of the wheel or sdist, from Content-Length
+    metadata_source: str | None = None  # "pep658", "lazy-wheel" or None for sdists
+    metadata_bytes: int = 0  # transferred to read the metadata
+    installed: str | None = None  # installed version, if any
+    requires: list[str] = field(default_factory=list)  # canonical names
+    conflicts: list[str] = field(default_factory=list)  # specifiers ``version`` does not satisfy
+
+    @property
+    def needs_download(self) -> bool:
+        return self.version is not None and self.installed != self.version
+
+
+@dataclass
+class DependencyPreview:
+    roots: list[str]
+    nodes: dict[str, PreviewNode]  # by canonical name
+
+    @property
+    def total_size(self) -> int:
+        return sum(node.size or 0 for node in self.nodes.values())
+
+    @property
+    def download_size(self) -> int:
+        """Bytes to download, leaving out what is installed in the same version."""
+        return sum(node.size or 0 for node in self.nodes.values() if node.needs_download)
+
+    @property
+    def metadata_bytes(self) -> int:
+        return sum(node.metadata_bytes for node in self.nodes.values())
+
+
+class PreviewBuilder:
+    """Builds ``DependencyPreview``s with the finder and session of a ``BatchInstaller``.
+
+    Index options and the target interpreter therefore match what the
+    installer would use.  Extras are followed; environment markers are
+    evaluated for the running interpreter.
+    """
+
+    def __init__(self, installer: BatchInstaller | None = None, installed: InstalledIndex | None = None,
+                 jobs: int = DOWNLOAD_JOBS):
+        self.installer = installer or BatchInstaller()
+        self.installed = installed or InstalledIndex()
+        self.jobs = jobs
+
+    def _size(self, link: Link) -> int | None:
+        try:
+            head = self.installer.session.head(link.url_without_fragment, headers=HEADERS,
+                                               allow_redirects=True)
+            raise_for_status(head)
+            return int(head.headers["Content-Length"])
+        except (RequestException, NetworkConnectionError, KeyError, ValueError):
+            return None
+
+    def _pep658(self, link: Link, workdir: str) -> tuple[BaseDistribution, int] | None:
+        metadata_link = link.metadata_link()
+        if metadata_link is None:
+            return None
+        try:
+            response = self.installer.session.get(metadata_link.url, headers=HEADERS)
+            raise_for_status(response)
+            hashes = metadata_link.as_hashes()
+            if hashes:  # as in pip, metadata served without a hash is taken as is
+                hashes.check_against_chunks([response.content])
+        except (RequestException, NetworkConnectionError, HashMismatch) as exc:
+            logger.info("no PEP 658 metadata for %s: %s", link.filename, exc)
+            return None
+        # What pip's ``get_metadata_distribution`` does, minus its global temp dir.
+        directory = os.path.join(workdir, link.filename)
+        os.mkdir(directory)
+        with open(os.path.join(directory, "METADATA"), "wb") as fh:
+            fh.write(response.content)
+        return get_directory_distribution(directory), len(response.content)
+
+    def _lazy_wheel(self, link: Link, name: str) -> tuple[BaseDistribution, int, int] | None:
+        try:
+            with LazyZipOverHTTP(link.url_without_fragment, self.installer.session) as zf:
+                dist = get_wheel_distribution(MemoryWheel(zf.name, zf), name)
+                fetched = sum(right - left + 1 for left, right in zip(zf._left, zf._right))
+                return dist, fetched, zf._length
+        except (HTTPRangeRequestUnsupported, RequestException, NetworkConnectionError) as exc:
+            logger.info("no range requests for %s: %s", link.filename, exc)
+            return None
+        except (InvalidWheel, UnsupportedWheel, zipfile.BadZipFile) as exc:
+            logger.warning("cannot read the metadata of %s: %s", link.filename, exc)
+            return None
+
+    def _fetch(self, name: str, specifier: SpecifierSet, workdir: str,
+               installed: dict[str, InstalledDist]) -> tuple[PreviewNode, BaseDistribution | None]:
+        candidate = self.installer.finder.find_best_candidate(name, specifier).best_candidate
+        dist = installed.get(canonicalize_name(name))
+        node = PreviewNode(name, None, installed=dist.version if dist else None)
+        if candidate is None:
+            return node, None
+        link = candidate.link
+        node.name, node.version, node.filename = candidate.name, str(candidate.version), link.filename
+        if not link.is_wheel:
+            node.size = self._size(link)
+            return node, None  # an sdist's metadata needs a build
+        dist, size = None, None
+        found = self._pep658(link, workdir)
+        if found:
+            dist, node.metadata_bytes = found
+            node.metadata_source = "pep658"
+        elif found := self._lazy_wheel(link, name):
+            dist, node.metadata_bytes, size = found
+            node.metadata_source = "lazy-wheel"
+        node.size = size if size is not None else self._size(link)
+        return node, dist
+
+    def preview(self, names: Sequence[str]) -> DependencyPreview:
+        """The dependency tree of ``names`` (requirement strings) with sizes."""
+        self.installer.open()
+        installed = self.installed.snapshot()  # one rescan for the whole tree
+        nodes: dict[str, PreviewNode] = {}
+        specifiers: dict[str, list[SpecifierSet]] = {}
+        level: list[tuple[str | None, Requirement]] = []
+        for name in names:
+            try:
+                level.append((None, Requirement(name)))
+            except InvalidRequirement:
+                logger.warning("skipping invalid requirement %r", name)
+        roots = [canonicalize_name(req.name) for _, req in level]
+        dists: dict[str, BaseDistribution | None] = {}
+        extras: dict[str, set[str]] = {}
+        followed: dict[str, set[str]] = {}  # requirement strings already queued, per project
+
+        def follow(key: str, more: set[str]) -> list[tuple[str, Requirement]]:
+            # Dependencies of ``key`` with ``more`` extras that were not queued yet.
+            extras[key] |= more
+            dist = dists[key]
+            requires = dist.iter_dependencies(sorted(extras[key])) if dist else ()
+            new = [req for req in requires if str(req) not in followed[key]]
+            followed[key].update(str(req) for req in new)
+            return [(key, req) for req in new]
+
+        with ExitStack() as stack:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="depspreview-"))
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.jobs))
+            while level:
+                # Merge what this level asks of each new project; one fetch each.
+                # Projects fetched before only have new extras expanded.
+                wanted: dict[str, tuple[SpecifierSet, set[str]]] = {}
+                expand: dict[str, set[str]] = {}
+                for parent, req in level:
+                    key = canonicalize_name(req.name)
+                    specifiers.setdefault(key, []).append(req.specifier)
+                    if parent is not None and key not in nodes[parent].requires:
+                        nodes[parent].requires.append(key)
+                    if key in nodes:
+                        if not set(req.extras) <= extras[key]:
+                            expand.setdefault(key, set()).update(req.extras)
+                    else:
+                        specifier, wanted_extras = wanted.setdefault(key, (SpecifierSet(), set()))
+                        wanted[key] = (specifier & req.specifier, wanted_extras | set(req.extras))
+                fetched = executor.map(lambda item: self._fetch(item[0], item[1][0], workdir, installed),
+                                       wanted.items())
+                level = []
+                for key, (node, dist) in zip(wanted, fetched):
+                    nodes[key], dists[key], extras[key], followed[key] = node, dist, set(), set()
+                    level += follow(key, wanted[key][1])
+                for key, more in expand.items():
+                    level += follow(key, more)
+
+        for key, node in nodes.items():
+            if node.version is not None:
+                node.conflicts = [str(s) for s in specifiers[key]
+                                  if not s.contains(node.version, prereleases=True)]
+        return DependencyPreview(roots, nodes)
+
+
+def _format_size(size: int | None) -> str:
+    if size is None:
+        return "?"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_tree(preview: DependencyPreview) -> str:
+    """An indented tree; projects already shown are marked ``(*)`` and not expanded."""
+    lines, shown = [], set()
+
+    def walk(key: str, depth: int):
+        node = preview.nodes[key]
+        note = f"{node.version or 'no matching version'}, {_format_size(node.size)}"
+        if node.installed == node.version:
+            note += ", installed"
+        if node.conflicts:
+            note += ", conflicts with " + ", ".join(node.conflicts)
+        if key in shown:
+            lines.append(f"{'  ' * depth}{node.name} (*)")
+            return
+        shown.add(key)
+        lines.append(f"{'  ' * depth}{node.name} ({note})")
+        for child in node.requires:
+            walk(child, depth + 1)
+
+    for root in preview.roots:
+        walk(root, 0)
+    lines.append(f"{len(preview.nodes)} packages, {_format_size(preview.total_size)} in total, "
+                 f"{_format_size(preview.download_size)} to download; "
+                 f"read {_format_size(preview.metadata_bytes)} of metadata")
+    return "\n".join(lines)
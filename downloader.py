@@ -0,0 +1,493 @@
+# This Python file uses the following encoding: utf-8
+"""Segmented HTTP downloader for the installers listed in ``app_list``.
+
+A file is split into ``Range`` segments that are fetched concurrently over a
+shared keep-alive connection pool and written straight into a preallocated
+``.part`` file, which is renamed into place once every segment is done.
+Progress is journaled next to the ``.part`` file so an interrupted download
+only fetches the missing bytes on the next attempt, and digests are computed
+from the chunks as they arrive.  Given a ``MirrorRegistry``, connections are
+spread over every working mirror at once and pieces move from slow or failing
+mirrors to fast ones (see ``multisource``).
+"""
+import http.client
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from urllib.parse import urljoin, urlsplit
+
+from hashing import Hashes, OrderedHasher
+from journal import DownloadJournal
+from multisource import Piece, SegmentPlanner
+
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+USER_AGENT = "DEV-Toolbox"
+MAX_REDIRECTS = 5
+
+
+class DownloadError(Exception):
+    """Raised when a file cannot be fetched."""
+
+
+class RemoteChanged(DownloadError):
+    """The file on the server no longer matches the partial download."""
+
+
+class SourceMismatch(DownloadError):
+    """A mirror answered, but not with the bytes of the file being fetched."""
+
+
+@dataclass
+class RemoteFile:
+    url: str
+    size: int | None
+    accept_ranges: bool
+    etag: str | None = None
+    last_modified: str | None = None
+    digests: dict[str, str] = field(default_factory=dict)  # filled in after download
+
+
+@dataclass
+class Segment:
+    start: int
+    end: int  # inclusive, like the Range header
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+
+def split_segments(size: int, count: int, min_size: int = MIN_SEGMENT_SIZE) -> list[Segment]:
+    """Split ``size`` bytes into at most ``count`` contiguous segments."""
+    if size <= 0:
+        return []
+    count = max(1, min(count, size // min_size or 1))
+    step = -(-size // count)
+    return [Segment(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def split_gaps(gaps: list[tuple[int, int]], count: int,
+               min_size: int = MIN_SEGMENT_SIZE) -> list[Segment]:
+    """Spread ``count`` segments over the missing ranges of a resumed file."""
+    total = sum(end - start + 1 for start, end in gaps)
+    segments = []
+    for start, end in gaps:
+        share = max(1, round(count * (end - start + 1) / total))
+        segments += [Segment(s.start + start, s.end + start)
+                     for s in split_segments(end - start + 1, share, min_size)]
+    return segments
+
+
+class ConnectionPool:
+    """Keep-alive connections shared by every worker, capped per host."""
+
+    def __init__(self, max_per_host: int = 8, timeout: float = 30):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle: dict[tuple, list[http.client.HTTPConnection]] = {}
+        self._slots: dict[tuple, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> tuple:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        return parts.scheme, parts.hostname, port
+
+    def _slot(self, key: tuple) -> threading.BoundedSemaphore:
+        with self._lock:
+            if key not in self._slots:
+                self._slots[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._slots[key]
+
+    def _new(self, key: tuple) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(host, port, timeout=self.timeout)
+
+    @contextmanager
+    def connection(self, url: str):
+        """Borrow a connection for ``url``.
+
+        The caller must read the response to the end before leaving the block,
+        otherwise the connection cannot be reused; on error it is discarded.
+        """
+        key = self.key(url)
+        slot = self._slot(key)
+        slot.acquire()
+        try:
+            with self._lock:
+                idle = self._idle.get(key)
+                conn = idle.pop() if idle else None
+            if conn is None:
+                conn = self._new(key)
+            try:
+                yield conn
+            except BaseException:
+                conn.close()
+                raise
+            with self._lock:
+                self._idle.setdefault(key, []).append(conn)
+        finally:
+            slot.release()
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+def request_path(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+def content_range(value: str | None) -> tuple[int, int, int | None] | None:
+    """Parse ``bytes <start>-<end>/<total>``; ``None`` if malformed."""
+    match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", (value or "").strip())
+    if not match:
+        return None
+    start, end, total = match.groups()
+    return int(start), int(end), None if total == "*" else int(total)
+
+
+def _total_size(response: http.client.HTTPResponse) -> int | None:
+    content_range = response.getheader("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.getheader("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def write_chunk(fh, offset: int, chunk: bytes, on_progress, journal=None, hasher=None):
+    """Write ``chunk`` at ``offset``, then record it in the journal, hasher and progress.
+
+    Blocking; the hasher may read earlier bytes back from the file.
+    """
+    fh.seek(offset)
+    view = memoryview(chunk)
+    while view:
+        view = view[fh.write(view):]
+    if journal:
+        journal.add(offset, offset + len(chunk) - 1)
+    if hasher:
+        hasher.update(offset, chunk)
+    if on_progress:
+        on_progress(len(chunk))
+
+
+def open_journal(remote: RemoteFile, part: str) -> DownloadJournal:
+    """Reuse a journal matching ``remote``, or start the ``.part`` file afresh."""
+    path = part + ".json"
+    journal = DownloadJournal.load(path)
+    if journal and os.path.exists(part) and journal.matches(remote):
+        return journal
+    journal = DownloadJournal(path, remote.url, remote.size, remote.etag, remote.last_modified)
+    with open(part, "wb") as fh:
+        fh.truncate(remote.size)
+    journal.save()
+    return journal
+
+
+def restart_download(part: str, on_progress):
+    """Drop the journal of ``part`` before starting over, reporting its bytes as undone."""
+    journal = DownloadJournal.load(part + ".json")
+    if journal is None:
+        return
+    if on_progress and journal.completed:
+        on_progress(-journal.completed)
+    journal.remove()
+
+
+def finish_download(remote: RemoteFile, part: str, dest: str, hasher: OrderedHasher | None,
+                    hashes: Hashes | None):
+    """Check a complete ``.part`` file against ``hashes`` and move it to ``dest``.
+
+    Blocking: the hasher may still have to read the tail of the file.
+    """
+    try:
+        os.remove(part + ".json")
+    except FileNotFoundError:
+        pass
+    if hasher:
+        hashers = hasher.finish()
+        remote.digests = hasher.hexdigests()
+        if hashes:
+            try:
+                hashes.check_against_hashers(dest, hashers)
+            except Exception:
+                os.remove(part)
+                raise
+    os.replace(part, dest)
+
+
+def digest_names(algorithms, hashes: Hashes | None) -> list[str]:
+    return sorted(set(algorithms) | set(hashes.algorithms if hashes else ()))
+
+
+class Transfer:
+    """Everything about one ranged download except the I/O.
+
+    Holds the journal, the streaming hasher and the ``SegmentPlanner``, and
+    decides what a piece request looks like, whether a response answers it
+    and what a failed piece means for its source.  ``SegmentedDownloader``
+    drives it from threads and ``aio.AsyncDownloader`` from coroutines.
+    Construction and ``accept`` touch the disk.
+    """
+
+    def __init__(self, remote: RemoteFile, sources: list[str], part: str, on_progress=None,
+                 algorithms=(), segments: int = 8, retries: int = 3, mirrors=None):
+        self.remote = remote
+        self.part = part
+        self.on_progress = on_progress
+        self.retries = retries
+        self.mirrors = mirrors
+        self.journal = open_journal(remote, part)
+        self.hasher = OrderedHasher(algorithms, part, remote.size) if algorithms else None
+        if self.hasher:
+            # Bytes from an earlier run are hashed from the file when reached.
+            self.hasher.mark_written(self.journal.done)
+        if on_progress and self.journal.completed:
+            on_progress(self.journal.completed)
+        gaps = split_gaps(self.journal.missing(), segments)
+        self.planner = SegmentPlanner([(g.start, g.end) for g in gaps], sources)
+        count = min(segments, max(len(gaps), len(sources))) if gaps else 0
+        # The source each connection starts on.
+        self.connections = [sources[i % len(sources)] for i in range(count)]
+
+    def headers(self, url: str, piece: Piece) -> dict:
+        headers = {"Range": f"bytes={piece.pos}-{piece.end}"}
+        # Validators are per server, so other mirrors are checked by size.
+        if url == self.journal.url and self.journal.validator:
+            headers["If-Range"] = self.journal.validator
+        return headers
+
+    def check(self, url: str, piece: Piece, headers: dict, status: int, served: str | None):
+        """Raise unless ``status`` and Content-Range ``served`` answer ``headers`` for ``piece``."""
+        if status == 200 and "If-Range" in headers:
+            raise RemoteChanged(f"{url}: changed on the server")
+        parsed = content_range(served)
+        if status != 206 or parsed is None or parsed[0] != piece.pos or parsed[2] != self.journal.size:
+            raise SourceMismatch(f"{url}: asked for {headers['Range']}, got {status} {served}")
+
+    def wanted(self, piece: Piece, chunk_size: int) -> int:
+        """How much to read next for ``piece``; 0 once it is done or stolen."""
+        return min(chunk_size, self.planner.remaining(piece))
+
+    def accept(self, fh, piece: Piece, chunk: bytes):
+        """Store bytes read for ``piece``, minus any tail stolen meanwhile."""
+        offset, count = self.planner.claim(piece, len(chunk))
+        if count:
+            write_chunk(fh, offset, chunk[:count], self.on_progress, self.journal, self.hasher)
+
+    def failed(self, source: str, error: Exception, failures: int) -> int:
+        """Account for a failed piece on a connection; returns its new failure count.
+
+        A mirror that stalled or served other bytes is reported, and one that
+        served other bytes or failed more than ``retries`` times in a row is
+        retired.
+        """
+        failures += 1
+        if self.mirrors and len(self.planner.sources) > 1 \
+                and isinstance(error, (TimeoutError, SourceMismatch)):
+            self.mirrors.report_failure(source)
+        if isinstance(error, SourceMismatch) or failures > self.retries:
+            self.planner.retire(source, error)
+            return 0
+        return failures
+
+    def finish(self) -> OrderedHasher | None:
+        """The hasher once every piece is in; raises ``DownloadError`` if bytes are missing."""
+        error = self.planner.unfinished()
+        if isinstance(error, DownloadError):
+            raise error
+        if error is not None:
+            raise DownloadError(f"{self.remote.url}: {error}") from error
+        return self.hasher
+
+
+class SegmentedDownloader:
+    """Fetch a file as concurrent byte-range segments."""
+
+    def __init__(self, pool: ConnectionPool | None = None, segments: int = 8,
+                 chunk_size: int = DOWNLOAD_CHUNK_SIZE, retries: int = 3, limiter=None,
+                 mirrors=None, stall_timeout: float = 15):
+        self.pool = pool or ConnectionPool(max_per_host=segments)
+        self.segments = segments
+        self.chunk_size = chunk_size
+        self.retries = retries
+        # Anything with ``consume(nbytes)`` that blocks to enforce a budget.
+        self.limiter = limiter
+        # A ``MirrorRegistry``; without one only the given URL is used.
+        self.mirrors = mirrors
+        # Seconds without a byte before a mirror counts as stalled.
+        self.stall_timeout = stall_timeout
+
+    def _request(self, conn, method: str, url: str, headers: dict) -> http.client.HTTPResponse:
+        headers = {"User-Agent": USER_AGENT, **headers}
+        conn.timeout = self.stall_timeout
+        if conn.sock:
+            conn.sock.settimeout(self.stall_timeout)
+        conn.request(method, request_path(url), headers=headers)
+        return conn.getresponse()
+
+    def probe(self, url: str) -> RemoteFile:
+        """Ask for the first byte to learn the size and whether ranges work."""
+        for _ in range(MAX_REDIRECTS + 1):
+            with self.pool.connection(url) as conn:
+                response = self._request(conn, "GET", url, {"Range": "bytes=0-0"})
+                if response.status in (301, 302, 303, 307, 308):
+                    response.read()
+                    url = urljoin(url, response.getheader("Location"))
+                    continue
+                if response.status not in (200, 206):
+                    response.read()
+                    raise DownloadError(f"{url}: HTTP {response.status}")
+                remote = RemoteFile(
+                    url=url,
+                    size=_total_size(response),
+                    accept_ranges=response.status == 206,
+                    etag=response.getheader("ETag"),
+                    last_modified=response.getheader("Last-Modified"),
+                )
+                if response.status == 206:
+                    response.read()
+                else:
+                    # A full body is on its way; drop the connection rather
+                    # than reading the whole file just to reuse the socket.
+                    conn.close()
+                return remote
+        raise DownloadError(f"{url}: too many redirects")
+
+    def locate(self, url: str) -> tuple[RemoteFile, list[str]]:
+        """Probe ``url``, or with a mirror registry its fastest working mirror.
+
+        Returns the probed file and every usable source, the probed one first.
+        """
+        sources = self.mirrors.candidates(url) if self.mirrors else [url]
+        error = None
+        for i, source in enumerate(sources):
+            try:
+                remote = self.probe(source)
+            except (DownloadError, OSError, http.client.HTTPException) as exc:
+                error = exc
+                if self.mirrors:
+                    self.mirrors.report_failure(source)
+                continue
+            return remote, [remote.url] + sources[:i] + sources[i + 1:]
+        raise DownloadError(f"{url}: no mirror answered: {error}") from error
+
+    def _copy(self, response, fh, on_progress, hasher=None):
+        offset = 0
+        while chunk := response.read(self.chunk_size):
+            if self.limiter:
+                self.limiter.consume(len(chunk))
+            write_chunk(fh, offset, chunk, on_progress, hasher=hasher)
+            offset += len(chunk)
+
+    def _fetch_piece(self, transfer: Transfer, url: str, fh, piece: Piece):
+        """Request the rest of ``piece``; stops early if its tail is stolen."""
+        headers = transfer.headers(url, piece)
+        with self.pool.connection(url) as conn:
+            response = self._request(conn, "GET", url, headers)
+            transfer.check(url, piece, headers, response.status, response.getheader("Content-Range"))
+            while (want := transfer.wanted(piece, self.chunk_size)) > 0:
+                chunk = response.read(want)
+                if not chunk:
+                    raise http.client.IncompleteRead(b"", want)
+                if self.limiter:
+                    self.limiter.consume(len(chunk))
+                transfer.accept(fh, piece, chunk)
+            if response.length:
+                # The tail went to another connection; skip the rest of this body.
+                conn.close()
+
+    def _connection_worker(self, transfer: Transfer, source: str):
+        """Keep one connection busy with pieces until the plan runs dry."""
+        planner = transfer.planner
+        failures = 0
+        try:
+            # Unbuffered, so whatever the journal records has reached the OS.
+            with open(transfer.part, "r+b", buffering=0) as fh:
+                while (piece := planner.take(source)) is not None:
+                    source = piece.source
+                    try:
+                        self._fetch_piece(transfer, source, fh, piece)
+                        failures = 0
+                    except (OSError, http.client.HTTPException, SourceMismatch) as exc:
+                        failures = transfer.failed(source, exc, failures)
+                    finally:
+                        planner.release(piece)
+        except BaseException as exc:
+            planner.abort(exc)
+            raise
+
+    def _fetch_whole(self, url: str, part: str, on_progress, hasher: OrderedHasher | None):
+        with self.pool.connection(url) as conn:
+            response = self._request(conn, "GET", url, {})
+            if response.status != 200:
+                response.read()
+                raise DownloadError(f"{url}: HTTP {response.status}")
+            with open(part, "wb", buffering=0) as fh:
+                self._copy(response, fh, on_progress, hasher)
+
+    def _fetch_segments(self, remote: RemoteFile, sources: list[str], part: str, on_progress,
+                        algorithms: list[str]) -> OrderedHasher | None:
+        transfer = Transfer(remote, sources, part, on_progress, algorithms, self.segments,
+                            self.retries, self.mirrors)
+        try:
+            if transfer.connections:
+                with ThreadPoolExecutor(max_workers=len(transfer.connections)) as executor:
+                    futures = [executor.submit(self._connection_worker, transfer, source)
+                               for source in transfer.connections]
+                    for future in futures:
+                        future.result()
+        finally:
+            transfer.journal.save()
+        return transfer.finish()
+
+    def download(self, url: str, dest: str | os.PathLike, on_progress=None,
+                 remote: RemoteFile | None = None, hashes: Hashes | None = None,
+                 algorithms=(), sources: list[str] | None = None) -> RemoteFile:
+        """Download ``url`` to ``dest``; ``on_progress(nbytes)`` runs per chunk.
+
+        If the remote file changes mid-download, ``on_progress`` gets the
+        negative count of bytes reported so far before the download starts over.
+
+        The callback is invoked from worker threads.  If an earlier attempt
+        left a journal behind and the server still has the same file, only
+        the missing ranges are requested, guarded by ``If-Range``.  Pass the
+        result of an earlier ``probe`` (or ``locate``, together with its
+        ``sources``) as ``remote`` to skip probing again.
+
+        Digests for ``algorithms`` and for whatever ``hashes`` knows are
+        computed on the fly and stored in ``remote.digests``; if ``hashes``
+        is given and nothing matches, the file is discarded and
+        ``HashMismatch`` is raised.
+        """
+        dest = os.fspath(dest)
+        part = dest + ".part"
+        if remote is None:
+            remote, sources = self.locate(url)
+        sources = sources or [remote.url]
+        names = digest_names(algorithms, hashes)
+        if not remote.accept_ranges or not remote.size:
+            hasher = OrderedHasher(names, part) if names else None
+            self._fetch_whole(remote.url, part, on_progress, hasher)
+        else:
+            try:
+                hasher = self._fetch_segments(remote, sources, part, on_progress, names)
+            except RemoteChanged:
+                # The file was replaced mid-download: start over once.
+                restart_download(part, on_progress)
+                remote, sources = self.locate(url)
+                hasher = self._fetch_segments(remote, sources, part, on_progress, names)
+        finish_download(remote, part, dest, hasher, hashes)
+        return remote
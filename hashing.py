@@ -0,0 +1,182 @@
+# This Python file uses the following encoding: utf-8
+"""Checksums computed while a download streams in.
+
+``Hashes`` mirrors pip's class of the same name: a mapping of algorithm to the
+hex digests a file is allowed to have.  ``OrderedHasher`` feeds chunks into
+the hash objects as they are written, in file order, so no separate pass
+over the finished file is needed.
+"""
+import hashlib
+import os
+import re
+import threading
+
+STRONG_HASHES = ("sha256", "blake2b")
+_HEX_ALGORITHMS = {64: "sha256", 128: "blake2b"}
+
+
+class HashMismatch(Exception):
+    """The downloaded bytes do not match any allowed digest."""
+
+    def __init__(self, path: str, allowed: dict[str, list[str]], got: dict[str, str]):
+        self.path = path
+        self.allowed = allowed
+        self.got = got
+        lines = [f"hashes do not match for {path}:"]
+        for name, digests in allowed.items():
+            lines.append(f"    expected {name}: {', '.join(digests)}")
+            if name in got:
+                lines.append(f"         got {name}: {got[name]}")
+        super().__init__("\n".join(lines))
+
+
+class Hashes:
+    """Allowed digests per algorithm; an empty set allows anything."""
+
+    def __init__(self, hashes: dict[str, list[str]] | None = None):
+        self._allowed = {name: sorted({d.lower() for d in digests})
+                         for name, digests in (hashes or {}).items()}
+
+    def __bool__(self) -> bool:
+        return bool(self._allowed)
+
+    def __repr__(self) -> str:
+        return f"Hashes({self._allowed!r})"
+
+    @property
+    def algorithms(self) -> list[str]:
+        return sorted(self._allowed)
+
+    def digests(self, name: str) -> list[str]:
+        return list(self._allowed.get(name, []))
+
+    def is_hash_allowed(self, name: str, hex_digest: str) -> bool:
+        return hex_digest.lower() in self._allowed.get(name, [])
+
+    def check_against_hashers(self, path: str, hashers: dict):
+        """Raise ``HashMismatch`` unless one of ``hashers`` matches."""
+        got = {name: hashers[name].hexdigest() for name in self._allowed if name in hashers}
+        for name, digest in got.items():
+            if digest in self._allowed[name]:
+                return
+        raise HashMismatch(path, self._allowed, got)
+
+
+def load_manifest(path: str | os.PathLike) -> dict[str, Hashes]:
+    """Read a checksum manifest into ``{filename: Hashes}``.
+
+    Understands ``sha256sum``/``b2sum`` output (``<hex>  <name>``), the
+    ``<algo>:<hex> <name>`` form and BSD lines (``SHA256 (<name>) = <hex>``).
+    """
+    entries: dict[str, dict[str, list[str]]] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            bsd = re.match(r"^(\w+) \((.+)\) = ([0-9a-fA-F]+)$", line)
+            if bsd:
+                algo, name, digest = bsd.group(1).lower(), bsd.group(2), bsd.group(3)
+                algo = "blake2b" if algo.startswith("blake2b") else algo
+            else:
+                digest, _, name = line.partition(" ")
+                name = name.strip().lstrip("*")
+                algo, _, value = digest.rpartition(":")
+                digest = value
+                algo = algo.lower() or _HEX_ALGORITHMS.get(len(digest), "")
+            if algo in STRONG_HASHES and name:
+                entries.setdefault(os.path.basename(name), {}).setdefault(algo, []).append(digest)
+    return {name: Hashes(hashes) for name, hashes in entries.items()}
+
+
+class OrderedHasher:
+    """Hash a file whose ranges are written concurrently and out of order.
+
+    SHA-256 and BLAKE2b are sequential, so segment digests cannot simply be
+    merged; instead every writer reports ``update(offset, data)`` after the
+    bytes hit the file and the hashers consume them in order.  Data ahead of
+    the hashing frontier is kept in a bounded buffer; past that bound it is
+    picked up from the file (still in the page cache) as soon as the range
+    before it completes, rather than in a pass after the download.
+    """
+
+    def __init__(self, algorithms, path: str, size: int | None = None,
+                 max_buffer: int = 32 * 1024 * 1024):
+        self.hashers = {name: hashlib.new(name) for name in algorithms}
+        self.path = path
+        self.size = size
+        self.max_buffer = max_buffer
+        self._frontier = 0
+        self._pending: dict[int, bytes] = {}
+        self._buffered = 0
+        self._written: list[list[int]] = []  # half-open [lo, hi) ranges on disk
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def _feed(self, data):
+        for hasher in self.hashers.values():
+            hasher.update(data)
+        self._frontier += len(data)
+
+    def _mark_written(self, lo: int, hi: int):
+        merged = []
+        for a, b in sorted(self._written + [[lo, hi]]):
+            if merged and a <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], b)
+            else:
+                merged.append([a, b])
+        self._written = merged
+
+    def _read_back(self, lo: int, hi: int):
+        if self._reader is None:
+            self._reader = open(self.path, "rb")
+        self._reader.seek(lo)
+        while lo < hi:
+            chunk = self._reader.read(min(1024 * 1024, hi - lo))
+            if not chunk:
+                raise OSError(f"{self.path}: short read while hashing")
+            self._feed(chunk)
+            lo += len(chunk)
+
+    def _advance(self):
+        while True:
+            data = self._pending.pop(self._frontier, None)
+            if data is not None:
+                self._buffered -= len(data)
+                self._feed(data)
+                continue
+            covering = next((hi for lo, hi in self._written if lo <= self._frontier < hi), None)
+            if covering is None:
+                return
+            stop = min([covering] + [o for o in self._pending if o > self._frontier])
+            self._read_back(self._frontier, stop)
+
+    def mark_written(self, ranges):
+        """Declare inclusive ``(start, end)`` ranges already on disk (resume)."""
+        with self._lock:
+            for start, end in ranges:
+                self._mark_written(start, end + 1)
+
+    def update(self, offset: int, data: bytes):
+        with self._lock:
+            self._mark_written(offset, offset + len(data))
+            if offset == self._frontier:
+                self._feed(data)
+            elif offset > self._frontier and self._buffered + len(data) <= self.max_buffer:
+                self._pending[offset] = bytes(data)
+                self._buffered += len(data)
+            self._advance()
+
+    def finish(self) -> dict:
+        """Return the hash objects once every byte has been consumed."""
+        with self._lock:
+            self._advance()
+            if self._reader:
+                self._reader.close()
+                self._reader = None
+            if self.size is not None and self._frontier != self.size:
+                raise OSError(f"{self.path}: hashed {self._frontier} of {self.size} bytes")
+            return self.hashers
+
+    def hexdigests(self) -> dict[str, str]:
+        return {name: hasher.hexdigest() for name, hasher in self.hashers.items()}
@@ -0,0 +1,266 @@
+# This Python file uses the following encoding: utf-8
+"""Persistent cache of simple-index metadata for the ``pip_libraries`` catalog.
+
+For every project the cache keeps the files listed on its simple-API page
+(filename, URL, version, Requires-Python, yank state, sha256 and whether
+PEP 658 metadata exists) in an SQLite table, as zlib-compressed JSON.
+Reads never touch the network, so the library browser opens instantly and
+offline; ``refresh`` revalidates a page with ``If-None-Match`` and
+``If-Modified-Since``, and ``prefetch`` does that for stale projects on a
+background thread, several pages at a time over keep-alive connections.
+"""
+import gzip
+import http.client
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urljoin
+
+from pip._internal.index.collector import IndexContent, parse_links
+from pip._internal.models.link import Link, MetadataFile
+from pip._vendor.packaging.utils import (InvalidSdistFilename, InvalidWheelFilename,
+                                         canonicalize_name, parse_sdist_filename,
+                                         parse_wheel_filename)
+from pip._vendor.packaging.version import InvalidVersion, Version
+
+from downloader import MAX_REDIRECTS, USER_AGENT, ConnectionPool, request_path
+
+logger = logging.getLogger(__name__)
+
+PYPI_SIMPLE = "https://pypi.org/simple/"
+ACCEPT = ("application/vnd.pypi.simple.v1+json, "
+          "application/vnd.pypi.simple.v1+html;q=0.1, text/html;q=0.01")
+MAX_AGE = 600  # seconds a page is trusted without revalidation
+CONNECTIONS = 8  # concurrent page fetches, and keep-alive connections per host
+
+
+class IndexUnavailable(Exception):
+    """The index could not be reached or answered with an error."""
+
+
+@dataclass
+class ProjectFile:
+    filename: str
+    url: str
+    version: str | None
+    requires_python: str | None = None
+    yanked: str | None = None  # reason, "" if yanked without one
+    sha256: str | None = None
+    has_metadata: bool = False
+
+    def link(self, page_url: str | None = None) -> Link:
+        """The file as a pip ``Link``, ready for pip's link evaluation."""
+        return Link(self.url, comes_from=page_url, requires_python=self.requires_python,
+                    yanked_reason=self.yanked, hashes={"sha256": self.sha256} if self.sha256 else None,
+                    metadata_file_data=MetadataFile(None) if self.has_metadata else None)
+
+
+@dataclass
+class ProjectIndex:
+    name: str
+    url: str
+    files: list[ProjectFile] = field(default_factory=list)
+    etag: str | None = None
+    last_modified: str | None = None
+    fetched: float = 0.0
+
+    def versions(self, include_yanked: bool = False) -> list[str]:
+        """Distinct versions, oldest first."""
+        seen = {}
+        for f in self.files:
+            if f.version and (include_yanked or f.yanked is None):
+                try:
+                    seen.setdefault(f.version, Version(f.version))
+                except InvalidVersion:
+                    pass
+        return sorted(seen, key=seen.__getitem__)
+
+    def latest(self, prereleases: bool = False) -> str | None:
+        versions = [v for v in self.versions() if prereleases or not Version(v).is_prerelease]
+        return versions[-1] if versions else None
+
+
+def _file_version(filename: str) -> str | None:
+    try:
+        if filename.endswith(".whl"):
+            return str(parse_wheel_filename(filename)[1])
+        return str(parse_sdist_filename(filename)[1])
+    except (InvalidWheelFilename, InvalidSdistFilename, InvalidVersion):
+        return None
+
+
+def parse_project_page(content: bytes, content_type: str, url: str) -> list[ProjectFile]:
+    """Files of a PEP 691 JSON or PEP 503 HTML project page."""
+    page = IndexContent(content, content_type, None, url, cache_link_parsing=False)
+    files = []
+    for link in parse_links(page):
+        files.append(ProjectFile(
+            filename=link.filename,
+            url=link.url_without_fragment,
+            version=_file_version(link.filename),
+            requires_python=link.requires_python,
+            yanked=link.yanked_reason,
+            sha256=link._hashes.get("sha256"),
+            has_metadata=link.metadata_file_data is not None,
+        ))
+    return files
+
+
+class IndexCache:
+    """Simple-API project pages, stored compactly and revalidated on demand."""
+
+    def __init__(self, path: str | os.PathLike, index_url: str = PYPI_SIMPLE,
+                 max_age: float = MAX_AGE, timeout: float = 10, connections: int = CONNECTIONS):
+        self.index_url = index_url.rstrip("/") + "/"
+        self.max_age = max_age
+        self.connections = connections
+        self.pool = ConnectionPool(max_per_host=connections, timeout=timeout)
+        self._lock = threading.Lock()
+        self._prefetching: threading.Thread | None = None
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    name TEXT PRIMARY KEY, url TEXT NOT NULL, etag TEXT, last_modified TEXT,
+                    fetched REAL NOT NULL, files BLOB NOT NULL)
+            """)
+
+    def project_url(self, name: str) -> str:
+        return urljoin(self.index_url, canonicalize_name(name) + "/")
+
+    def get(self, name: str) -> ProjectIndex | None:
+        """The cached page of ``name``, however old; never blocks on the network."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT name, url, etag, last_modified, fetched, files FROM projects WHERE name = ?",
+                (canonicalize_name(name),),
+            ).fetchone()
+        if row is None:
+            return None
+        files = [ProjectFile(*values) for values in json.loads(zlib.decompress(row[5]))]
+        return ProjectIndex(row[0], row[1], files, row[2], row[3], row[4])
+
+    def _store(self, project: ProjectIndex):
+        blob = zlib.compress(json.dumps([list(asdict(f).values()) for f in project.files],
+                                        separators=(",", ":")).encode())
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO projects VALUES (?, ?, ?, ?, ?, ?)",
+                             (project.name, project.url, project.etag, project.last_modified,
+                              project.fetched, blob))
+
+    def _touch(self, name: str, fetched: float):
+        with self._lock, self._db:
+            self._db.execute("UPDATE projects SET fetched = ? WHERE name = ?", (fetched, name))
+
+    def stale(self, names) -> list[str]:
+        """Those of ``names`` that are missing or older than ``max_age``."""
+        now = time.time()
+        with self._lock:
+            fetched = dict(self._db.execute("SELECT name, fetched FROM projects").fetchall())
+        return [n for n in names if now - fetched.get(canonicalize_name(n), 0) > self.max_age]
+
+    def _get_page(self, url: str, headers: dict) -> tuple[int, http.client.HTTPMessage, bytes, str]:
+        headers = {"User-Agent": USER_AGENT, "Accept": ACCEPT, "Accept-Encoding": "gzip", **headers}
+        retried = False
+        for _ in range(MAX_REDIRECTS + 1):
+            try:
+                with self.pool.connection(url) as conn:
+                    conn.request("GET", request_path(url), headers=headers)
+                    response = conn.getresponse()
+                    body = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                # The server may have closed an idle keep-alive connection.
+                if retried:
+                    raise IndexUnavailable(f"{url}: {exc}") from exc
+                retried = True
+                continue
+            if response.status in (301, 302, 303, 307, 308):
+                url = urljoin(url, response.getheader("Location"))
+                continue
+            if response.getheader("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return response.status, response.msg, body, url
+        raise IndexUnavailable(f"{url}: too many redirects")
+
+    def refresh(self, name: str, force: bool = False) -> ProjectIndex | None:
+        """Revalidate ``name`` unless it is fresh; ``None`` if the index has no such project."""
+        key = canonicalize_name(name)
+        cached = self.get(key)
+        if cached and not force and time.time() - cached.fetched <= self.max_age:
+            return cached
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+        status, response_headers, body, url = self._get_page(self.project_url(key), headers)
+        now = time.time()
+        if status == 304 and cached:
+            self._touch(key, now)
+            cached.fetched = now
+            return cached
+        if status == 404:
+            with self._lock, self._db:
+                self._db.execute("DELETE FROM projects WHERE name = ?", (key,))
+            return None
+        if status != 200:
+            raise IndexUnavailable(f"{url}: HTTP {status}")
+        project = ProjectIndex(
+            name=key,
+            url=url,
+            files=parse_project_page(body, response_headers.get("Content-Type", "text/html"), url),
+            etag=response_headers.get("ETag"),
+            last_modified=response_headers.get("Last-Modified"),
+            fetched=now,
+        )
+        self._store(project)
+        return project
+
+    def refresh_many(self, names, on_updated=None, force: bool = False) -> dict[str, ProjectIndex | None]:
+        """Refresh stale ``names`` concurrently, at most ``connections`` at a time.
+
+        Unreachable pages keep their cached copy and are left out of the
+        result.  ``on_updated(name, project)`` runs on a worker thread.
+        """
+        names = list(names) if force else self.stale(names)
+        if not names:
+            return {}
+        results = {}
+
+        def refresh(name: str):
+            try:
+                project = self.refresh(name, force)
+            except IndexUnavailable as exc:
+                logger.info("index refresh failed: %s", exc)
+                return
+            results[name] = project
+            if on_updated:
+                on_updated(name, project)
+
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(names))) as executor:
+            list(executor.map(refresh, names))
+        return results
+
+    def prefetch(self, names, on_updated=None):
+        """Refresh stale ``names`` on a background thread.
+
+        ``on_updated(name, project)`` runs on that thread after each page.
+        Does nothing while an earlier prefetch is still running.
+        """
+        with self._lock:
+            if self._prefetching and self._prefetching.is_alive():
+                return
+            self._prefetching = threading.Thread(target=self.refresh_many, args=(list(names), on_updated),
+                                                 name="index-prefetch", daemon=True)
+            self._prefetching.start()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+        self.pool.close()
@@ -0,0 +1,106 @@
+# This Python file uses the following encoding: utf-8
+"""Catalog-wide version lookups from the index cache.
+
+``PackageFinder.find_all_candidates`` fetches one project page at a time.
+``IndexFetcher`` instead lets ``IndexCache.refresh_many`` pull every stale
+page concurrently and then runs the cached files through the finder's own
+``LinkEvaluator`` and ``CandidateEvaluator``, so format control, target
+Python, Requires-Python, yanked releases and pre-releases are treated
+exactly as ``pip install`` would treat them.  Wheels whose tags the target
+cannot use are dropped up front through a ``TagIndex``, so pip only
+evaluates the handful of links that could be picked.
+"""
+from pip._internal.index.collector import LinkCollector
+from pip._internal.index.package_finder import PackageFinder
+from pip._internal.models.candidate import InstallationCandidate
+from pip._internal.models.search_scope import SearchScope
+from pip._internal.models.selection_prefs import SelectionPreferences
+from pip._internal.network.session import PipSession
+from pip._internal.utils.hashes import Hashes
+from pip._vendor.packaging.version import InvalidVersion, Version
+
+from indexcache import IndexCache, ProjectFile, ProjectIndex
+from tagindex import TagIndex
+
+
+def offline_finder(allow_prereleases: bool = False) -> PackageFinder:
+    """A ``PackageFinder`` for the running interpreter that is only used for evaluation."""
+    collector = LinkCollector(session=PipSession(), search_scope=SearchScope.create([], [], False))
+    prefs = SelectionPreferences(allow_yanked=False, allow_all_prereleases=allow_prereleases)
+    return PackageFinder.create(collector, prefs)
+
+
+class IndexFetcher:
+    """Best installable candidate for many projects at once.
+
+    ``finder`` decides what is installable; pass the one of a
+    ``BatchInstaller`` to honour its pip options, otherwise candidates are
+    judged for the running interpreter.  The finder is given the tags of
+    ``tags``, which are right for free-threaded targets too.
+    """
+
+    def __init__(self, cache: IndexCache, finder: PackageFinder | None = None, tags: TagIndex | None = None):
+        self.cache = cache
+        self.finder = finder or offline_finder()
+        self.tags = tags or TagIndex(self.finder.target_python)
+        self.tags.apply(self.finder)
+
+    def _links(self, project: ProjectIndex, files: list[ProjectFile]) -> list:
+        return [f.link(project.url) for f in files if self.tags.supports(f.filename)]
+
+    def candidates(self, project: ProjectIndex) -> list[InstallationCandidate]:
+        evaluator = self.finder.make_link_evaluator(project.name)
+        return self.finder.evaluate_links(evaluator, self._links(project, project.files))
+
+    def best_candidate(self, project: ProjectIndex, hashes: Hashes | None = None) -> InstallationCandidate | None:
+        """The candidate ``pip install`` would pick, by pip's ``CandidateEvaluator``.
+
+        pip ranks files with an allowed hash first, then non-yanked ones,
+        then (with ``--prefer-binary``) wheels, and only then by version.
+        Without ``hashes`` and binary preference the newest non-yanked
+        version therefore wins, so final (or, if allowed, pre-) releases are
+        tried newest first and evaluation stops at the first that yields a
+        candidate.  Otherwise, or if nothing installable turns up that way,
+        the whole page is evaluated.
+        """
+        evaluator = self.finder.make_candidate_evaluator(project.name, hashes=hashes)
+        if hashes or self.finder.prefer_binary:
+            return evaluator.compute_best_candidate(self.candidates(project)).best_candidate
+        link_evaluator = self.finder.make_link_evaluator(project.name)
+        by_version: dict[Version, list] = {}
+        for f in project.files:
+            if f.version and f.yanked is None:
+                try:
+                    version = Version(f.version)
+                except InvalidVersion:
+                    continue
+                if self.finder.allow_all_prereleases or not version.is_prerelease:
+                    by_version.setdefault(version, []).append(f)
+        for version in sorted(by_version, reverse=True):
+            links = self._links(project, by_version[version])
+            if not links:
+                continue
+            candidates = self.finder.evaluate_links(link_evaluator, links)
+            best = evaluator.compute_best_candidate(candidates).best_candidate
+            if best is not None:
+                return best
+        return evaluator.compute_best_candidate(self.candidates(project)).best_candidate
+
+    def best_candidates(self, names, refresh: bool = True) -> dict[str, InstallationCandidate | None]:
+        """``{name: best candidate}``; ``None`` for unknown or uninstallable projects.
+
+        With ``refresh`` stale pages are fetched first, concurrently; projects
+        whose page cannot be fetched are answered from the cache.
+        """
+        names = list(names)
+        if refresh:
+            self.cache.refresh_many(names)
+        best = {}
+        for name in names:
+            project = self.cache.get(name)
+            best[name] = self.best_candidate(project) if project else None
+        return best
+
+    def latest_versions(self, names, refresh: bool = True) -> dict[str, str | None]:
+        return {name: str(candidate.version) if candidate else None
+                for name, candidate in self.best_candidates(names, refresh).items()}
@@ -1,6 +1,6 @@
 # All infomation in this application
 
-self.pip_libraries = {
+pip_libraries = {
    "pyinstaller": "Python 打包工具",
    "tqdm": "Python 进度条库",
    "requests": "Python HTTP 库",
@@ -145,7 +145,7 @@ self.pip_libraries = {
 }
 
 # App list
-self.app_list = {
+app_list = {
    "Atom": [
        "https://mirrors.tuna.tsinghua.edu.cn/github-release/atom/atom/LatestRelease/AtomSetup-x64.exe",
        "https://mirrors.tuna.tsinghua.edu.cn/github-release/atom/atom/LatestRelease/AtomSetup.exe"
@@ -0,0 +1,177 @@
+# This Python file uses the following encoding: utf-8
+"""Index of installed distributions for "installed?" badges.
+
+Scanning site-packages through ``pip._internal.metadata`` or
+``importlib.metadata`` for every view is slow.  ``InstalledIndex`` keeps
+``name -> version, location, mtime, requirements`` per library directory in
+a JSON file together with the directory's mtime.  Installing, upgrading or
+removing a distribution adds, renames or deletes a ``.dist-info`` folder,
+which changes that mtime, so only changed directories are rescanned and a
+lookup is otherwise a dict access.
+"""
+import json
+import os
+import site
+import sys
+import sysconfig
+import threading
+from dataclasses import asdict, dataclass, field
+
+from pip._vendor.packaging.utils import canonicalize_name
+
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+FORMAT = 2  # bump when the stored fields change
+
+
+@dataclass
+class InstalledDist:
+    name: str
+    version: str
+    location: str
+    mtime: float  # of the .dist-info folder
+    requires: list[str] = field(default_factory=list)  # Requires-Dist, markers included
+
+
+def _read_headers(path: str) -> dict:
+    """``Name``, ``Version`` and ``Requires-Dist`` from a METADATA / PKG-INFO file.
+
+    Only the header block is read, not the long description.
+    """
+    headers = {"Requires-Dist": []}
+    with open(path, encoding="utf-8", errors="replace") as fh:
+        for line in fh:
+            if not line.strip():
+                break
+            key, sep, value = line.partition(":")
+            if not sep:
+                continue
+            if key == "Requires-Dist":
+                headers[key].append(value.strip())
+            elif key in ("Name", "Version") and key not in headers:
+                headers[key] = value.strip()
+    return headers
+
+
+def scan_directory(directory: str) -> dict[str, dict]:
+    """Distributions installed directly in ``directory``, by canonical name."""
+    found = {}
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return found
+    for entry in entries:
+        if not entry.name.endswith(METADATA_SUFFIXES):
+            continue
+        if entry.is_dir():
+            metadata = os.path.join(entry.path, "METADATA" if entry.name.endswith(".dist-info") else "PKG-INFO")
+        else:
+            metadata = entry.path  # a single-file .egg-info
+        try:
+            headers = _read_headers(metadata)
+            mtime = entry.stat().st_mtime
+        except OSError:
+            continue
+        if "Name" not in headers or "Version" not in headers:
+            continue
+        found.setdefault(canonicalize_name(headers["Name"]), asdict(InstalledDist(
+            headers["Name"], headers["Version"], directory, mtime, headers["Requires-Dist"])))
+    return found
+
+
+def _site_directories() -> set[str]:
+    paths = {sysconfig.get_path("purelib"), sysconfig.get_path("platlib")}
+    if hasattr(site, "getsitepackages"):
+        paths.update(site.getsitepackages())
+    if site.ENABLE_USER_SITE:
+        paths.add(site.getusersitepackages())
+    return {os.path.normcase(os.path.abspath(p)) for p in paths if p}
+
+
+def default_directories() -> list[str]:
+    """site-packages and the user site, in import order.
+
+    The rest of ``sys.path`` (the working directory, zip files, source
+    trees) holds no installed distributions worth scanning.
+    """
+    sites = _site_directories()
+    directories = []
+    for p in map(os.path.abspath, filter(None, sys.path)):
+        if os.path.normcase(p) in sites and p not in directories and os.path.isdir(p):
+            directories.append(p)
+    return directories
+
+
+class InstalledIndex:
+    """Installed distributions across ``directories``, persisted to ``path``.
+
+    A name found in several directories resolves to the first one, matching
+    what ``import`` and pip see.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None, directories: list[str] | None = None):
+        self.path = os.fspath(path) if path else None
+        self.directories = directories if directories is not None else default_directories()
+        self._dirs: dict[str, dict] = {}  # directory -> {"mtime": ns, "dists": {...}}
+        self._merged: dict[str, InstalledDist] | None = None
+        self._lock = threading.Lock()
+        if self.path:
+            try:
+                with open(self.path, encoding="utf-8") as fh:
+                    stored = json.load(fh)
+                if stored.get("format") == FORMAT:
+                    self._dirs = stored["dirs"]
+            except (OSError, ValueError, AttributeError):
+                pass
+
+    @staticmethod
+    def _mtime(directory: str) -> int | None:
+        try:
+            return os.stat(directory).st_mtime_ns
+        except OSError:
+            return None
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"format": FORMAT, "dirs": self._dirs}, fh, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def refresh(self) -> bool:
+        """Rescan directories whose mtime changed; returns whether anything did."""
+        with self._lock:
+            changed = False
+            for directory in self.directories:
+                mtime = self._mtime(directory)
+                cached = self._dirs.get(directory)
+                if cached is not None and cached["mtime"] == mtime:
+                    continue
+                self._dirs[directory] = {"mtime": mtime, "dists": scan_directory(directory) if mtime else {}}
+                changed = True
+            if changed or self._merged is None:
+                merged = {}
+                for directory in reversed(self.directories):
+                    for key, values in self._dirs.get(directory, {}).get("dists", {}).items():
+                        merged[key] = InstalledDist(**values)
+                self._merged = merged
+            if changed and self.path:
+                self._save()
+            return changed
+
+    def invalidate(self):
+        """Forget every directory, e.g. when mtimes are too coarse to notice a change."""
+        with self._lock:
+            self._dirs.clear()
+            self._merged = None
+
+    def snapshot(self) -> dict[str, InstalledDist]:
+        """Everything installed, by canonical name; rescans changed directories first."""
+        self.refresh()
+        return self._merged
+
+    def get(self, name: str) -> InstalledDist | None:
+        """One lookup; stats every directory, so take one ``snapshot`` for many."""
+        return self.snapshot().get(canonicalize_name(name))
+
+    def version(self, name: str) -> str | None:
+        dist = self.get(name)
+        return dist.version if dist else None
@@ -0,0 +1,104 @@
+# This Python file uses the following encoding: utf-8
+"""Sidecar journal that lets an interrupted download pick up where it stopped.
+
+Next to ``<dest>.part`` the downloader keeps ``<dest>.part.json`` holding the
+validators of the remote file and the byte ranges already on disk.
+"""
+import json
+import os
+import threading
+import time
+
+
+class DownloadJournal:
+    """Completed byte ranges (inclusive) of a partial download."""
+
+    def __init__(self, path: str, url: str, size: int, etag: str | None = None,
+                 last_modified: str | None = None, done: list | None = None,
+                 flush_interval: float = 1.0):
+        self.path = path
+        self.url = url
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.done: list[list[int]] = [list(r) for r in done or []]
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flushed = time.monotonic()
+
+    @classmethod
+    def load(cls, path: str) -> "DownloadJournal | None":
+        try:
+            with open(path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            return cls(path, data["url"], data["size"], data.get("etag"),
+                       data.get("last_modified"), data.get("done"))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @property
+    def validator(self) -> str | None:
+        """Value for ``If-Range``; weak ETags are not allowed there."""
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+    def matches(self, remote) -> bool:
+        if remote.size != self.size:
+            return False
+        if self.etag and remote.etag:
+            return self.etag == remote.etag
+        if self.last_modified and remote.last_modified:
+            return self.last_modified == remote.last_modified
+        return False
+
+    def add(self, start: int, end: int):
+        """Record ``start..end`` as written, flushing to disk now and then."""
+        with self._lock:
+            merged = []
+            for lo, hi in sorted(self.done + [[start, end]]):
+                if merged and lo <= merged[-1][1] + 1:
+                    merged[-1][1] = max(merged[-1][1], hi)
+                else:
+                    merged.append([lo, hi])
+            self.done = merged
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.save()
+
+    def missing(self) -> list[tuple[int, int]]:
+        with self._lock:
+            gaps, pos = [], 0
+            for lo, hi in self.done:
+                if lo > pos:
+                    gaps.append((pos, lo - 1))
+                pos = max(pos, hi + 1)
+            if pos < self.size:
+                gaps.append((pos, self.size - 1))
+            return gaps
+
+    @property
+    def completed(self) -> int:
+        with self._lock:
+            return sum(hi - lo + 1 for lo, hi in self.done)
+
+    def save(self):
+        with self._lock:
+            data = {
+                "url": self.url,
+                "size": self.size,
+                "etag": self.etag,
+                "last_modified": self.last_modified,
+                "done": self.done,
+            }
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp, self.path)
+            self._flushed = time.monotonic()
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
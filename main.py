@@ -5,12 +5,24 @@ from pathlib import Path
 from PySide6.QtGui import QGuiApplication
 from PySide6.QtQml import QQmlApplicationEngine
 
-from .inf import *
+from aio import LoopThread
+from bridge import CatalogModel, DownloadQueue, PackageManager
+from snapshot import load_catalog
 
 
 if __name__ == "__main__":
     app = QGuiApplication(sys.argv)
     engine = QQmlApplicationEngine()
+    io_loop = LoopThread()
+    downloads = DownloadQueue(io_loop)
+    packages = PackageManager()
+    catalog = CatalogModel(load_catalog())
+    app.aboutToQuit.connect(downloads.shutdown)
+    app.aboutToQuit.connect(packages.shutdown)
+    app.aboutToQuit.connect(io_loop.stop)
+    engine.rootContext().setContextProperty("downloads", downloads)
+    engine.rootContext().setContextProperty("packages", packages)
+    engine.rootContext().setContextProperty("catalog", catalog)
     qml_file = Path(__file__).resolve().parent / "main.qml"
     engine.load(qml_file)
     if not engine.rootObjects():
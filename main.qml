@@ -1,4 +1,5 @@
 import QtQuick
+import QtQuick.Controls
 import QtQuick.Window
 
 Window {
@@ -6,4 +7,30 @@ Window {
     height: 480
     visible: true
     title: qsTr("Dev Toolbox")
+
+    TextField {
+        id: searchField
+        anchors { left: parent.left; right: parent.right; top: parent.top; margins: 8 }
+        placeholderText: catalog.indexing ? qsTr("Indexing packages…") : qsTr("Search packages")
+        onTextEdited: catalog.setFilter(text)
+    }
+
+    ListView {
+        id: catalogView
+        anchors { left: parent.left; right: parent.right; top: searchField.bottom; bottom: parent.bottom }
+        clip: true
+        model: catalog
+        // Only visible rows get delegates; the model hands out rows in batches.
+        reuseItems: true
+        ScrollBar.vertical: ScrollBar {}
+
+        delegate: ItemDelegate {
+            required property string name
+            required property string description
+            required property string kind
+            width: ListView.view.width
+            text: description ? name + "  —  " + description : name
+            icon.name: kind === "app" ? "application-x-executable" : "package-x-generic"
+        }
+    }
 }
@@ -0,0 +1,153 @@
+# This Python file uses the following encoding: utf-8
+"""Mirror registry: alternative URLs for ``app_list`` entries, ranked by speed.
+
+Each route is a list of equivalent URL prefixes; a URL that starts with one of
+them can be rewritten onto any other.  Mirrors are probed with small ``Range``
+requests, ranked by round-trip time and throughput, and the results are kept
+in a JSON file so that startup uses the last ranking instead of probing.
+"""
+import http.client
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from downloader import USER_AGENT, ConnectionPool, request_path
+
+TUNA = "https://mirrors.tuna.tsinghua.edu.cn/"
+USTC = "https://mirrors.ustc.edu.cn/"
+BFSU = "https://mirrors.bfsu.edu.cn/"
+ALIYUN = "https://mirrors.aliyun.com/"
+
+ROUTES = [
+    [TUNA + "github-release/", BFSU + "github-release/", USTC + "github-release/"],
+    [TUNA + "blender/", BFSU + "blender/", USTC + "blender/", ALIYUN + "blender/",
+     "https://download.blender.org/"],
+    [TUNA + "blender/blender-release/", BFSU + "blender/blender-release/",
+     USTC + "blender/blender-release/", ALIYUN + "blender/blender-release/",
+     "https://download.blender.org/release/"],
+    [TUNA + "docker-ce/", BFSU + "docker-ce/", USTC + "docker-ce/", ALIYUN + "docker-ce/",
+     "https://download.docker.com/"],
+    [TUNA + "virtualbox/", BFSU + "virtualbox/", "https://download.virtualbox.org/virtualbox/"],
+    [TUNA + "wireshark/", BFSU + "wireshark/", USTC + "wireshark/",
+     "https://2.na.dl.wireshark.org/"],
+]
+
+PROBE_BYTES = 256 * 1024
+REFERENCE_SIZE = 16 * 1024 * 1024  # file size the ranking optimizes for
+
+
+class MirrorRegistry:
+    """Rewrite URLs across mirrors and order them by measured speed.
+
+    Measurements are per host: ``{host: {"rtt", "throughput", "probed"}}``;
+    ``probed`` is a ``clock()`` reading.
+    """
+
+    def __init__(self, routes: list[list[str]] = ROUTES, cache_path: str | None = None,
+                 ttl: float = 6 * 3600, timeout: float = 5, clock=time.time):
+        self.routes = routes
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.clock = clock
+        self.pool = ConnectionPool(max_per_host=2, timeout=timeout)
+        self._stats: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._probing: threading.Thread | None = None
+        if cache_path:
+            try:
+                with open(cache_path, encoding="utf-8") as fh:
+                    self._stats = json.load(fh)
+            except (OSError, ValueError):
+                pass
+
+    def alternatives(self, url: str) -> list[str]:
+        """``url`` plus every equivalent URL, in declaration order."""
+        best = None
+        for route in self.routes:
+            for prefix in route:
+                if url.startswith(prefix) and (best is None or len(prefix) > len(best[0])):
+                    best = (prefix, route)
+        if best is None:
+            return [url]
+        prefix, route = best
+        rest = url[len(prefix):]
+        return [url] + [other + rest for other in route if other != prefix]
+
+    def score(self, url: str) -> float:
+        """Expected seconds for a ``REFERENCE_SIZE`` download; lower is better."""
+        with self._lock:
+            stats = self._stats.get(urlsplit(url).netloc)
+        if not stats:
+            return float("inf")
+        if not stats["throughput"]:
+            return float("inf") if stats["rtt"] is None else 1e9
+        return stats["rtt"] + REFERENCE_SIZE / stats["throughput"]
+
+    def candidates(self, url: str) -> list[str]:
+        """Equivalent URLs, fastest first, from the cached measurements.
+
+        Never blocks on the network; if the measurements are stale a
+        background probe refreshes them for next time.
+        """
+        urls = self.alternatives(url)
+        if self.stale(urls):
+            self.probe_in_background(urls)
+        # ``sorted`` is stable: unmeasured mirrors keep the declared order.
+        return sorted(urls, key=self.score) if len(urls) > 1 else urls
+
+    def stale(self, urls: list[str]) -> bool:
+        now = self.clock()
+        with self._lock:
+            probed = [self._stats.get(urlsplit(u).netloc, {}).get("probed") for u in urls]
+        return any(when is None or now - when > self.ttl for when in probed)
+
+    def _measure(self, url: str) -> dict:
+        started = time.monotonic()
+        stats = {"rtt": None, "throughput": 0.0, "probed": self.clock()}
+        try:
+            with self.pool.connection(url) as conn:
+                conn.request("GET", request_path(url), headers={
+                    "User-Agent": USER_AGENT, "Range": f"bytes=0-{PROBE_BYTES - 1}"})
+                response = conn.getresponse()
+                first_byte = time.monotonic()
+                stats["rtt"] = first_byte - started
+                if response.status not in (200, 206):
+                    response.read()
+                    return stats
+                received = len(response.read(PROBE_BYTES))
+                if response.status == 200:
+                    conn.close()
+                elapsed = time.monotonic() - first_byte
+                stats["throughput"] = received / elapsed if elapsed > 0 else float(received)
+        except (OSError, http.client.HTTPException):
+            pass
+        return stats
+
+    def probe(self, urls: list[str]) -> dict[str, dict]:
+        """Measure every host in ``urls`` now and persist the results."""
+        with ThreadPoolExecutor(max_workers=len(urls) or 1) as executor:
+            results = dict(zip((urlsplit(u).netloc for u in urls), executor.map(self._measure, urls)))
+        with self._lock:
+            self._stats.update(results)
+            snapshot = dict(self._stats)
+        if self.cache_path:
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(snapshot, fh)
+            os.replace(tmp, self.cache_path)
+        return results
+
+    def probe_in_background(self, urls: list[str]):
+        with self._lock:
+            if self._probing and self._probing.is_alive():
+                return
+            self._probing = threading.Thread(target=self.probe, args=(urls,), name="mirror-probe", daemon=True)
+            self._probing.start()
+
+    def report_failure(self, url: str):
+        """Push a host that stalled mid-download to the back of the ranking."""
+        with self._lock:
+            self._stats[urlsplit(url).netloc] = {"rtt": None, "throughput": 0.0, "probed": self.clock()}
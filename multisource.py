@@ -0,0 +1,125 @@
+# This Python file uses the following encoding: utf-8
+"""Work-stealing plan for fetching one file from several mirrors at once.
+
+The missing byte ranges start out as a queue of pieces.  Each connection is
+bound to a source (mirror URL) and keeps taking pieces; once the queue is
+empty, an idle connection splits the piece that would take longest to finish
+at its owner's measured speed and takes the tail, sized by how fast it is
+relative to that owner.  Fast mirrors thereby end up serving most of the
+file, and a mirror that slows down mid-transfer loses its remaining bytes to
+the others, in the manner of aria2.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from progress import RateEstimator
+
+MIN_STEAL = 1024 * 1024
+
+
+@dataclass(eq=False)
+class Piece:
+    pos: int  # next byte to write
+    end: int  # inclusive; may shrink when another connection steals the tail
+    source: str = ""
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.pos + 1
+
+
+class SegmentPlanner:
+    """Hands out byte ranges to connections; safe to share between threads."""
+
+    def __init__(self, ranges: list[tuple[int, int]], sources: list[str], min_steal: int = MIN_STEAL):
+        self._queue = deque(ranges)
+        self.sources = list(sources)
+        self.min_steal = min_steal
+        self._active: list[Piece] = []
+        self._rates = {source: RateEstimator() for source in sources}
+        self._received = dict.fromkeys(sources, 0)
+        self._retired: dict[str, Exception] = {}
+        self._error: BaseException | None = None
+        self._lock = threading.Lock()
+
+    def _rate(self, source: str) -> float:
+        return max(self._rates[source].rate, 1.0)
+
+    def take(self, source: str) -> Piece | None:
+        """Next piece for a connection to ``source``, or ``None`` when done.
+
+        If ``source`` was retired the piece is for the fastest source still
+        in use; check ``piece.source``.
+        """
+        with self._lock:
+            if self._error is not None:
+                return None
+            if source in self._retired:
+                alive = [s for s in self.sources if s not in self._retired]
+                if not alive:
+                    return None
+                source = max(alive, key=lambda s: (self._rates[s].rate, -self.sources.index(s)))
+            if self._queue:
+                start, end = self._queue.popleft()
+                piece = Piece(start, end, source)
+                self._active.append(piece)
+                return piece
+            victims = [p for p in self._active if p.remaining >= 2 * self.min_steal]
+            if not victims:
+                return None
+            victim = max(victims, key=lambda p: p.remaining / self._rate(p.source))
+            mine, theirs = self._rate(source), self._rate(victim.source)
+            share = int(victim.remaining * mine / (mine + theirs))
+            share = min(max(share, self.min_steal), victim.remaining - self.min_steal)
+            piece = Piece(victim.end - share + 1, victim.end, source)
+            victim.end = piece.pos - 1
+            self._active.append(piece)
+            return piece
+
+    def claim(self, piece: Piece, amount: int) -> tuple[int, int]:
+        """Reserve up to ``amount`` bytes at ``piece.pos`` after reading them.
+
+        Returns ``(offset, count)``; ``count`` is smaller than ``amount``
+        if the tail was stolen meanwhile and is 0 once the piece is done.
+        """
+        with self._lock:
+            count = max(0, min(amount, piece.remaining))
+            offset = piece.pos
+            piece.pos += count
+            self._received[piece.source] += count
+            self._rates[piece.source].sample(time.monotonic(), self._received[piece.source])
+            return offset, count
+
+    def remaining(self, piece: Piece) -> int:
+        with self._lock:
+            return 0 if self._error is not None else piece.remaining
+
+    def release(self, piece: Piece):
+        """Give back a piece; whatever was not written goes back in the queue."""
+        with self._lock:
+            self._active.remove(piece)
+            if piece.remaining > 0:
+                self._queue.appendleft((piece.pos, piece.end))
+
+    def retire(self, source: str, error: Exception):
+        """Stop using ``source``; its connections move to the fastest remaining one."""
+        with self._lock:
+            self._retired[source] = error
+
+    def abort(self, error: BaseException):
+        """Make every connection stop at its next chunk."""
+        with self._lock:
+            if self._error is None:
+                self._error = error
+
+    def unfinished(self) -> Exception | None:
+        """The reason bytes are still missing, or ``None`` if the plan is done."""
+        with self._lock:
+            if self._error is not None:
+                return self._error
+            if self._queue or self._active:
+                errors = list(self._retired.values())
+                return errors[-1] if errors else RuntimeError("pieces left unassigned")
+            return None
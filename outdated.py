@@ -0,0 +1,131 @@
+# This Python file uses the following encoding: utf-8
+""""What's outdated" report for the catalog and everything it pulled in.
+
+``pip list --outdated`` queries the index for one distribution after another.
+This report instead reads installed versions from ``InstalledIndex`` and the
+newest installable versions from the local ``IndexCache``, evaluating the
+projects in parallel, so a warm run takes a fraction of a second.  Refresh
+the cache beforehand (``IndexCache.prefetch``) for up-to-date answers.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from pip._vendor.packaging.markers import default_environment
+from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+from pip._vendor.packaging.utils import canonicalize_name
+from pip._vendor.packaging.version import InvalidVersion, Version
+
+from indexcache import IndexCache
+from indexfetch import IndexFetcher
+from installed import InstalledDist, InstalledIndex
+
+MAJOR, MINOR, PATCH, OTHER = 3, 2, 1, 0
+SEVERITY_NAMES = {MAJOR: "major", MINOR: "minor", PATCH: "patch", OTHER: "other"}
+
+
+@dataclass
+class OutdatedEntry:
+    name: str
+    installed: str
+    latest: str
+    severity: int
+    required_by: str | None = None  # catalog entry that pulled it in; None for catalog entries
+
+    @property
+    def severity_name(self) -> str:
+        return SEVERITY_NAMES[self.severity]
+
+
+def severity(installed: Version, latest: Version) -> int:
+    """Which release component moved: ``MAJOR``, ``MINOR``, ``PATCH`` or ``OTHER``."""
+    old, new = installed.release + (0, 0, 0), latest.release + (0, 0, 0)
+    for level, (a, b) in zip((MAJOR, MINOR, PATCH), zip(old, new)):
+        if a != b:
+            return level
+    return OTHER
+
+
+def dependency_closure(installed: dict[str, InstalledDist], roots) -> dict[str, str | None]:
+    """Installed ``roots`` plus their installed dependencies, by canonical name.
+
+    ``installed`` is an ``InstalledIndex.snapshot()``.  Maps each name to
+    the root that first pulled it in (``None`` for roots).  Requirements are
+    evaluated against the running interpreter, and a dependency required
+    with extras (``requests[socks]``) brings in what those extras add.
+    """
+    environment = default_environment()
+    found: dict[str, str | None] = {}
+    extras: dict[str, set[str]] = {}  # extras followed so far, per project
+    for root in roots:
+        key = canonicalize_name(root)
+        if key not in installed or key in found:
+            continue
+        found[key] = None
+        stack = [(key, "")]
+        while stack:
+            name, extra = stack.pop()
+            for line in installed[name].requires:
+                try:
+                    req = Requirement(line)
+                except InvalidRequirement:
+                    continue
+                if req.marker is not None and not req.marker.evaluate({**environment, "extra": extra}):
+                    continue
+                dep = canonicalize_name(req.name)
+                if dep not in installed:
+                    continue
+                if dep not in found:
+                    found[dep] = key
+                    stack.append((dep, ""))
+                new = req.extras - extras.setdefault(dep, set())
+                extras[dep] |= new
+                stack += [(dep, e) for e in sorted(new)]
+    return found
+
+
+def outdated_report(names, cache: IndexCache, installed: InstalledIndex | None = None,
+                    fetcher: IndexFetcher | None = None, workers: int | None = None) -> list[OutdatedEntry]:
+    """Outdated catalog entries and dependencies, most severe first.
+
+    Only cached index pages are used; names without one are skipped.
+    """
+    installed = installed or InstalledIndex()
+    fetcher = fetcher or IndexFetcher(cache)
+    snapshot = installed.snapshot()
+    closure = dependency_closure(snapshot, names)
+
+    def check(key: str) -> OutdatedEntry | None:
+        project = cache.get(key)
+        candidate = fetcher.best_candidate(project) if project else None
+        if candidate is None:
+            return None
+        dist = snapshot[key]
+        try:
+            current = Version(dist.version)
+        except InvalidVersion:
+            return None
+        if candidate.version <= current:
+            return None
+        return OutdatedEntry(dist.name, dist.version, str(candidate.version),
+                             severity(current, candidate.version), closure[key])
+
+    with ThreadPoolExecutor(max_workers=workers or min(32, os.cpu_count() or 4)) as executor:
+        entries = [entry for entry in executor.map(check, closure) if entry]
+    entries.sort(key=lambda e: (-e.severity, e.required_by is not None, canonicalize_name(e.name)))
+    return entries
+
+
+def format_report(entries: list[OutdatedEntry]) -> str:
+    """One aligned line per entry: ``name  installed -> latest  severity  (via root)``."""
+    if not entries:
+        return "Everything is up to date."
+    name_width = max(len(e.name) for e in entries)
+    old_width = max(len(e.installed) for e in entries)
+    new_width = max(len(e.latest) for e in entries)
+    lines = []
+    for e in entries:
+        via = f"  (via {e.required_by})" if e.required_by else ""
+        lines.append(f"{e.name:<{name_width}}  {e.installed:>{old_width}} -> {e.latest:<{new_width}}"
+                     f"  {e.severity_name}{via}")
+    return "\n".join(lines)
@@ -0,0 +1,264 @@
+# This Python file uses the following encoding: utf-8
+"""Install several ``pip_libraries`` entries with one resolve.
+
+Running ``pip install`` once per ticked package resolves and fetches the
+index again for every one of them.  ``BatchInstaller`` drives pip's own
+install machinery in-process instead: all packages go through the resolvelib
+``Resolver`` together, the wheels it picked are downloaded in parallel, and
+installation proceeds in waves of packages that do not depend on each other.
+Given a ``ResolutionCache``, a selection installed before skips resolution
+while the index has nothing new for it.
+
+This relies on ``pip._internal``, which has no stable API; it follows the
+steps of ``pip install`` in pip 23.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+from typing import Iterable, Sequence
+
+from pip._internal.cache import WheelCache
+from pip._internal.cli.cmdoptions import make_target_python
+from pip._internal.commands import create_command
+from pip._internal.commands.install import decide_user_install
+from pip._internal.exceptions import InstallationError
+from pip._internal.network.download import Downloader
+from pip._internal.operations.build.build_tracker import get_build_tracker
+from pip._internal.req.req_install import InstallRequirement
+from pip._internal.resolution.resolvelib.candidates import RequiresPythonCandidate
+from pip._internal.utils.misc import check_externally_managed
+from pip._internal.utils.temp_dir import TempDirectory, global_tempdir_manager, tempdir_registry
+from pip._internal.wheel_builder import build, should_build_for_install_command
+from pip._vendor.packaging.utils import canonicalize_name
+
+from resolvecache import Pin, ResolutionCache
+from wheelinstall import install_requirement
+
+logger = logging.getLogger(__name__)
+
+DOWNLOAD_JOBS = 8
+INSTALL_JOBS = 4
+
+
+class ParallelBatchDownloader:
+    """Drop-in for pip's ``BatchDownloader`` that fetches links concurrently.
+
+    The resolver only reads metadata (PEP 658 or lazy wheels) where it can and
+    leaves the wheels themselves to one batch at the end; that batch is what
+    runs in parallel here.
+    """
+
+    def __init__(self, session, jobs: int = DOWNLOAD_JOBS):
+        self._download = Downloader(session, progress_bar="off")
+        self.jobs = jobs
+
+    def __call__(self, links: Iterable, location: str):
+        links = list(links)
+        if not links:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.jobs, len(links))) as executor:
+            futures = [(link, executor.submit(self._download, link, location)) for link in links]
+            for link, future in futures:
+                yield link, future.result()
+
+
+def _base_name(identifier: str | None) -> str | None:
+    # Candidates with extras are separate graph nodes: "name[extra]".
+    return None if identifier is None else canonicalize_name(identifier.split("[", 1)[0])
+
+
+def _dependency_edges(graph) -> dict[str, set[str]]:
+    edges: dict[str, set[str]] = {}
+    for parent in graph:
+        if parent is not None:
+            edges.setdefault(_base_name(parent), set()).update(
+                _base_name(child) for child in graph.iter_children(parent))
+    return edges
+
+
+def _resolved_pins(mapping) -> dict[str, Pin]:
+    # Every project in a resolver result, the installed ones it kept included;
+    # extras share their project's pin and Requires-Python is not a project.
+    pins = {}
+    for candidate in mapping.values():
+        if isinstance(candidate, RequiresPythonCandidate):
+            continue
+        link = candidate.source_link
+        pins.setdefault(canonicalize_name(candidate.project_name), Pin(
+            candidate.project_name, str(candidate.version), link.filename if link else None,
+            candidate.is_installed))
+    return pins
+
+
+def install_waves(names: Sequence[str], edges: dict[str, set[str]]) -> list[list[str]]:
+    """Group ``names`` so every package comes after the ones it depends on.
+
+    ``edges`` maps a name to its dependencies.  Packages within a wave are
+    independent and can be installed at the same time.  Cycles are broken at
+    the package with the fewest outstanding dependencies.
+    """
+    pending = {name: set(edges.get(name, ())) & set(names) - {name} for name in names}
+    waves = []
+    while pending:
+        ready = [name for name, deps in pending.items() if not deps]
+        if not ready:
+            ready = [min(pending, key=lambda name: len(pending[name]))]
+        waves.append(ready)
+        for name in ready:
+            del pending[name]
+        for deps in pending.values():
+            deps.difference_update(ready)
+    return waves
+
+
+class BatchInstaller:
+    """Resolve, download and install a set of packages as one operation.
+
+    ``args`` are ordinary ``pip install`` options (``--index-url``,
+    ``--upgrade``, ``--user`` ...), parsed the way pip parses them.  The
+    HTTP session and the ``PackageFinder`` are created on first use and kept
+    until ``close``, so later installs reuse their connections and the
+    finder's per-project caches; call ``refresh`` to see new releases.
+    Resolver results are reused from ``resolve_cache`` when it has them.
+    """
+
+    def __init__(self, args: Sequence[str] = (), download_jobs: int = DOWNLOAD_JOBS,
+                 install_jobs: int = INSTALL_JOBS, resolve_cache: ResolutionCache | None = None):
+        self.command = create_command("install", isolated=False)
+        self.args = list(args)
+        self.download_jobs = download_jobs
+        self.install_jobs = install_jobs
+        self.resolve_cache = resolve_cache
+        self.options = None
+        self.session = None
+        self.finder = None
+
+    def open(self):
+        if self.finder is not None:
+            return
+        options, _ = self.command.parse_args(self.args)
+        if options.target_dir:
+            raise InstallationError("--target is not supported for batch installs")
+        self.command.verbosity = options.verbose - options.quiet
+        options.use_user_site = decide_user_install(
+            options.use_user_site, prefix_path=options.prefix_path, target_dir=None,
+            root_path=options.root_path, isolated_mode=options.isolated_mode)
+        self.options = options
+        self.session = self.session or self.command._build_session(options)
+        self.finder = self.command._build_package_finder(
+            options=options, session=self.session, target_python=make_target_python(options),
+            ignore_requires_python=options.ignore_requires_python)
+
+    def refresh(self):
+        """Forget cached index pages; the session and its connections stay."""
+        self.finder = None
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+        self.session = self.finder = None
+
+    def install(self, names: Sequence[str], dry_run: bool = False,
+                checkpoint=None) -> list[tuple[str, str]]:
+        """Install ``names`` and their dependencies; returns ``(name, version)`` pairs.
+
+        With ``dry_run`` nothing is installed and the result lists what would be.
+        ``checkpoint()``, if given, is called between steps and may raise to
+        abandon the operation before the next one starts.
+        """
+        checkpoint = checkpoint or (lambda: None)
+        self.open()
+        options, session, finder, command = self.options, self.session, self.finder, self.command
+        if not dry_run and not (options.root_path or options.prefix_path):
+            check_externally_managed()
+        # Temporary directories live for one install, not for the session.
+        with ExitStack() as stack:
+            stack.enter_context(tempdir_registry())
+            stack.enter_context(global_tempdir_manager())
+            build_tracker = stack.enter_context(get_build_tracker())
+            directory = TempDirectory(delete=not options.no_clean, kind="install", globally_managed=True)
+            target = finder.target_python
+            key = self.resolve_cache.key(names, options, target) if self.resolve_cache else None
+            cached = self.resolve_cache.lookup(key, target) if key else None
+            if cached:
+                logger.info("Reusing the resolution of %s", ", ".join(names))
+            requirements = [pin.requirement for pin in cached.pins] if cached else list(names)
+            reqs = command.get_requirements(requirements, options, finder, session)
+            for req in reqs:
+                req.permit_editable_wheels = True
+            wheel_cache = WheelCache(options.cache_dir)
+
+            preparer = command.make_requirement_preparer(
+                temp_build_dir=directory, options=options, build_tracker=build_tracker,
+                session=session, finder=finder, use_user_site=options.use_user_site,
+                verbosity=command.verbosity)
+            preparer._batch_download = ParallelBatchDownloader(session, self.download_jobs)
+            # Cached pins already include every dependency.
+            ignore_dependencies = options.ignore_dependencies
+            options.ignore_dependencies = ignore_dependencies or cached is not None
+            try:
+                resolver = command.make_resolver(
+                    preparer=preparer, finder=finder, options=options, wheel_cache=wheel_cache,
+                    use_user_site=options.use_user_site, ignore_installed=options.ignore_installed,
+                    ignore_requires_python=options.ignore_requires_python,
+                    force_reinstall=options.force_reinstall,
+                    upgrade_strategy=options.upgrade_strategy if options.upgrade else "to-satisfy-only",
+                    use_pep517=options.use_pep517)
+            finally:
+                options.ignore_dependencies = ignore_dependencies
+            with self.resolve_cache.pinned_candidates(finder, cached) if cached else nullcontext():
+                requirement_set = resolver.resolve(reqs, check_supported_wheels=True)
+            # Read the edges first: ordering the install prunes the graph.
+            if cached:
+                edges = {name: set(deps) for name, deps in cached.edges.items()}
+            else:
+                edges = _dependency_edges(resolver._result.graph)
+            to_install = resolver.get_installation_order(requirement_set)
+            versions = {req.name: req.metadata["Version"] for req in to_install}
+            if key and not cached and not options.ignore_dependencies:
+                # The whole result, not just ``to_install``: a replay installs
+                # the pins without dependencies, so installed ones must be there.
+                pins = _resolved_pins(resolver._result.mapping)
+                self.resolve_cache.store(key, names, list(pins.values()),
+                                         {name: deps & pins.keys() for name, deps in edges.items()
+                                          if name in pins}, target)
+            if dry_run:
+                return sorted(versions.items())
+            checkpoint()
+
+            reqs_to_build = [r for r in requirement_set.requirements.values()
+                             if should_build_for_install_command(r)]
+            _, build_failures = build(reqs_to_build, wheel_cache=wheel_cache, verify=True,
+                                      build_options=[], global_options=options.global_options or [])
+            if build_failures:
+                raise InstallationError("Could not build wheels for "
+                                        + ", ".join(r.name for r in build_failures))
+
+            by_name = {canonicalize_name(req.name): req for req in to_install}
+            waves = install_waves(list(by_name), edges)
+            logger.info("Installing %d packages in %d waves", len(by_name), len(waves))
+
+            def install_one(req: InstallRequirement):
+                uninstalled = req.uninstall(auto_confirm=True) if req.should_reinstall else None
+                try:
+                    # Members are unpacked and compiled on threads of their own.
+                    install_requirement(req, root=options.root_path, prefix=options.prefix_path,
+                                        warn_script_location=options.warn_script_location
+                                        and not options.prefix_path,
+                                        use_user_site=options.use_user_site, pycompile=options.compile)
+                except Exception:
+                    if uninstalled and not req.install_succeeded:
+                        uninstalled.rollback()
+                    raise
+                if uninstalled:
+                    uninstalled.commit()
+                return req.name, versions[req.name]
+
+            installed = []
+            with ThreadPoolExecutor(max_workers=self.install_jobs) as executor:
+                for wave in waves:
+                    checkpoint()
+                    # Each wave must be complete before its dependents start.
+                    installed += executor.map(install_one, [by_name[name] for name in wave])
+            return sorted(installed)
+
@@ -0,0 +1,164 @@
+# This Python file uses the following encoding: utf-8
+"""Long-lived in-process pip worker for the UI.
+
+Starting ``pip`` as a subprocess costs an interpreter start plus pip's import
+time for every operation.  ``PipService`` imports ``pip._internal`` once and
+owns a single worker thread with a warm ``BatchInstaller``, whose session and
+``PackageFinder`` (with its link-collector caches) survive across requests.
+Install, list, show and version lookups are queued and answered with
+``concurrent.futures.Future`` objects carrying structured results.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Sequence
+
+from pip._internal.metadata import get_default_environment
+from pip._vendor.packaging.utils import canonicalize_name
+
+from pipbatch import BatchInstaller
+from resolvecache import ResolutionCache
+
+
+class OperationCancelled(Exception):
+    """A running pip operation was stopped at one of its checkpoints."""
+
+
+@dataclass
+class PackageInfo:
+    name: str
+    version: str
+    location: str | None = None
+    summary: str = ""
+    requires: list[str] = field(default_factory=list)
+
+
+def _package_info(dist) -> PackageInfo:
+    return PackageInfo(
+        name=dist.raw_name,
+        version=str(dist.version),
+        location=dist.location,
+        summary=dist.metadata.get("Summary") or "",
+        requires=[str(req) for req in dist.iter_dependencies()],
+    )
+
+
+class PipService:
+    """Run pip operations one at a time on a dedicated thread.
+
+    ``args`` are ``pip install`` options applied to every install.  Requests
+    run in submission order; ``cancel`` drops a queued request or stops a
+    running install between steps (the result is then ``OperationCancelled``).
+    Installs reuse the pins stored in ``resolve_cache``, if one is given.
+    """
+
+    def __init__(self, args: Sequence[str] = (), resolve_cache: ResolutionCache | None = None):
+        self.installer = BatchInstaller(args, resolve_cache=resolve_cache)
+        self._queue: queue.Queue = queue.Queue()
+        self._current: Future | None = None
+        self._stop_current = False
+        self._stopping = False  # a shutdown cancelled the running request
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="pip-service", daemon=True)
+        self._thread.start()
+
+    def _submit(self, fn, *args) -> Future:
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def install(self, names: Sequence[str], dry_run: bool = False) -> Future:
+        """Resolves to ``[(name, version), ...]`` of what was (or would be) installed."""
+        return self._submit(self._install, list(names), dry_run)
+
+    def list_installed(self) -> Future:
+        """Resolves to a ``PackageInfo`` per installed distribution, by name."""
+        return self._submit(self._list_installed)
+
+    def show(self, name: str) -> Future:
+        """Resolves to the ``PackageInfo`` of ``name``, or ``None``."""
+        return self._submit(self._show, name)
+
+    def latest(self, names: Sequence[str]) -> Future:
+        """Resolves to ``{name: newest version on the index or None}``."""
+        return self._submit(self._latest, list(names))
+
+    def refresh(self) -> Future:
+        """Drop cached index pages so the next request sees new releases."""
+        return self._submit(self.installer.refresh)
+
+    def cancel(self, future: Future) -> bool:
+        if future.cancel():
+            return True
+        with self._lock:
+            if future is self._current:
+                self._stop_current = True
+                return True
+        return False
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False, cancel_current: bool = False):
+        """Stop the worker after the queued requests, or drop them with ``cancel_pending``.
+
+        ``cancel_current`` also stops the running request, and any started
+        after it, at the next checkpoint; with ``wait`` the call returns once it has stopped, so
+        nothing is left half-installed when the process exits.
+        """
+        if cancel_current:
+            with self._lock:
+                self._stopping = self._stop_current = True
+        if cancel_pending:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[0].cancel()
+        self._queue.put(None)
+        if wait:
+            self._thread.join()
+
+    def _checkpoint(self):
+        with self._lock:
+            if self._stop_current:
+                raise OperationCancelled("cancelled")
+
+    def _install(self, names: list[str], dry_run: bool) -> list[tuple[str, str]]:
+        return self.installer.install(names, dry_run=dry_run, checkpoint=self._checkpoint)
+
+    def _list_installed(self) -> list[PackageInfo]:
+        env = get_default_environment()
+        return sorted((_package_info(dist) for dist in env.iter_installed_distributions(local_only=False)),
+                      key=lambda info: canonicalize_name(info.name))
+
+    def _show(self, name: str) -> PackageInfo | None:
+        dist = get_default_environment().get_distribution(name)
+        return _package_info(dist) if dist is not None else None
+
+    def _latest(self, names: list[str]) -> dict[str, str | None]:
+        self.installer.open()
+        latest = {}
+        for name in names:
+            self._checkpoint()
+            best = self.installer.finder.find_best_candidate(name).best_candidate
+            latest[name] = str(best.version) if best else None
+        return latest
+
+    def _run(self):
+        while (item := self._queue.get()) is not None:
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._lock:
+                self._current, self._stop_current = future, self._stopping
+            try:
+                result = fn(*args)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                with self._lock:
+                    self._current = None
+        self.installer.close()
@@ -0,0 +1,172 @@
+# This Python file uses the following encoding: utf-8
+"""Wheel bundles for provisioning machines without network access.
+
+``WheelBundle.prefetch`` resolves a ``pip_libraries`` selection for a target
+platform (``--platform``/``--python-version``/``--implementation``/``--abi``,
+as in ``pip download``) and stores the wheels in one shared ``wheels/``
+directory; wheels already in the bundle are reused, so several selections
+share their common dependencies.  ``manifest.json`` indexes every file by
+sha256 and records, per selection, the pinned versions, and a hash-pinned
+requirements file is written next to it.  On the target machine
+``WheelBundle.installer`` installs with ``--no-index --find-links`` and
+``--require-hashes``.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
+
+from pip._internal.cli import cmdoptions
+from pip._internal.cli.cmdoptions import make_target_python
+from pip._internal.commands import create_command
+from pip._internal.operations.build.build_tracker import get_build_tracker
+from pip._internal.utils.temp_dir import TempDirectory, global_tempdir_manager, tempdir_registry
+from pip._vendor.packaging.utils import parse_wheel_filename
+
+from cache import file_digest
+from pipbatch import DOWNLOAD_JOBS, BatchInstaller, ParallelBatchDownloader
+
+
+def _slug(label: str) -> str:
+    """``label`` as a file name part; anything else than ``[A-Za-z0-9._-]`` is replaced.
+
+    A label that had to be changed gets a short digest of the original so
+    that ``"a/b"`` and ``"a-b"`` stay apart.
+    """
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "-", label).strip(".-")
+    if slug != label:
+        slug = f"{slug}-{hashlib.sha256(label.encode()).hexdigest()[:8]}".lstrip("-")
+    return slug
+
+
+class WheelBundle:
+    """A directory of wheels plus a hash-indexed manifest, shared between selections."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = os.path.abspath(os.fspath(root))
+        self.wheels = os.path.join(self.root, "wheels")
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        os.makedirs(self.wheels, exist_ok=True)
+        self._lock = threading.Lock()
+        try:
+            with open(self.manifest_path, encoding="utf-8") as fh:
+                self.manifest = json.load(fh)
+        except (OSError, ValueError):
+            self.manifest = {"files": {}, "selections": {}}
+
+    def _save(self):
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self.manifest, fh, indent=1, sort_keys=True)
+        os.replace(tmp, self.manifest_path)
+
+    def requirements_path(self, label: str) -> str:
+        return os.path.join(self.root, f"requirements-{_slug(label)}.txt")
+
+    def prefetch(self, label: str, names: Sequence[str], platforms: Sequence[str] = (),
+                 python_version: str | None = None, implementation: str | None = None,
+                 abis: Sequence[str] = (), index_args: Sequence[str] = (),
+                 jobs: int = DOWNLOAD_JOBS) -> dict[str, str]:
+        """Fetch wheels for ``names`` and their dependencies; returns ``{name: version}``.
+
+        The target defaults to the running interpreter.  Only wheels are
+        accepted, since sdists cannot be built for another platform.
+        """
+        args = ["--only-binary=:all:", "--dest", self.wheels, *index_args]
+        args += [f"--platform={platform}" for platform in platforms]
+        args += [f"--abi={abi}" for abi in abis]
+        if python_version:
+            args.append(f"--python-version={python_version}")
+        if implementation:
+            args.append(f"--implementation={implementation}")
+
+        command = create_command("download", isolated=False)
+        with command.main_context():
+            command.tempdir_registry = command.enter_context(tempdir_registry())
+            command.enter_context(global_tempdir_manager())
+            options, _ = command.parse_args(args)
+            options.ignore_installed = True
+            options.editables = []
+            cmdoptions.check_dist_restriction(options)
+            command.verbosity = options.verbose - options.quiet
+            session = command.get_default_session(options)
+            finder = command._build_package_finder(
+                options=options, session=session, target_python=make_target_python(options),
+                ignore_requires_python=options.ignore_requires_python)
+            build_tracker = command.enter_context(get_build_tracker())
+            directory = TempDirectory(delete=not options.no_clean, kind="download", globally_managed=True)
+            reqs = command.get_requirements(list(names), options, finder, session)
+            # Wheels already in the bundle are picked up from the download dir.
+            preparer = command.make_requirement_preparer(
+                temp_build_dir=directory, options=options, build_tracker=build_tracker,
+                session=session, finder=finder, download_dir=self.wheels, use_user_site=False,
+                verbosity=command.verbosity)
+            preparer._batch_download = ParallelBatchDownloader(session, jobs)
+            resolver = command.make_resolver(
+                preparer=preparer, finder=finder, options=options,
+                ignore_requires_python=options.ignore_requires_python,
+                use_pep517=options.use_pep517, py_version_info=options.python_version)
+            requirement_set = resolver.resolve(reqs, check_supported_wheels=True)
+            pinned = {}
+            for req in requirement_set.requirements.values():
+                preparer.save_linked_requirement(req)
+                pinned[req.link.filename] = (req.name, req.metadata["Version"], req.link.url_without_fragment)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            entries = dict(zip(pinned, executor.map(self._file_entry, pinned)))
+        with self._lock:
+            for filename, (name, version, url) in pinned.items():
+                self.manifest["files"][filename] = {**entries[filename], "url": url}
+            self.manifest["selections"][label] = {
+                "names": sorted(names),
+                "platforms": list(platforms),
+                "python_version": python_version,
+                "implementation": implementation,
+                "abis": list(abis),
+                "files": sorted(pinned),
+            }
+            self._save()
+            self._write_requirements(label)
+        return {name: version for name, version, _ in sorted(pinned.values())}
+
+    def _file_entry(self, filename: str) -> dict:
+        path = os.path.join(self.wheels, filename)
+        size = os.path.getsize(path)
+        with self._lock:
+            known = self.manifest["files"].get(filename)
+        if known and known["size"] == size:
+            return known
+        return {"sha256": file_digest(path), "size": size}
+
+    def _write_requirements(self, label: str):
+        lines = []
+        for filename in self.manifest["selections"][label]["files"]:
+            name, version, _, _ = parse_wheel_filename(filename)
+            lines.append(f"{name}=={version} "
+                         f"--hash=sha256:{self.manifest['files'][filename]['sha256']}")
+        with open(self.requirements_path(label), "w", encoding="utf-8") as fh:
+            fh.write("\n".join(sorted(lines)) + "\n")
+
+    def verify(self) -> list[str]:
+        """Files that are missing or no longer match the manifest."""
+        def bad(item):
+            filename, entry = item
+            path = os.path.join(self.wheels, filename)
+            return not os.path.exists(path) or file_digest(path) != entry["sha256"]
+
+        with self._lock:
+            files = list(self.manifest["files"].items())
+        with ThreadPoolExecutor() as executor:
+            return [filename for (filename, _), failed in zip(files, executor.map(bad, files)) if failed]
+
+    def install_args(self, label: str) -> list[str]:
+        """``pip install`` options that install selection ``label`` from the bundle only."""
+        return ["--no-index", "--find-links", self.wheels, "--require-hashes",
+                "--requirement", self.requirements_path(label)]
+
+    def installer(self, label: str) -> BatchInstaller:
+        """A ``BatchInstaller`` for ``label``; call ``install([])`` on it."""
+        return BatchInstaller(self.install_args(label))
@@ -0,0 +1,85 @@
+# This Python file uses the following encoding: utf-8
+"""Coalesced progress reporting from download workers to the UI.
+
+Workers call ``ProgressAggregator.advance`` for every chunk; that only bumps
+a counter under a lock.  The UI drains the aggregator once per frame and gets
+at most one entry per job, however many chunks arrived in between, so the
+cost on the GUI side depends on the frame rate, not on the transfer rate.
+A job that has finished is forgotten once its final state has been drained.
+"""
+import math
+import threading
+
+FINISHED = frozenset({"done", "failed", "cancelled"})
+
+
+class RateEstimator:
+    """Exponentially smoothed transfer rate with a time constant of ``tau`` seconds."""
+
+    def __init__(self, tau: float = 2.0):
+        self.tau = tau
+        self.rate = 0.0
+        self._stamp: float | None = None
+        self._done = 0
+
+    def sample(self, now: float, done: int) -> float:
+        if self._stamp is None or done < self._done:  # first sample, or the transfer restarted
+            self._stamp, self._done = now, done
+            return self.rate
+        elapsed = now - self._stamp
+        if elapsed <= 0:
+            return self.rate
+        instant = (done - self._done) / elapsed
+        self.rate += (1 - math.exp(-elapsed / self.tau)) * (instant - self.rate)
+        self._stamp, self._done = now, done
+        return self.rate
+
+    def eta(self, remaining: int) -> float:
+        """Seconds left, or ``-1`` while the rate is unknown."""
+        if remaining <= 0:
+            return 0.0
+        return remaining / self.rate if self.rate > 1 else -1.0
+
+
+class ProgressAggregator:
+    """Latest counters per job id, plus the set of jobs touched since the last drain."""
+
+    def __init__(self):
+        self._entries: dict[int, dict] = {}
+        self._dirty: set[int] = set()
+        self._lock = threading.Lock()
+
+    def add(self, key: int, name: str, total: int = 0):
+        with self._lock:
+            self._entries[key] = {"name": name, "done": 0, "total": total, "state": "queued", "error": ""}
+            self._dirty.add(key)
+
+    def advance(self, key: int, amount: int):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:  # finished and drained; a late chunk changes nothing
+                return
+            entry["done"] += amount
+            self._dirty.add(key)
+
+    def update(self, key: int, **fields):
+        """Set ``total``, ``state`` or ``error`` of a job."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.update(fields)
+            self._dirty.add(key)
+
+    def drain(self) -> list[tuple[int, dict]]:
+        """Copies of every entry changed since the previous call.
+
+        Entries in a ``FINISHED`` state are returned one last time and dropped.
+        """
+        with self._lock:
+            changed = [(key, dict(self._entries[key])) for key in self._dirty]
+            self._dirty.clear()
+            for key, entry in changed:
+                if entry["state"] in FINISHED:
+                    del self._entries[key]
+        return changed
@@ -0,0 +1,228 @@
+# This Python file uses the following encoding: utf-8
+"""Optional "all of PyPI" catalog kept current from the changelog serial.
+
+Every change on PyPI bumps a global serial.  ``PyPISync.bulk_load`` stores
+all project names with the serial they were last changed at
+(``list_packages_with_serial``).  ``sync`` then asks only for what changed
+since the last serial seen (``changelog_since_serial``) and marks those
+projects stale, and ``refresh_summaries`` fetches the JSON metadata of stale
+projects, several at a time.  Before any of that, the ``X-PyPI-Last-Serial``
+header of the simple index root answers "did anything change?" with a
+single request.  XML-RPC goes through pip's ``PipXmlrpcTransport`` and
+everything shares one ``PipSession``.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+from pip._internal.exceptions import NetworkConnectionError
+from pip._internal.network.session import PipSession
+from pip._internal.network.utils import raise_for_status
+from pip._internal.network.xmlrpc import PipXmlrpcTransport
+from pip._vendor.packaging.utils import canonicalize_name
+from pip._vendor.requests.exceptions import RequestException
+
+from catalog import Catalog
+
+logger = logging.getLogger(__name__)
+
+PYPI = "https://pypi.org/"
+CONNECTIONS = 8
+LAST_SERIAL_HEADER = "X-PyPI-Last-Serial"
+
+
+class SyncError(Exception):
+    """The index could not be reached or gave an unusable answer."""
+
+
+class PyPISync:
+    """Project names and summaries of a whole index, in SQLite at ``path``.
+
+    ``base_url`` is the index root serving ``/pypi`` (XML-RPC and JSON) and
+    ``/simple/``.
+    """
+
+    def __init__(self, path: str | os.PathLike, base_url: str = PYPI, session: PipSession | None = None,
+                 connections: int = CONNECTIONS):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.session = session or PipSession()
+        self.connections = connections
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        with self._db:
+            # ``serial`` is when the project last changed, ``fetched`` the
+            # serial its summary was read at; they differ for stale rows.
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS projects (
+                    name TEXT PRIMARY KEY, display TEXT NOT NULL, summary TEXT NOT NULL DEFAULT '',
+                    version TEXT NOT NULL DEFAULT '', serial INTEGER NOT NULL,
+                    fetched INTEGER NOT NULL DEFAULT -1)
+            """)
+            self._db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER)")
+
+    def _proxy(self) -> xmlrpc.client.ServerProxy:
+        transport = PipXmlrpcTransport(self.base_url, self.session)
+        return xmlrpc.client.ServerProxy(urljoin(self.base_url, "pypi"), transport)
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self._proxy(), method)(*args)
+        except (xmlrpc.client.Error, RequestException, NetworkConnectionError, OSError) as exc:
+            raise SyncError(f"{method}: {exc}") from exc
+
+    @property
+    def serial(self) -> int | None:
+        """The last changelog serial applied, or ``None`` before ``bulk_load``."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE key = 'serial'").fetchone()
+        return row[0] if row else None
+
+    def _set_serial(self, serial: int):
+        self._db.execute("INSERT OR REPLACE INTO state VALUES ('serial', ?)", (serial,))
+
+    def last_serial(self) -> int:
+        """The index's current serial, from the simple root's header if it has one."""
+        try:
+            response = self.session.head(urljoin(self.base_url, "simple/"), allow_redirects=True)
+            raise_for_status(response)
+            if LAST_SERIAL_HEADER in response.headers:
+                return int(response.headers[LAST_SERIAL_HEADER])
+        except (RequestException, NetworkConnectionError, ValueError) as exc:
+            logger.info("no serial header: %s", exc)
+        return int(self._call("changelog_last_serial"))
+
+    def bulk_load(self) -> int:
+        """Replace the stored names with the index's full list; returns the project count.
+
+        Summaries already fetched are kept for projects that have not changed.
+        """
+        # Read the serial first so changes made during the listing are replayed.
+        serial = int(self._call("changelog_last_serial"))
+        packages = self._call("list_packages_with_serial")
+        rows = [(canonicalize_name(name), name, int(project_serial)) for name, project_serial in packages.items()]
+        with self._lock, self._db:
+            # DDL is not part of sqlite3's implicit transaction, so a failed
+            # load leaves the table behind; start from a clean one.
+            self._db.execute("DROP TABLE IF EXISTS listed")
+            self._db.execute("CREATE TEMP TABLE listed (name TEXT PRIMARY KEY, display TEXT, serial INTEGER)")
+            self._db.executemany("INSERT OR REPLACE INTO listed VALUES (?, ?, ?)", rows)
+            self._db.execute("DELETE FROM projects WHERE name NOT IN (SELECT name FROM listed)")
+            self._db.execute("""
+                INSERT INTO projects (name, display, serial) SELECT name, display, serial FROM listed WHERE true
+                ON CONFLICT (name) DO UPDATE SET display = excluded.display, serial = excluded.serial
+            """)
+            self._db.execute("DROP TABLE listed")
+            self._set_serial(serial)
+        return len(rows)
+
+    def sync(self) -> list[str]:
+        """Apply the changelog since the stored serial; returns the changed projects.
+
+        Loads everything first if nothing is stored yet.
+        """
+        since = self.serial
+        if since is None:
+            self.bulk_load()
+            return []
+        if self.last_serial() <= since:
+            return []
+        changed: dict[str, tuple[str, int, bool]] = {}  # key -> display, serial, removed
+        for name, version, timestamp, action, serial in self._call("changelog_since_serial", since):
+            removed = action == "remove project"
+            changed[canonicalize_name(name)] = (name, int(serial), removed)
+            since = max(since, int(serial))
+        with self._lock, self._db:
+            for key, (display, serial, removed) in changed.items():
+                if removed:
+                    self._db.execute("DELETE FROM projects WHERE name = ?", (key,))
+                else:
+                    self._db.execute("""
+                        INSERT INTO projects (name, display, serial) VALUES (?, ?, ?)
+                        ON CONFLICT (name) DO UPDATE SET serial = excluded.serial
+                    """, (key, display, serial))
+            self._set_serial(since)
+        return sorted(changed)
+
+    def stale(self, limit: int | None = None) -> list[str]:
+        """Projects whose summary is missing or older than their last change."""
+        with self._lock:
+            rows = self._db.execute("SELECT name FROM projects WHERE fetched < serial ORDER BY name LIMIT ?",
+                                    (-1 if limit is None else limit,)).fetchall()
+        return [name for name, in rows]
+
+    def _fetch_summary(self, key: str) -> tuple[str, str, str] | None:
+        try:
+            response = self.session.get(urljoin(self.base_url, f"pypi/{key}/json"))
+            if response.status_code == 404:
+                return None
+            raise_for_status(response)
+            info = response.json()["info"]
+        except (RequestException, NetworkConnectionError, ValueError, KeyError) as exc:
+            logger.info("could not fetch %s: %s", key, exc)
+            return None
+        return info["name"], info.get("summary") or "", info.get("version") or ""
+
+    def refresh_summaries(self, names=None, limit: int | None = None) -> int:
+        """Fetch summaries of ``names`` (default: stale projects), ``connections`` at once.
+
+        Returns how many were updated.  A project that changes again while
+        its summary is fetched stays stale.
+        """
+        keys = [canonicalize_name(name) for name in names] if names is not None else self.stale(limit)
+        if not keys:
+            return 0
+        with self._lock:
+            serials = dict(self._db.execute(
+                f"SELECT name, serial FROM projects WHERE name IN ({','.join('?' * len(keys))})", keys))
+        updated = 0
+
+        def refresh(key: str):
+            nonlocal updated
+            result = self._fetch_summary(key)
+            if result is None:
+                return
+            display, summary, version = result
+            with self._lock, self._db:
+                self._db.execute("UPDATE projects SET display = ?, summary = ?, version = ?, fetched = ? "
+                                 "WHERE name = ?", (display, summary, version, serials.get(key, 0), key))
+                updated += 1
+
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(keys))) as executor:
+            list(executor.map(refresh, keys))
+        return updated
+
+    def catalog(self) -> Catalog:
+        """Every project with its summary, by name, for ``snapshot.build_snapshot``."""
+        with self._lock:
+            rows = self._db.execute("SELECT display, summary FROM projects ORDER BY name").fetchall()
+        return Catalog([display for display, _ in rows], [summary for _, summary in rows])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from snapshot import SYNC_PATH, build_layer
+
+    parser = argparse.ArgumentParser(description="Sync all of PyPI into the catalog's sync layer.")
+    parser.add_argument("database", help="SQLite file holding the synced index")
+    parser.add_argument("--index", default=PYPI)
+    parser.add_argument("--summaries", type=int, default=None, metavar="N",
+                        help="fetch at most N stale summaries (default: all)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    sync = PyPISync(args.database, args.index)
+    changed = sync.sync()
+    print(f"serial {sync.serial}, {len(changed)} changed, {sync.refresh_summaries(limit=args.summaries)} fetched")
+    synced = sync.catalog()
+    sync.close()
+    # Kept apart from the inf layer; load_catalog leaves out what inf lists.
+    build_layer(synced, SYNC_PATH)
+    print(f"{len(synced)} entries -> {SYNC_PATH}")
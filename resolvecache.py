@@ -0,0 +1,282 @@
+# This Python file uses the following encoding: utf-8
+"""Persistent cache of resolver results for repeated ``pip_libraries`` installs.
+
+Provisioning installs the same selections over and over, and every time
+pip's resolvelib ``Resolver`` fetches metadata and may backtrack as if it
+had never seen them.  ``ResolutionCache`` stores the pinned outcome
+(``name==version`` for every package in the resolver's result, installed
+ones included, plus the dependency edges the install waves need) in SQLite.
+The key is built from:
+
+- the normalized requirement set;
+- the pip options that change what resolves (index URLs, ``--pre``,
+  binary-only settings, the upgrade strategy, constraints files);
+- the target's tags and Python version.
+
+Each entry also carries a fingerprint of the index metadata it was
+resolved against.  For every pinned project, that is a digest of the files
+on its simple-API page that the target could install.  Checking an entry
+revalidates those pages through ``IndexCache``, which costs one conditional
+request per project and nothing for pages fresher than ``max_age``.  An
+upload or a yank that could change the outcome discards the entry, while a
+new wheel for another platform does not.  Installed versions that differ
+from the pins discard it too, since pip keeps installed distributions that
+already satisfy a requirement, and so does a closure that no longer holds:
+a requirement the pins do not satisfy or a dependency edge to a project
+that is not pinned.  ``BatchInstaller`` installs a hit as plain pins without
+following dependencies, so nothing is resolved again.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Sequence
+
+from pip._internal.index.package_finder import PackageFinder
+from pip._internal.models.target_python import TargetPython
+from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+from pip._vendor.packaging.utils import canonicalize_name
+from pip._vendor.packaging.version import Version
+
+from indexcache import IndexCache, ProjectIndex
+from indexfetch import IndexFetcher
+from installed import InstalledIndex
+from streamparse import PageFilter
+from tagindex import supported_tags
+
+FORMAT = 2  # part of every key; bump when keys or stored fields change
+
+
+@dataclass
+class Pin:
+    name: str
+    version: str
+    filename: str | None = None  # the file the resolver picked, if it picked one
+    installed: bool = False  # the resolver kept the installed distribution
+
+    @property
+    def requirement(self) -> str:
+        return f"{self.name}=={self.version}"
+
+
+@dataclass
+class Resolution:
+    pins: list[Pin]
+    edges: dict[str, list[str]] = field(default_factory=dict)  # name -> dependencies
+    fingerprint: str = ""
+    created: float = 0.0
+    requirements: list[str] = field(default_factory=list)  # as given to ``store``, normalized
+
+
+def normalize_requirements(names: Sequence[str]) -> list[str] | None:
+    """Sorted canonical requirement strings; ``None`` if any is not a plain index requirement."""
+    normalized = set()
+    for name in names:
+        try:
+            req = Requirement(name)
+        except InvalidRequirement:
+            return None  # a path, a URL or an option line
+        if req.url:
+            return None
+        extras = f"[{','.join(sorted(map(canonicalize_name, req.extras)))}]" if req.extras else ""
+        marker = f"; {req.marker}" if req.marker else ""
+        normalized.add(f"{canonicalize_name(req.name)}{extras}{req.specifier}{marker}")
+    return sorted(normalized)
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _option_key(options) -> dict:
+    # Everything in ``pip install`` options that can change the resolver's answer.
+    format_control = options.format_control
+    return {
+        "index": [] if options.no_index else [options.index_url, *options.extra_index_urls],
+        "find_links": list(options.find_links),
+        "pre": options.pre,
+        "no_binary": sorted(format_control.no_binary),
+        "only_binary": sorted(format_control.only_binary),
+        "prefer_binary": options.prefer_binary,
+        "upgrade": options.upgrade_strategy if options.upgrade else None,
+        "ignore_installed": options.ignore_installed,
+        "ignore_requires_python": options.ignore_requires_python,
+        "constraints": [(path, _file_digest(path)) for path in options.constraints],
+    }
+
+
+class ResolutionCache:
+    """Pinned resolver results in SQLite at ``path``, checked against ``index``.
+
+    Entries are only used for installs from the index ``index`` caches;
+    ``installed`` is the environment pins are checked against.
+    """
+
+    def __init__(self, path: str | os.PathLike, index: IndexCache, installed: InstalledIndex | None = None):
+        self.index = index
+        self.installed = installed or InstalledIndex()
+        self._filters: dict[tuple, PageFilter] = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.fspath(path), check_same_thread=False)
+        with self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS resolutions (
+                    key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, created REAL NOT NULL,
+                    resolution BLOB NOT NULL)
+            """)
+
+    def _filter(self, target: TargetPython) -> PageFilter:
+        key = (target.py_version_info, tuple(target.platforms or ()), tuple(target.abis or ()),
+               target.implementation)
+        if key not in self._filters:
+            self._filters[key] = PageFilter(target)
+        return self._filters[key]
+
+    def key(self, names: Sequence[str], options, target: TargetPython) -> str | None:
+        """The cache key of installing ``names`` with ``options`` for ``target``.
+
+        ``None`` if this install cannot be cached: a requirement is not a
+        plain name and specifier, or the options use another index.
+        """
+        requirements = normalize_requirements(names)
+        if requirements is None or options.no_index or options.find_links or options.extra_index_urls:
+            return None
+        if options.index_url.rstrip("/") + "/" != self.index.index_url:
+            return None
+        try:
+            option_key = _option_key(options)
+        except OSError:
+            return None  # unreadable constraints file; let pip report it
+        document = {
+            "format": FORMAT,
+            "requirements": requirements,
+            "options": option_key,
+            "python": list(target.py_version_info),
+            "tags": [str(tag) for tag in supported_tags(target)],
+        }
+        return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+    def fingerprint(self, names: Sequence[str], target: TargetPython) -> str | None:
+        """Digest of the files of ``names`` that ``target`` could install, by index page.
+
+        Stale pages are revalidated first; ``None`` if a page is neither
+        cached nor reachable.
+        """
+        names = sorted({canonicalize_name(name) for name in names})
+        self.index.refresh_many(names)
+        compat = self._filter(target)
+        digest = hashlib.sha256()
+        for name in names:
+            project = self.index.get(name)
+            if project is None:
+                return None
+            files = sorted((f.filename, f.yanked is not None) for f, _ in compat.select(name, project.files))
+            digest.update(json.dumps([name, files]).encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _closed(resolution: Resolution) -> bool:
+        # Every requirement is met by a pin and every dependency is pinned.
+        pinned = {canonicalize_name(pin.name): Version(pin.version) for pin in resolution.pins}
+        for requirement in map(Requirement, resolution.requirements):
+            if requirement.marker is not None and not requirement.marker.evaluate():
+                continue
+            version = pinned.get(canonicalize_name(requirement.name))
+            if version is None or not requirement.specifier.contains(version, prereleases=True):
+                return False
+        return all(name in pinned and set(deps) <= pinned.keys() for name, deps in resolution.edges.items())
+
+    def _environment_agrees(self, pins: list[Pin]) -> bool:
+        snapshot = self.installed.snapshot()
+        for pin in pins:
+            dist = snapshot.get(canonicalize_name(pin.name))
+            installed = dist.version if dist else None
+            if installed is None and pin.installed:
+                return False  # pip picked what was installed then; it would pick afresh now
+            if installed is not None and installed != pin.version:
+                return False  # pip might keep that version instead of the pin
+        return True
+
+    def lookup(self, key: str, target: TargetPython) -> Resolution | None:
+        """The stored resolution for ``key`` if it still holds, else ``None`` (and it is dropped)."""
+        with self._lock:
+            row = self._db.execute("SELECT resolution FROM resolutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        stored = json.loads(zlib.decompress(row[0]))
+        resolution = Resolution([Pin(**pin) for pin in stored["pins"]], stored["edges"],
+                                stored["fingerprint"], stored["created"], stored["requirements"])
+        if not self._closed(resolution):
+            self.discard(key)
+            return None
+        fingerprint = self.fingerprint([pin.name for pin in resolution.pins], target)
+        if fingerprint != resolution.fingerprint or not self._environment_agrees(resolution.pins):
+            self.discard(key)
+            return None
+        return resolution
+
+    def store(self, key: str, names: Sequence[str], pins: list[Pin], edges: dict[str, set[str]],
+              target: TargetPython) -> Resolution | None:
+        """Remember the resolver result for ``names``: every project it settled on.
+
+        ``None`` if it is not a closure or its index pages could not be
+        fingerprinted.
+        """
+        resolution = Resolution(pins, {name: sorted(deps) for name, deps in edges.items()},
+                                requirements=normalize_requirements(names) or [])
+        if not self._closed(resolution):
+            return None
+        resolution.fingerprint = self.fingerprint([pin.name for pin in pins], target)
+        if resolution.fingerprint is None:
+            return None
+        resolution.created = time.time()
+        blob = zlib.compress(json.dumps(asdict(resolution), separators=(",", ":")).encode())
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, ?)",
+                             (key, resolution.fingerprint, resolution.created, blob))
+        return resolution
+
+    @contextmanager
+    def pinned_candidates(self, finder: PackageFinder, resolution: Resolution):
+        """Within the block ``finder`` lists only the pinned release of pinned projects.
+
+        The candidates come from the pages ``lookup`` just revalidated, so pip
+        neither fetches those pages again nor evaluates every file on them.
+        """
+        pins = {canonicalize_name(pin.name): Version(pin.version) for pin in resolution.pins}
+        fetcher = IndexFetcher(self.index, finder)
+        find_all_candidates = finder.find_all_candidates
+
+        def pinned(project_name: str):
+            key = canonicalize_name(project_name)
+            project = self.index.get(key) if key in pins else None
+            if project is not None:
+                files = [f for f in project.files if f.version and Version(f.version) == pins[key]]
+                candidates = fetcher.candidates(ProjectIndex(project.name, project.url, files))
+                if candidates:
+                    return candidates
+            return find_all_candidates(project_name)
+
+        finder.find_all_candidates = pinned
+        try:
+            yield
+        finally:
+            del finder.find_all_candidates
+
+    def discard(self, key: str):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM resolutions WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM resolutions")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
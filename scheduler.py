@@ -0,0 +1,270 @@
+# This Python file uses the following encoding: utf-8
+"""Run several downloads at once under shared bandwidth and connection budgets.
+
+Jobs wait in a priority queue and up to ``max_jobs`` of them run together.
+All jobs share one ``ConnectionPool`` (which caps connections per host, so the
+mirror is not flooded) and one ``TokenBucket`` (the global bandwidth cap).
+With a ``ContentStore`` attached, files already in the store are not fetched.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from cache import ContentStore
+from downloader import ConnectionPool, SegmentedDownloader
+from hashing import Hashes
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class TokenBucket:
+    """Byte budget refilled at ``rate`` bytes per second; ``0`` disables it."""
+
+    def __init__(self, rate: float = 0):
+        self.rate = rate
+        self._tokens = rate
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self.rate = rate
+            self._tokens = min(self._tokens, rate)
+
+    def reserve(self, amount: int) -> float:
+        """Take ``amount`` bytes from the budget; returns seconds to wait.
+
+        The bucket may go into debt, so callers that share it queue up
+        behind one another instead of polling.
+        """
+        with self._lock:
+            if not self.rate:
+                return 0.0
+            now = time.monotonic()
+            self._tokens = min(self.rate, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def consume(self, amount: int):
+        """Block until ``amount`` bytes may pass."""
+        wait = self.reserve(amount)
+        if wait:
+            time.sleep(wait)
+
+
+@dataclass
+class Job:
+    url: str
+    dest: str
+    name: str = ""
+    priority: int = 0
+    hashes: Hashes | None = None
+    state: str = QUEUED
+    size: int | None = None
+    done: int = 0
+    error: str = ""
+    cached: bool = False
+    started: float = 0.0
+    finished: float = 0.0
+    id: int = 0  # unique per scheduler; progress rows are keyed by it
+    sink: object = field(default=None, repr=False)  # a ProgressAggregator
+    _window: list = field(default_factory=list, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def advance(self, amount: int):
+        now = time.monotonic()
+        with self._lock:
+            self.done += amount
+            if amount < 0:  # the download started over; so does the rate
+                self._window.clear()
+            self._window.append((now, self.done))
+            while len(self._window) > 2 and now - self._window[0][0] > 3:
+                self._window.pop(0)
+        if self.sink:
+            self.sink.advance(self.id, amount)
+
+    def publish(self):
+        """Push state, size and error to the progress sink."""
+        if self.sink:
+            self.sink.update(self.id, state=self.state, total=self.size or 0, error=self.error)
+
+    @property
+    def rate(self) -> float:
+        """Bytes per second over the last few seconds."""
+        with self._lock:
+            if self.state != RUNNING or len(self._window) < 2:
+                return 0.0
+            (t0, b0), (t1, b1) = self._window[0], self._window[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "state": self.state,
+            "size": self.size or 0,
+            "done": self.done,
+            "rate": self.rate,
+            "error": self.error,
+            "cached": self.cached,
+        }
+
+
+class JobQueue(ABC):
+    """Jobs waiting to run: higher ``priority`` first, equal priorities in submission order.
+
+    What the threaded ``DownloadScheduler`` and ``aio.AsyncScheduler`` share:
+    submission, one job per destination, cancellation and shutdown, plus the
+    bandwidth bucket.  ``manifest`` maps file names to the ``Hashes`` a job
+    for that file must match when ``submit`` is given none, as read by
+    ``hashing.load_manifest``.  Subclasses wake their workers in ``_wake``, which is
+    called with ``_cond`` held.
+    """
+
+    def __init__(self, bandwidth: float = 0, progress=None):
+        self.progress = progress
+        self.manifest: dict[str, Hashes] = {}
+        self.bucket = TokenBucket(bandwidth)
+        self._heap: list = []
+        self._order = itertools.count()
+        self._ids = itertools.count(1)
+        self._jobs: list[Job] = []
+        self._by_dest: dict[str, Job] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    @abstractmethod
+    def _wake(self):
+        """Let idle workers look at the queue again."""
+
+    def submit(self, url: str, dest: str | os.PathLike, priority: int = 0, name: str = "",
+               hashes: Hashes | None = None) -> Job:
+        """Queue ``url`` for ``dest``; an unfinished job for the same pair is returned instead.
+
+        Without ``hashes``, the manifest entry for the URL's file name applies.
+
+        Raises ``ValueError`` if another URL is still being fetched to
+        ``dest``: two jobs would write the same ``.part`` file and journal.
+        """
+        filename = os.path.basename(urlsplit(url).path)
+        job = Job(url, os.fspath(dest), name or filename, priority, hashes or self.manifest.get(filename))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("scheduler is shut down")
+            existing = self._by_dest.get(job.dest)
+            if existing is not None and existing.state in (QUEUED, RUNNING):
+                if existing.url != url:
+                    raise ValueError(f"{job.dest} is already being downloaded from {existing.url}")
+                return existing
+            job.id = next(self._ids)
+            self._by_dest[job.dest] = job
+            self._jobs.append(job)
+            if self.progress:
+                job.sink = self.progress
+                self.progress.add(job.id, job.name)
+            heapq.heappush(self._heap, (-priority, next(self._order), job))
+            self._wake()
+        return job
+
+    def cancel(self, job: Job) -> bool:
+        """Drop a job that has not started yet."""
+        with self._cond:
+            if job.state != QUEUED:
+                return False
+            job.state = CANCELLED
+        job.publish()
+        return True
+
+    def jobs(self) -> list[Job]:
+        with self._cond:
+            return list(self._jobs)
+
+    def set_bandwidth(self, rate: float):
+        self.bucket.set_rate(rate)
+
+    def _pop(self) -> Job | None:
+        """The next queued job, now running; call with ``_cond`` held."""
+        while self._heap:
+            job = heapq.heappop(self._heap)[2]
+            if job.state == QUEUED:
+                job.state = RUNNING
+                job.publish()
+                return job
+        return None
+
+    def _close(self, cancel_pending: bool):
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                for _, _, job in self._heap:
+                    if job.state == QUEUED:
+                        job.state = CANCELLED
+                        job.publish()
+                self._heap.clear()
+            self._wake()
+
+
+class DownloadScheduler(JobQueue):
+    """Priority queue of downloads with global budgets, run on ``max_jobs`` threads."""
+
+    def __init__(self, max_jobs: int = 4, bandwidth: float = 0, per_host: int = 8,
+                 segments: int = 8, store: ContentStore | None = None, progress=None,
+                 mirrors=None):
+        super().__init__(bandwidth, progress)
+        self.max_jobs = max_jobs
+        self.store = store
+        self.pool = ConnectionPool(max_per_host=per_host)
+        self.downloader = SegmentedDownloader(self.pool, segments=segments, limiter=self.bucket,
+                                              mirrors=mirrors)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"download-{i}", daemon=True)
+            for i in range(max_jobs)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _wake(self):
+        self._cond.notify_all()
+
+    def _next(self) -> Job | None:
+        with self._cond:
+            while (job := self._pop()) is None and not self._closed:
+                self._cond.wait()
+            return job
+
+    def _work(self):
+        while (job := self._next()) is not None:
+            self._run(job)
+
+    def _run(self, job: Job):
+        job.started = time.monotonic()
+        try:
+            remote, sources = self.downloader.locate(job.url)
+            job.size = remote.size
+            job.publish()
+            if self.store:
+                _, job.cached = self.store.fetch(self.downloader, job.url, job.dest, job.advance,
+                                                 remote, job.hashes, sources)
+            else:
+                self.downloader.download(job.url, job.dest, on_progress=job.advance, remote=remote,
+                                         hashes=job.hashes, sources=sources)
+            job.state = DONE
+        except Exception as exc:
+            job.error = str(exc)
+            job.state = FAILED
+        job.finished = time.monotonic()
+        job.publish()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """Stop accepting jobs; queued ones still run unless ``cancel_pending``."""
+        self._close(cancel_pending)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        self.pool.close()
@@ -0,0 +1,286 @@
+# This Python file uses the following encoding: utf-8
+"""Search-as-you-type over catalog names and descriptions.
+
+``SearchIndex`` is an inverted index from n-grams to sorted arrays of
+document ids.  Latin words are indexed as trigrams of ``^word$``, plus the
+``^w`` bigram so one typed letter already narrows the list; CJK runs are
+indexed as single characters and bigrams, since Chinese descriptions have
+no spaces to split words on.  Document ids are assigned shortest name first,
+so intersecting posting lists a window of ids at a time yields the likeliest
+matches first and a common prefix such as ``py`` stops after a screenful
+instead of scanning every ``python-*`` project.  Each keystroke is held to a
+budget of postings intersected and binary searches, which keeps it within
+a few milliseconds on a catalog of half a million names.
+
+A query first looks for documents containing all of its grams.  If that
+finds too little, up to a few grams per typo may be missing ("pandsa" still
+finds pandas); candidates then come from the rarest posting lists only, as
+a document missing ``k`` grams must appear in one of the ``k + 1`` shortest
+lists.  Results are ranked by grams matched, then exact name, name prefix
+and name substring matches, then name length.
+"""
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Sequence
+
+from catalog import CatalogEntry
+
+RESULTS = 50
+SCAN_BUDGET = 10000  # postings a fuzzy query counts; beyond that it checks or gets stricter
+CANDIDATES = 8  # fuzzy candidates ranked per result
+WINDOW = 256  # candidates intersected in the first step of an exact match
+EXACT_BUDGET = 40000  # postings an exact match intersects before settling for one screenful
+PROBE = 40  # postings intersected in the time of one binary search of an array
+CHECKS = 1000  # binary searches a fuzzy query spends on candidates
+INTERSECT = 4096  # posting lists up to this long are intersected whole before the windows
+
+_TOKEN = re.compile(r"[0-9a-z]+|[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+")
+_EMPTY = array("I")
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def _is_cjk(token: str) -> bool:
+    return not token[0].isascii()
+
+
+def document_grams(text: str) -> set[str]:
+    """Every gram of ``text`` that the index stores."""
+    grams = set()
+    for token in _TOKEN.findall(normalize(text)):
+        if _is_cjk(token):
+            grams.update(token)
+            grams.update(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            padded = f"^{token}$"
+            grams.add(padded[:2])
+            grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def query_grams(query: str) -> list[str]:
+    """Grams a document matching ``query`` contains; the last word may be unfinished."""
+    tokens = _TOKEN.findall(normalize(query))
+    finished = query[-1:].isspace()
+    grams = []
+    for i, token in enumerate(tokens):
+        if _is_cjk(token):
+            grams += [token] if len(token) == 1 else [token[j:j + 2] for j in range(len(token) - 1)]
+            continue
+        padded = f"^{token}$" if finished or i < len(tokens) - 1 else f"^{token}"
+        grams += [padded] if len(padded) == 2 else [padded[j:j + 3] for j in range(len(padded) - 2)]
+    return list(dict.fromkeys(grams))
+
+
+def allowed_misses(query: str, grams: int) -> int:
+    """Grams a fuzzy match may lack: about three per tolerated typo."""
+    length = len(normalize(query).replace(" ", ""))
+    typos = 0 if length < 4 else 1 if length < 9 else 2
+    return min(grams - 1, 3 * typos)
+
+
+def _contains(postings: array, doc: int, lo: int = 0, hi: int | None = None) -> bool:
+    i = bisect_left(postings, doc, lo, len(postings) if hi is None else hi)
+    return i < len(postings) and postings[i] == doc
+
+
+class SearchIndex:
+    """N-gram index over a catalog; ``search`` returns catalog rows, best first."""
+
+    def __init__(self, catalog: Sequence[CatalogEntry]):
+        self.catalog = catalog
+        names = [entry.name for entry in catalog]
+        rows = sorted(range(len(names)), key=lambda row: (len(names[row]), names[row].lower()))
+        self._rows = array("I", rows)  # document id -> catalog row
+        self._names = [normalize(names[row]) for row in rows]
+        postings: dict[str, list[int]] = {}
+        for doc, row in enumerate(rows):
+            entry = catalog[row]
+            for gram in document_grams(f"{entry.name} {entry.description}"):
+                postings.setdefault(gram, []).append(doc)
+        self._postings = {gram: array("I", docs) for gram, docs in postings.items()}
+
+    def postings(self, gram: str) -> array:
+        return self._postings.get(gram, _EMPTY)
+
+    def _exact(self, lists: list[array], need: int, want: int | None = None,
+               within: Sequence[int] | None = None) -> tuple[list[int], bool]:
+        # Documents in every list, in id order, and whether all were found.
+        # Stops at ``want`` (default ``need``) matches, or past ``need`` once
+        # ``EXACT_BUDGET`` postings' worth of work is spent.
+        want = want or need
+        lists = sorted(lists if within is None else [*lists, within], key=len)
+        # Short lists narrow the candidates at C speed; long ones are cut to
+        # the id range of each window of candidates before intersecting.
+        docs, windowed = lists[0], []
+        for postings in lists[1:]:
+            if len(postings) <= INTERSECT:
+                docs = set(docs).intersection(postings)
+            else:
+                windowed.append(postings)
+        if isinstance(docs, set):
+            docs = sorted(docs)
+        # Common grams: take the candidates a window at a time, in id order,
+        # hoping for enough matches before reaching the end.
+        # Lists go in the order they narrowed the previous window, so grams
+        # that always occur together (the trigrams of one word) come last.
+        found, start, window, work = [], 0, WINDOW, 0
+        kept = [1.0] * len(windowed)  # share of candidates each list kept
+        while start < len(docs):
+            chunk = docs[start:start + window]
+            start += window
+            matched = set(chunk)
+            work += len(chunk)
+            for i in sorted(range(len(windowed)), key=kept.__getitem__):
+                postings, before = windowed[i], len(matched)
+                lo, hi = bisect_left(postings, chunk[0]), bisect_right(postings, chunk[-1])
+                # A probe costs as much as intersecting a few dozen postings.
+                if PROBE * len(matched) < hi - lo:
+                    work += PROBE * len(matched)
+                    matched = {doc for doc in matched if _contains(postings, doc, lo, hi)}
+                else:
+                    matched.intersection_update(postings[lo:hi])
+                    work += hi - lo
+                kept[i] = len(matched) / before
+                if not matched:
+                    break
+            found += sorted(matched)
+            if len(found) >= want:
+                break
+            if len(found) >= need:
+                # A screenful is there: spend only what is left of the budget.
+                window = min(2 * window, (EXACT_BUDGET - work) * start // work)
+                if window <= 0:
+                    break
+            else:
+                window *= 2
+        return found, start >= len(docs)
+
+    def _fuzzy(self, lists: list[array], need: int, limit: int,
+               exact: list[int] | None = None) -> dict[int, int]:
+        # ``exact``, if given, is every document in all of ``lists``.
+        lists = sorted(lists, key=len)
+        # A document must be in one of the first ``len(lists) - need + 1``
+        # lists; make the query stricter until those fit the budget.
+        while need < len(lists) and sum(map(len, lists[:len(lists) - need + 1])) > SCAN_BUDGET:
+            need += 1
+        if need >= len(lists):  # no gram may be missing after all
+            if exact is None:
+                exact = self._exact(lists, limit, CANDIDATES * limit)[0]
+            return dict.fromkeys(exact, need)
+        counted, total = 0, 0
+        while counted < len(lists) and total + len(lists[counted]) <= SCAN_BUDGET:
+            total += len(lists[counted])
+            counted += 1
+        counted = max(counted, len(lists) - need + 1)
+        counts = Counter()
+        for postings in lists[:counted]:
+            counts.update(postings)
+        rest = lists[counted:]
+        # Only the best counted documents are checked against the other
+        # lists: raise the bar until about ``CANDIDATES * limit`` remain.
+        floor = need - len(rest)
+        histogram = Counter(counts.values())
+        kept = 0
+        for count in sorted(histogram, reverse=True):
+            if count < floor or kept and kept + histogram[count] > CANDIDATES * limit:
+                break
+            kept += histogram[count]
+            bar = count
+        if not kept:
+            return {}
+        # Best counts first, shortest names among equals; a document is
+        # dropped at the first miss it cannot afford, and checking stops
+        # after ``CHECKS`` probes.
+        levels = sorted((count for count in histogram if count >= bar), reverse=True)
+        candidates = (doc for level in levels for doc in sorted(doc for doc, count in counts.items()
+                                                                if count == level))
+        hits, probes, spare = {}, 0, len(rest)
+        for doc in candidates:
+            count = counts[doc]
+            for i, postings in enumerate(rest):
+                if count + spare - i < need:
+                    break
+                probes += 1
+                count += _contains(postings, doc)
+            if count >= need:
+                hits[doc] = count
+                if len(hits) >= CANDIDATES * limit:
+                    break
+            if probes >= CHECKS:
+                break
+        return hits
+
+    def _rank(self, query: str, hits: dict[int, int]) -> list[int]:
+        name = normalize(query).strip()
+
+        def key(doc: int):
+            own = self._names[doc]
+            closeness = 0 if own == name else 1 if own.startswith(name) else 2 if name in own else 3
+            return -hits[doc], closeness, abs(len(own) - len(name)), doc
+
+        return sorted(hits, key=key)
+
+    def search(self, query: str, limit: int = RESULTS, within: Sequence[int] | None = None) -> list[int]:
+        """Catalog rows matching ``query``, best first; see ``SearchSession`` for typing."""
+        return [self._rows[doc] for doc in self._search(query, limit, within)[0]]
+
+    def _search(self, query: str, limit: int,
+                within: Sequence[int] | None = None) -> tuple[list[int], list[int] | None]:
+        # Returns ranked document ids and, if the exact walk finished, every exact match.
+        grams = query_grams(query)
+        if not grams:
+            return [], None
+        lists = [self.postings(gram) for gram in grams]
+        # Over-fetch so the closeness ranking can reorder the first screenful.
+        exact, complete = self._exact(lists, limit, 4 * limit, within) if all(lists) else ([], True)
+        hits = dict.fromkeys(exact[:4 * limit], len(grams))
+        misses = allowed_misses(query, len(grams))
+        if len(exact) < limit and misses:
+            present = [postings for postings in lists if postings]
+            need = len(grams) - misses
+            if len(present) >= need:
+                # Short of ``limit`` the exact match ran to completion.
+                known = exact if len(present) == len(lists) else None
+                for doc, count in self._fuzzy(present, need, limit, known).items():
+                    hits.setdefault(doc, count)
+        return self._rank(query, hits)[:limit], exact if complete else None
+
+
+class SearchResults(Sequence):
+    """A catalog view of selected rows, for ``CatalogModel.setSource``."""
+
+    def __init__(self, catalog: Sequence[CatalogEntry], rows: Sequence[int]):
+        self._catalog = catalog
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, i: int) -> CatalogEntry:
+        return self._catalog[self._rows[i]]
+
+
+class SearchSession:
+    """Search-as-you-type: when a query extends the previous one, only the
+    previous exact matches are rechecked instead of the posting lists."""
+
+    def __init__(self, index: SearchIndex, limit: int = RESULTS):
+        self.index = index
+        self.limit = limit
+        self._query = None
+        self._exact: list[int] | None = None  # every exact match of ``_query``, if known
+
+    def search(self, query: str) -> list[int]:
+        within = None
+        if self._query and self._exact is not None and query.startswith(self._query) \
+                and not query[len(self._query):].isspace():
+            within = self._exact
+        docs, self._exact = self.index._search(query, self.limit, within)
+        self._query = query
+        return [self.index._rows[doc] for doc in docs]
@@ -0,0 +1,212 @@
+# This Python file uses the following encoding: utf-8
+"""Compact binary catalog, memory-mapped and decoded one row at a time.
+
+Layout, all integers little-endian ``uint32``::
+
+    header   MAGIC, VERSION, rows, strings
+    offsets  strings + 1 byte offsets into the blob
+    records  rows x FIELDS string ids: name, description, kind, x64_url, x86_url
+    blob     the distinct strings, UTF-8, back to back
+
+Opening a snapshot maps the file and reads the header; rows are decoded
+from the mapping when they are read, so startup does not depend on the size
+of the catalog.
+
+The catalog comes in two layers with separate files.  ``catalog.snapshot``
+is compiled from ``inf`` and rebuilt whenever ``inf.py`` is newer;
+``catalog-pypi.snapshot`` holds the names beyond it, from ``pypisync`` or a
+names file, sorted by canonical name, and is only ever replaced by those.
+``load_catalog`` stacks the second under the first, so editing ``inf`` never
+drops synced names and a project listed in both appears once, as in ``inf``.
+``python snapshot.py`` compiles ``inf``; ``python snapshot.py NAMES_FILE``
+writes one project name per line from ``NAMES_FILE`` as the sync layer.
+"""
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Sequence
+
+from pip._vendor.packaging.utils import canonicalize_name
+
+from catalog import Catalog, CatalogEntry
+
+MAGIC = 0x53435444  # b"DTCS"
+VERSION = 1
+FIELDS = 5
+HEADER = struct.Struct("<4I")
+DEFAULT_PATH = Path(__file__).resolve().parent / "catalog.snapshot"
+SYNC_PATH = Path(__file__).resolve().parent / "catalog-pypi.snapshot"
+
+
+class SnapshotError(Exception):
+    """The file is not a catalog snapshot this version can read."""
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(data: memoryview) -> memoryview | array:
+    # Zero-copy where the host byte order matches; otherwise a swapped copy.
+    if sys.byteorder == "little":
+        return data.cast("I")
+    values = array("I")
+    values.frombytes(data)
+    values.byteswap()
+    return values
+
+
+def build_snapshot(catalog: Sequence[CatalogEntry], path: str | os.PathLike):
+    """Write ``catalog`` to ``path`` atomically; repeated strings are stored once."""
+    ids: dict[str, int] = {}
+    blob = bytearray()
+    offsets = array("I", [0])
+    records = array("I")
+    for entry in catalog:
+        for value in (entry.name, entry.description, entry.kind, entry.x64_url, entry.x86_url):
+            string = ids.get(value)
+            if string is None:
+                string = ids[value] = len(ids)
+                blob += value.encode("utf-8")
+                offsets.append(len(blob))
+            records.append(string)
+    tmp = os.fspath(path) + ".tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, len(catalog), len(ids)))
+        fh.write(_little_endian(offsets))
+        fh.write(_little_endian(records))
+        fh.write(blob)
+    os.replace(tmp, path)
+
+
+def build_layer(catalog: Sequence[CatalogEntry], path: str | os.PathLike = SYNC_PATH):
+    """Write ``catalog`` as a sync layer: sorted by canonical name, for ``LayeredCatalog``."""
+    keys = [canonicalize_name(entry.name) for entry in catalog]
+    build_snapshot([catalog[row] for row in sorted(range(len(catalog)), key=keys.__getitem__)], path)
+
+
+class CatalogSnapshot(Sequence):
+    """A read-only catalog backed by a memory-mapped snapshot file."""
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)  # ValueError if empty
+        if len(self._map) < HEADER.size:
+            raise SnapshotError(f"{path}: truncated")
+        magic, version, self._rows, strings = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotError(f"{path}: not a version {VERSION} catalog snapshot")
+        view = memoryview(self._map)
+        offsets_end = HEADER.size + 4 * (strings + 1)
+        records_end = offsets_end + 4 * FIELDS * self._rows
+        if len(self._map) < records_end:
+            raise SnapshotError(f"{path}: truncated")
+        self._offsets = _from_little_endian(view[HEADER.size:offsets_end])
+        self._records = _from_little_endian(view[offsets_end:records_end])
+        self._blob = view[records_end:]
+        if len(self._blob) != self._offsets[strings]:
+            raise SnapshotError(f"{path}: truncated")
+
+    def _string(self, string: int) -> str:
+        return str(self._blob[self._offsets[string]:self._offsets[string + 1]], "utf-8")
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def __getitem__(self, row: int) -> CatalogEntry:
+        if row < 0:
+            row += self._rows
+        if not 0 <= row < self._rows:
+            raise IndexError(row)
+        base = row * FIELDS
+        return CatalogEntry(*(self._string(self._records[base + i]) for i in range(FIELDS)))
+
+    def name(self, row: int) -> str:
+        return self._string(self._records[row * FIELDS])
+
+    def close(self):
+        for view in (self._offsets, self._records, self._blob):
+            if isinstance(view, memoryview):
+                view.release()
+        self._map.close()
+
+
+class LayeredCatalog(Sequence):
+    """The rows of ``base``, then those of ``layer`` whose project ``base`` lacks.
+
+    ``layer`` must be sorted by canonical name (see ``build_layer``); the
+    duplicates are found by binary search for each ``base`` name, so opening
+    costs ``len(base) * log(len(layer))`` row reads.
+    """
+
+    def __init__(self, base: Sequence[CatalogEntry], layer: Sequence[CatalogEntry]):
+        self._base = base
+        self._layer = layer
+        rows = range(len(layer))
+        hidden = set()
+        for entry in base:
+            key = canonicalize_name(entry.name)
+            row = bisect_left(rows, key, key=lambda row: canonicalize_name(layer[row].name))
+            if row < len(layer) and canonicalize_name(layer[row].name) == key:
+                hidden.add(row)
+        self._hidden = sorted(hidden)  # layer rows shown by ``base`` instead
+
+    def __len__(self) -> int:
+        return len(self._base) + len(self._layer) - len(self._hidden)
+
+    def __getitem__(self, row: int) -> CatalogEntry:
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        if row < len(self._base):
+            return self._base[row]
+        row -= len(self._base)
+        for hidden in self._hidden:
+            if hidden > row:
+                break
+            row += 1
+        return self._layer[row]
+
+
+def load_catalog(path: str | os.PathLike = DEFAULT_PATH,
+                 sync_path: str | os.PathLike | None = SYNC_PATH) -> Sequence[CatalogEntry]:
+    """The ``inf`` snapshot at ``path`` over the sync layer at ``sync_path``, if there is one.
+
+    Only the ``inf`` layer is rebuilt, and only when ``inf.py`` is newer.
+    Falls back to the in-memory ``Catalog`` if that snapshot cannot be
+    written or read, and to ``inf`` alone if the sync layer cannot be read.
+    """
+    source = Path(__file__).resolve().parent / "inf.py"
+    try:
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(source):
+            build_snapshot(Catalog.from_inf(), path)
+        base = CatalogSnapshot(path)
+    except (OSError, ValueError, SnapshotError):
+        base = Catalog.from_inf()
+    if sync_path is None or not os.path.exists(sync_path):
+        return base
+    try:
+        return LayeredCatalog(base, CatalogSnapshot(sync_path))
+    except (OSError, ValueError, SnapshotError):
+        return base
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding="utf-8") as fh:
+            catalog = Catalog(list(dict.fromkeys(name for name in (line.strip() for line in fh) if name)))
+        path = SYNC_PATH
+        build_layer(catalog, path)
+    else:
+        catalog = Catalog.from_inf()
+        path = DEFAULT_PATH
+        build_snapshot(catalog, path)
+    print(f"{len(catalog)} entries, {os.path.getsize(path)} bytes -> {path}")
@@ -0,0 +1,352 @@
+# This Python file uses the following encoding: utf-8
+"""Streaming parser for large simple-API project pages.
+
+``indexcache.parse_project_page`` hands the whole page to pip's
+``parse_links``, which decodes the entire HTML or JSON document and builds a
+``Link`` for every file before anything is filtered.  Project pages such as
+numpy's list thousands of files, most of them for other platforms.
+``iter_files`` instead reads the body chunk by chunk and yields files as soon
+as their entry is complete.  It never holds more than one chunk and one entry
+of the document, and it drops wheels whose tags the target cannot install
+and files whose Requires-Python excludes it before building anything.
+
+``find_best`` picks the file ``pip install`` would use from that stream.
+The simple API does not order files, so the best pick is only certain early
+for a pinned version.  It stops there if a wheel has the target's most
+preferred tag, or if every file allowed by ``--require-hashes`` style hashes
+has been seen.  ``best_file`` streams a page from the index this way without
+caching it, and stops reading as soon as the pick is certain.
+"""
+import codecs
+import http.client
+import json
+import re
+import zlib
+from html.parser import HTMLParser
+from typing import Iterable, Iterator
+from urllib.parse import unquote, urljoin, urlsplit
+
+from pip._internal.models.target_python import TargetPython
+from pip._vendor.packaging.specifiers import InvalidSpecifier, SpecifierSet
+from pip._vendor.packaging.utils import canonicalize_name
+from pip._vendor.packaging.version import InvalidVersion, Version
+
+from downloader import MAX_REDIRECTS, USER_AGENT, request_path
+from indexcache import ACCEPT, IndexCache, IndexUnavailable, ProjectFile
+from tagindex import TagIndex, parse_filename
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class PageFilter:
+    """Which files of a page ``target`` can install, and how much pip prefers each.
+
+    Ranks come from a ``TagIndex``: the position of a wheel's best tag in the
+    target's tag priority list, with sdists after every wheel.
+    """
+
+    def __init__(self, target: TargetPython | None = None, sdists: bool = True, tags: TagIndex | None = None):
+        self.tags = tags or TagIndex(target)
+        self.target = self.tags.target
+        self.sdists = sdists
+        self.python = Version(".".join(map(str, self.target.py_version_info)))
+        self._requires: dict[str, bool] = {}
+
+    def allows_python(self, requires_python: str | None) -> bool:
+        if not requires_python:
+            return True
+        if requires_python not in self._requires:
+            try:
+                self._requires[requires_python] = SpecifierSet(requires_python).contains(self.python, True)
+            except InvalidSpecifier:
+                self._requires[requires_python] = True  # pip ignores malformed values too
+        return self._requires[requires_python]
+
+    def rank(self, project: str, filename: str) -> tuple[int, Version] | None:
+        """``(rank, version)`` of an installable file of ``project``, else ``None``."""
+        rank = self.tags.rank(filename)
+        if rank is None or not self.sdists and rank == self.tags.sdist_rank:
+            return None
+        parsed = parse_filename(filename)
+        return (rank, parsed.version) if parsed.name == project else None
+
+    def select(self, project: str, files: Iterable[ProjectFile]) -> list[tuple[ProjectFile, int]]:
+        """``iter_files`` for files already parsed, such as an ``IndexCache`` page."""
+        project = canonicalize_name(project)
+        selected = []
+        for f in files:
+            ranked = self.rank(project, f.filename)
+            if ranked is not None and self.allows_python(f.requires_python):
+                selected.append((f, ranked[0]))
+        return selected
+
+
+def _json_entries(chunks: Iterator[str], fields: dict) -> Iterator[dict]:
+    # Yields the objects of the top-level "files" array one at a time; every
+    # other top-level member is decoded whole into ``fields``.
+    decoder = json.JSONDecoder()
+    text, pos = "", 0
+
+    def fill() -> bool:
+        nonlocal text, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        text, pos = text[pos:] + chunk, 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos < len(text):
+                return text[pos]
+            if not fill():
+                return ""
+
+    def value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(text, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk.
+            if end == len(text) and not isinstance(obj, (dict, list, str)) and fill():
+                continue
+            pos = end
+            return obj
+
+    def expect(char: str):
+        nonlocal pos
+        if peek() != char:
+            raise ValueError(f"expected {char!r} at {text[pos:pos + 20]!r}")
+        pos += 1
+
+    expect("{")
+    while peek() != "}":
+        key = value()
+        expect(":")
+        if key == "files" and peek() == "[":
+            pos += 1
+            while peek() != "]":
+                yield value()
+                if peek() == ",":
+                    pos += 1
+            pos += 1
+        else:
+            fields[key] = value()
+        if peek() == ",":
+            pos += 1
+
+
+class _AnchorParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base_url: str | None = None
+        self.anchors: list[dict] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "base" and self.base_url is None:
+            self.base_url = dict(attrs).get("href")
+        elif tag == "a":
+            self.anchors.append(dict(attrs))
+
+
+def _html_entries(chunks: Iterator[str], url: str) -> Iterator[tuple[dict, str]]:
+    parser = _AnchorParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        anchors, parser.anchors = parser.anchors, []
+        for anchor in anchors:
+            yield anchor, parser.base_url or url
+    parser.close()
+    for anchor in parser.anchors:
+        yield anchor, parser.base_url or url
+
+
+def _decode(chunks: Iterable[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    for chunk in chunks:
+        if text := decoder.decode(chunk):
+            yield text
+    if text := decoder.decode(b"", True):
+        yield text
+
+
+def _url_filename(url: str) -> str:
+    return unquote(urlsplit(url).path.rsplit("/", 1)[-1])
+
+
+def _from_json(entry: dict, filename: str, url: str) -> ProjectFile:
+    yanked = entry.get("yanked")
+    return ProjectFile(
+        filename=filename,
+        url=urljoin(url, entry["url"]).split("#", 1)[0],
+        version=None,
+        requires_python=entry.get("requires-python"),
+        yanked=(yanked if isinstance(yanked, str) else "") if yanked else None,
+        sha256=(entry.get("hashes") or {}).get("sha256"),
+        has_metadata=bool(entry.get("core-metadata", entry.get("dist-info-metadata"))),
+    )
+
+
+def _from_anchor(anchor: dict, filename: str, base_url: str) -> ProjectFile:
+    url, _, fragment = urljoin(base_url, anchor["href"]).partition("#")
+    name, _, digest = fragment.partition("=")
+    return ProjectFile(
+        filename=filename,
+        url=url,
+        version=None,
+        requires_python=anchor.get("data-requires-python"),
+        yanked=anchor.get("data-yanked"),
+        sha256=digest if name == "sha256" and digest else None,
+        has_metadata=anchor.get("data-core-metadata", anchor.get("data-dist-info-metadata")) is not None,
+    )
+
+
+def iter_files(chunks: Iterable[bytes], content_type: str, url: str, project: str,
+               compat: PageFilter | None = None) -> Iterator[tuple[ProjectFile, int]]:
+    """``(file, rank)`` for each file of a project page that ``compat`` can install.
+
+    ``chunks`` is the raw body, already decompressed.  Files come out in page
+    order, as soon as their entry has been read; see ``PageFilter.rank``.
+    Only the files kept get their URL resolved and a ``ProjectFile`` built.
+    """
+    compat = compat or PageFilter()
+    project = canonicalize_name(project)
+    text = _decode(chunks)
+    if "json" in content_type.split(";", 1)[0]:
+        entries = ((entry, entry.get("url"), entry.get("filename"), entry.get("requires-python"), url)
+                   for entry in _json_entries(text, {}))
+        build = _from_json
+    else:
+        entries = ((anchor, anchor.get("href"), None, anchor.get("data-requires-python"), base)
+                   for anchor, base in _html_entries(text, url))
+        build = _from_anchor
+    for entry, href, filename, requires_python, base in entries:
+        if not href:
+            continue
+        filename = filename or _url_filename(href.split("#", 1)[0])
+        ranked = compat.rank(project, filename)
+        if ranked is None or not compat.allows_python(requires_python):
+            continue
+        f = build(entry, filename, base)
+        rank, version = ranked
+        f.version = str(version)
+        yield f, rank
+
+
+def _pin(specifier: SpecifierSet) -> Version | None:
+    specs = list(specifier)
+    if len(specs) == 1 and specs[0].operator in ("==", "===") and not specs[0].version.endswith(".*"):
+        try:
+            return Version(specs[0].version)
+        except InvalidVersion:
+            return None
+    return None
+
+
+def _build_tag(filename: str) -> tuple:
+    # pip's ``Wheel.build_tag``: ``(number, suffix)``, or ``()`` for none.
+    parts = filename[:-4].split("-") if filename.endswith(".whl") else ()
+    match = re.match(r"(\d+)(.*)", parts[2]) if len(parts) == 6 else None
+    return (int(match.group(1)), match.group(2)) if match else ()
+
+
+def find_best(files: Iterable[tuple[ProjectFile, int]], specifier: str | SpecifierSet = "",
+              prereleases: bool | None = None, hashes: Iterable[str] | None = None) -> ProjectFile | None:
+    """The file pip would install among ``files`` (from ``iter_files``).
+
+    Newest matching version first, then the most preferred tag, wheels
+    before sdists, then the highest build tag.  Yanked files only count for
+    a pinned version that has nothing else.  With ``hashes``, only files
+    with one of those sha256 digests qualify.  Stops reading ``files`` once
+    the pick is certain, which is when a pin has seen all of its ``hashes``:
+    even a file with the best tag can be beaten by a later rebuild of it
+    with a higher build tag.
+    """
+    specifier = specifier if isinstance(specifier, SpecifierSet) else SpecifierSet(specifier)
+    pin = _pin(specifier)
+    hashes = set(hashes) if hashes is not None else None
+    unseen = set(hashes) if hashes is not None and pin is not None else None
+    best: dict[bool, tuple] = {}  # prerelease -> (version, -rank, build tag, file); yanked kept apart
+    yanked = None
+    for f, rank in files:
+        if hashes is not None and f.sha256 not in hashes:
+            continue
+        version = Version(f.version)
+        if not specifier.contains(version, prereleases=True):
+            continue
+        key = (version, -rank, _build_tag(f.filename), f)
+        if f.yanked is not None:
+            if pin is not None and (yanked is None or key[:3] > yanked[:3]):
+                yanked = key
+            continue
+        pre = version.is_prerelease
+        if pre not in best or key[:3] > best[pre][:3]:
+            best[pre] = key
+        if unseen is not None:
+            unseen.discard(f.sha256)
+            if not unseen:
+                break
+    # Like pip, pre-releases count if asked for, named by the specifier, or all there is.
+    allow_pre = prereleases if prereleases is not None else (specifier.prereleases or False not in best)
+    candidates = [best[pre] for pre in (False, True) if pre in best and (allow_pre or not pre)]
+    if candidates:
+        return max(candidates, key=lambda key: key[:3])[3]
+    return yanked[3] if yanked else None
+
+
+def _chunks(response, gzipped: bool) -> Iterator[bytes]:
+    inflate = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    while chunk := response.read(CHUNK_SIZE):
+        yield inflate.decompress(chunk) if inflate else chunk
+    if inflate:
+        yield inflate.flush()
+
+
+def best_file(cache: IndexCache, name: str, specifier: str = "", compat: PageFilter | None = None,
+              prereleases: bool | None = None, hashes: Iterable[str] | None = None) -> ProjectFile | None:
+    """``find_best`` over the live project page of ``name``, read straight off the socket.
+
+    The page is not stored in ``cache``; only its connection pool is used.
+    ``None`` if the index has no such project or no file qualifies.
+    """
+    compat = compat or PageFilter()
+    url = cache.project_url(name)
+    headers = {"User-Agent": USER_AGENT, "Accept": ACCEPT, "Accept-Encoding": "gzip"}
+    retried = False
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            with cache.pool.connection(url) as conn:
+                conn.request("GET", request_path(url), headers=headers)
+                response = conn.getresponse()
+                if response.status in (301, 302, 303, 307, 308):
+                    response.read()
+                    url = urljoin(url, response.getheader("Location"))
+                    continue
+                if response.status != 200:
+                    response.read()
+                    if response.status == 404:
+                        return None
+                    raise IndexUnavailable(f"{url}: HTTP {response.status}")
+                chunks = _chunks(response, response.getheader("Content-Encoding") == "gzip")
+                files = iter_files(chunks, response.getheader("Content-Type", "text/html"), url, name, compat)
+                best = find_best(files, specifier, prereleases, hashes)
+                if not response.isclosed():
+                    conn.close()  # stopped early; the rest of the body is not wanted
+                return best
+        except (OSError, http.client.HTTPException) as exc:
+            # The server may have closed an idle keep-alive connection.
+            if retried:
+                raise IndexUnavailable(f"{url}: {exc}") from exc
+            retried = True
+        except (ValueError, zlib.error) as exc:
+            raise IndexUnavailable(f"{url}: malformed page: {exc}") from exc
+    raise IndexUnavailable(f"{url}: too many redirects")
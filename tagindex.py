@@ -0,0 +1,132 @@
+# This Python file uses the following encoding: utf-8
+"""Wheel tag priorities, computed once per target instead of once per link.
+
+For every link on every lookup, pip's ``LinkEvaluator`` parses the wheel
+filename and tests its tags against the whole supported set (about 900 tags
+for CPython on Linux).  ``CandidateEvaluator`` then parses the filename again
+to find the tag's position when it sorts candidates.  ``TagIndex`` maps each
+supported tag string to its priority once.  ``parse_filename`` caches what
+each filename says, so ranking a page of 5000 files is one pass of dict
+lookups, and a page seen before costs one lookup per file.
+
+``streamparse.PageFilter`` ranks pages this way.  On the ``PackageFinder``
+path ``IndexFetcher`` only uses the index to drop wheels the target cannot
+install; pip's evaluators still parse the links that remain, but those are
+a handful rather than the whole page.
+
+Free-threaded CPython ("t" ABIs such as ``cp313t``) loads neither abi3 wheels
+nor wheels built for the GIL ABI.  ``supported_tags`` produces the right tags
+for such a target even when pip's vendored ``packaging`` predates PEP 703,
+and ``TagIndex.apply`` hands them to a ``PackageFinder``.
+"""
+import sysconfig
+from dataclasses import dataclass
+from functools import lru_cache
+
+from pip._internal.index.package_finder import PackageFinder
+from pip._internal.models.target_python import TargetPython
+from pip._vendor.packaging.tags import Tag, interpreter_name
+from pip._vendor.packaging.utils import InvalidSdistFilename, canonicalize_name, parse_sdist_filename
+from pip._vendor.packaging.version import InvalidVersion, Version
+
+PARSE_CACHE_SIZE = 1 << 16
+SDIST_SUFFIXES = (".tar.gz", ".zip")  # what ``parse_sdist_filename`` accepts
+
+
+@dataclass(frozen=True)
+class ParsedFile:
+    name: str  # canonical
+    version: Version
+    tags: tuple[str, ...] | None  # every tag of a wheel's compressed tag set; None for sdists
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_filename(filename: str) -> ParsedFile | None:
+    """Project, version and tags of a wheel or sdist filename; ``None`` for anything else."""
+    if filename.endswith(".whl"):
+        parts = filename[:-4].split("-")
+        if len(parts) not in (5, 6) or len(parts) == 6 and not parts[2][:1].isdigit():
+            return None
+        try:
+            version = Version(parts[1])
+        except InvalidVersion:
+            return None
+        pythons, abis, platforms = (part.lower().split(".") for part in parts[-3:])
+        tags = tuple(f"{py}-{abi}-{platform}" for py in pythons for abi in abis for platform in platforms)
+        return ParsedFile(canonicalize_name(parts[0]), version, tags)
+    if filename.endswith(SDIST_SUFFIXES):
+        try:
+            name, version = parse_sdist_filename(filename)
+        except (InvalidSdistFilename, InvalidVersion):
+            return None
+        return ParsedFile(name, version, None)
+    return None
+
+
+def _pip_tags(target: TargetPython) -> list[Tag]:
+    # ``get_tags`` became ``get_sorted_tags`` in pip 24.
+    return (target.get_sorted_tags if hasattr(target, "get_sorted_tags") else target.get_tags)()
+
+
+def is_free_threaded(target: TargetPython) -> bool:
+    """Whether ``target`` is a free-threaded CPython."""
+    if (target.implementation or interpreter_name()) != "cp":
+        return False
+    if target.abis:
+        return any(abi.startswith("cp") and abi.endswith("t") for abi in target.abis)
+    return target._given_py_version_info is None and bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+
+
+def supported_tags(target: TargetPython) -> list[Tag]:
+    """Tags ``target`` can install, most preferred first."""
+    if not is_free_threaded(target):
+        return _pip_tags(target)
+    if not target.abis:
+        # Running on a free-threaded interpreter that pip does not recognise as one.
+        abi = "cp{}{}t".format(*target.py_version_info[:2])
+        target = TargetPython(platforms=target.platforms, py_version_info=target.py_version_info,
+                              abis=[abi], implementation=target.implementation)
+    return [tag for tag in _pip_tags(target) if tag.abi != "abi3"]
+
+
+class TagIndex:
+    """Tag priorities of one target; ``rank`` is what ``CandidateEvaluator`` sorts by.
+
+    A wheel ranks at the position of its best supported tag, so lower is
+    better; sdists rank after every wheel.  Ranks are cached per filename.
+    """
+
+    def __init__(self, target: TargetPython | None = None):
+        self.target = target or TargetPython()
+        self.tags = supported_tags(self.target)
+        self.priority = {str(tag): rank for rank, tag in enumerate(self.tags)}
+        self.sdist_rank = len(self.tags)
+        self._ranks: dict[str, int | None] = {}
+
+    def rank(self, filename: str) -> int | None:
+        """Rank of an installable wheel or sdist; ``None`` if the target cannot use it."""
+        try:
+            return self._ranks[filename]
+        except KeyError:
+            pass
+        parsed = parse_filename(filename)
+        if parsed is None:
+            rank = None
+        elif parsed.tags is None:
+            rank = self.sdist_rank
+        else:
+            ranks = [self.priority[tag] for tag in parsed.tags if tag in self.priority]
+            rank = min(ranks) if ranks else None
+        self._ranks[filename] = rank
+        return rank
+
+    def supports(self, filename: str) -> bool:
+        """False only for wheels no supported tag matches; pip judges everything else."""
+        return not filename.endswith(".whl") or self.rank(filename) is not None
+
+    def apply(self, finder: PackageFinder):
+        """Make ``finder`` evaluate and sort links with these tags (and reuse them)."""
+        target = finder.target_python
+        target._valid_tags = self.tags
+        if hasattr(target, "_valid_tags_set"):  # pip 24+
+            target._valid_tags_set = set(self.tags)
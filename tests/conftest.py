@@ -0,0 +1,127 @@
+# This Python file uses the following encoding: utf-8
+"""Local HTTP servers the tests download from."""
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class RangeServer(ThreadingHTTPServer):
+    """Serves ``files`` (path -> bytes) with ``HEAD``, ``Range`` and ``If-Range`` support.
+
+    While ``drops`` is positive, each ranged response announces the whole
+    range but the connection is closed after ``drop_after`` bytes of it.
+    ``requests`` records the path and headers of every request, and every
+    response waits ``delay`` seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RangeHandler)
+        self.files: dict[str, bytes] = {}
+        self.etags: dict[str, str] = {}
+        self.content_types: dict[str, str] = {}
+        self.drops = 0
+        self.drop_after = 0
+        self.delay = 0.0
+        self.requests: list[tuple[str, dict]] = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def serve(self, path: str, data: bytes, etag: str, content_type: str = "application/octet-stream"):
+        self.files[path] = data
+        self.etags[path] = etag
+        self.content_types[path] = content_type
+
+    def ranges(self, path: str) -> list[tuple[str | None, str | None]]:
+        """``(Range, If-Range)`` of every request for ``path``, probes excluded."""
+        with self.lock:
+            return [(h.get("Range"), h.get("If-Range")) for p, h in self.requests
+                    if p == path and h.get("Range") != "bytes=0-0"]
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        server: RangeServer = self.server
+        data = server.files.get(self.path)
+        self.send_response(404 if data is None else 200)
+        if data is not None:
+            self.send_header("ETag", server.etags[self.path])
+            self.send_header("Content-Type", server.content_types[self.path])
+            self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(data or b"")))
+        self.end_headers()
+
+    def do_GET(self):
+        server: RangeServer = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+        time.sleep(server.delay)
+        data = server.files.get(self.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = server.etags[self.path]
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if match is None or if_range is not None and if_range != etag:
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", server.content_types[self.path])
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        start = int(match.group(1))
+        end = min(int(match.group(2) or len(data) - 1), len(data) - 1)
+        body = data[start:end + 1]
+        self.send_response(206)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", server.content_types[self.path])
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        with server.lock:
+            drop = server.drops > 0 and len(body) > server.drop_after
+            if drop:
+                server.drops -= 1
+        if drop:
+            self.wfile.write(body[:server.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def _running():
+    server = RangeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def range_server():
+    yield from _running()
+
+
+@pytest.fixture
+def mirror_server():
+    """A second ``RangeServer``, for a mirror that misbehaves on its own."""
+    yield from _running()
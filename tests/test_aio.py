@@ -0,0 +1,110 @@
+# This Python file uses the following encoding: utf-8
+import asyncio
+import time
+
+import pytest
+
+from aio import AsyncDownloader, AsyncScheduler, LoopThread
+from cache import ContentStore
+from journal import DownloadJournal
+from scheduler import CANCELLED, DONE
+
+from test_downloader import CHUNK, SIZE, payload
+
+
+@pytest.fixture
+def loop_thread():
+    thread = LoopThread()
+    yield thread
+    thread.stop()
+
+
+def test_dropped_ranges_are_retried(range_server, loop_thread, tmp_path):
+    data = payload()
+    range_server.serve("/setup.exe", data, '"v1"')
+    range_server.drops, range_server.drop_after = 2, 100 * 1024
+    downloader = AsyncDownloader(segments=2, chunk_size=CHUNK)
+
+    remote = loop_thread.submit(downloader.download(f"{range_server.url}/setup.exe",
+                                                    tmp_path / "setup.exe", algorithms=("sha256",))).result()
+    assert (tmp_path / "setup.exe").read_bytes() == data
+    assert remote.size == SIZE and remote.digests["sha256"]
+    starts = [int(r[len("bytes="):].split("-")[0]) for r, _ in range_server.ranges("/setup.exe")]
+    assert starts == [0, 100 * 1024, 200 * 1024]
+
+
+def test_scheduler_serves_repeats_from_the_store(range_server, loop_thread, tmp_path):
+    data = payload()
+    range_server.serve("/setup.exe", data, '"v1"')
+    scheduler = AsyncScheduler(store=ContentStore(tmp_path / "store"), loop_thread=loop_thread)
+    first = scheduler.submit(f"{range_server.url}/setup.exe", tmp_path / "first.exe")
+    scheduler.shutdown()
+    scheduler = AsyncScheduler(store=scheduler.store, loop_thread=loop_thread)
+    second = scheduler.submit(f"{range_server.url}/setup.exe", tmp_path / "second.exe")
+    scheduler.shutdown()
+
+    assert first.state == second.state == DONE
+    assert not first.cached and second.cached
+    assert (tmp_path / "second.exe").read_bytes() == data
+
+
+def test_programming_errors_are_not_retried(range_server, loop_thread, tmp_path, monkeypatch):
+    range_server.serve("/setup.exe", payload(), '"v1"')
+    calls = []
+
+    def broken(self, fh, piece, chunk):
+        calls.append(piece)
+        raise ValueError("bug")
+
+    monkeypatch.setattr("downloader.Transfer.accept", broken)
+    downloader = AsyncDownloader(segments=1, chunk_size=CHUNK)
+    with pytest.raises(ValueError, match="bug"):
+        loop_thread.submit(downloader.download(f"{range_server.url}/setup.exe", tmp_path / "setup.exe")).result()
+    assert len(calls) == 1
+
+
+def test_shutdown_without_wait_cancels_and_leaves_a_resumable_journal(range_server, loop_thread, tmp_path):
+    data = payload()
+    url = f"{range_server.url}/setup.exe"
+    range_server.serve("/setup.exe", data, '"v1"')
+    scheduler = AsyncScheduler(bandwidth=256 * 1024, loop_thread=loop_thread)
+    job = scheduler.submit(url, tmp_path / "setup.exe")
+    while job.done < 2 * CHUNK:
+        time.sleep(0.01)
+    scheduler.shutdown(wait=False)
+
+    assert job.state == CANCELLED
+    assert not [t for t in asyncio.all_tasks(loop_thread.loop) if not t.done()]
+    journal = DownloadJournal.load(str(tmp_path / "setup.exe.part.json"))
+    assert journal is not None and journal.completed >= 2 * CHUNK
+
+    range_server.requests.clear()
+    scheduler = AsyncScheduler(loop_thread=loop_thread)
+    job = scheduler.submit(url, tmp_path / "setup.exe")
+    scheduler.shutdown()
+    assert job.state == DONE
+    assert (tmp_path / "setup.exe").read_bytes() == data
+    resumed = range_server.ranges("/setup.exe")
+    assert resumed and all(not r.startswith("bytes=0-") and if_range == '"v1"' for r, if_range in resumed)
+
+
+def test_restart_after_a_remote_change_takes_back_the_reported_bytes(range_server, loop_thread, tmp_path):
+    url = f"{range_server.url}/setup.exe"
+    range_server.serve("/setup.exe", payload(), '"v1"')
+    downloader = AsyncDownloader(segments=2, chunk_size=CHUNK)
+    remote, sources = loop_thread.submit(downloader.locate(url)).result()
+    part = f"{tmp_path / 'setup.exe'}.part"
+    journal = DownloadJournal(f"{part}.json", remote.url, remote.size, remote.etag)
+    journal.add(0, CHUNK - 1)
+    journal.save()
+    with open(part, "wb") as fh:
+        fh.truncate(SIZE)
+    fresh = payload(seed=1)
+    range_server.serve("/setup.exe", fresh, '"v2"')
+
+    progress = []
+    loop_thread.submit(downloader.download(url, tmp_path / "setup.exe", remote=remote, sources=sources,
+                                           on_progress=progress.append)).result()
+    assert (tmp_path / "setup.exe").read_bytes() == fresh
+    assert progress[:2] == [CHUNK, -CHUNK]
+    assert sum(progress) == SIZE
@@ -0,0 +1,46 @@
+# This Python file uses the following encoding: utf-8
+import hashlib
+import os
+
+from cache import ContentStore
+from downloader import SegmentedDownloader
+from hashing import Hashes
+
+DATA = b"installer" * 10000
+
+
+def test_materialized_copy_is_independent_of_the_blob(range_server, tmp_path):
+    range_server.serve("/a.exe", DATA, '"a"')
+    store = ContentStore(tmp_path / "store")
+    downloader = SegmentedDownloader()
+    url = f"{range_server.url}/a.exe"
+
+    _, cached = store.fetch(downloader, url, tmp_path / "first.exe")
+    assert not cached
+    assert os.stat(tmp_path / "first.exe").st_nlink == 1
+    with open(tmp_path / "first.exe", "r+b") as fh:
+        fh.write(b"edited")
+
+    _, cached = store.fetch(downloader, url, tmp_path / "second.exe")
+    assert cached
+    assert (tmp_path / "second.exe").read_bytes() == DATA
+    store.close()
+
+
+def test_validators_are_matched_per_url_and_hashes_match_anywhere(range_server, tmp_path):
+    range_server.serve("/a.exe", DATA, '"same"')
+    range_server.serve("/mirror/a.exe", DATA, '"same"')
+    store = ContentStore(tmp_path / "store")
+    downloader = SegmentedDownloader()
+    store.fetch(downloader, f"{range_server.url}/a.exe", tmp_path / "first.exe")
+
+    # Another server's ETag says nothing about this one's file.
+    _, cached = store.fetch(downloader, f"{range_server.url}/mirror/a.exe", tmp_path / "second.exe")
+    assert not cached
+
+    hashes = Hashes({"sha256": [hashlib.sha256(DATA).hexdigest()]})
+    range_server.serve("/elsewhere/a.exe", DATA, '"other"')
+    _, cached = store.fetch(downloader, f"{range_server.url}/elsewhere/a.exe", tmp_path / "third.exe",
+                            hashes=hashes)
+    assert cached and (tmp_path / "third.exe").read_bytes() == DATA
+    store.close()
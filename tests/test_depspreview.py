@@ -0,0 +1,53 @@
+# This Python file uses the following encoding: utf-8
+import json
+
+import pytest
+
+from depspreview import PreviewBuilder
+from installed import InstalledIndex
+from pipbatch import BatchInstaller
+
+PROJECTS = {
+    "app": ["lib", "other"],
+    "other": ["lib[fast]"],
+    "lib": ["plain", 'speedup; extra == "fast"'],
+    "plain": [],
+    "speedup": ["broken"],
+}
+
+
+def metadata(name: str, requires: list[str]) -> bytes:
+    lines = ["Metadata-Version: 2.1", f"Name: {name}", "Version: 1.0"]
+    lines += [f"Requires-Dist: {req}" for req in requires]
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+@pytest.fixture
+def builder(range_server, tmp_path):
+    for name, requires in {**PROJECTS, "broken": None}.items():
+        filename = f"{name}-1.0-py3-none-any.whl"
+        entry = {"filename": filename, "url": f"../../files/{filename}", "hashes": {}}
+        if requires is None:
+            range_server.serve(f"/files/{filename}", b"not a zip file" * 100, '"w"')
+        else:
+            entry["core-metadata"] = True
+            range_server.serve(f"/files/{filename}", b"wheel", '"w"')
+            range_server.serve(f"/files/{filename}.metadata", metadata(name, requires), '"m"')
+        page = {"meta": {"api-version": "1.0"}, "name": name, "files": [entry]}
+        range_server.serve(f"/simple/{name}/", json.dumps(page).encode(), '"p"',
+                           "application/vnd.pypi.simple.v1+json")
+    installer = BatchInstaller(["--index-url", f"{range_server.url}/simple/"])
+    yield PreviewBuilder(installer, InstalledIndex(tmp_path / "installed.json", directories=[]))
+    installer.close()
+
+
+def test_extras_requested_later_are_expanded(builder):
+    preview = builder.preview(["app"])
+    assert preview.nodes["lib"].requires == ["plain", "speedup"]
+    assert preview.nodes["speedup"].version == "1.0"
+
+
+def test_unreadable_wheels_are_shown_without_dependencies(builder):
+    preview = builder.preview(["app"])
+    broken = preview.nodes["broken"]
+    assert broken.version == "1.0" and broken.metadata_source is None and broken.requires == []
@@ -0,0 +1,98 @@
+# This Python file uses the following encoding: utf-8
+import os
+
+import pytest
+
+from downloader import DownloadError, SegmentedDownloader
+from journal import DownloadJournal
+
+SIZE = 1024 * 1024
+CHUNK = 16 * 1024
+
+
+def payload(seed: int = 0) -> bytes:
+    return bytes((i * 7 + seed) % 251 for i in range(SIZE))
+
+
+def downloader(retries: int = 3) -> SegmentedDownloader:
+    return SegmentedDownloader(segments=2, chunk_size=CHUNK, retries=retries, stall_timeout=5)
+
+
+def test_dropped_ranges_are_retried_from_where_they_stopped(range_server, tmp_path):
+    data = payload()
+    range_server.serve("/setup.exe", data, '"v1"')
+    range_server.drops, range_server.drop_after = 2, 100 * 1024
+
+    dest = tmp_path / "setup.exe"
+    downloader().download(f"{range_server.url}/setup.exe", dest)
+
+    assert dest.read_bytes() == data
+    assert not os.path.exists(f"{dest}.part.json")
+    starts = [int(r[len("bytes="):].split("-")[0]) for r, _ in range_server.ranges("/setup.exe")]
+    # Each retry asks for exactly the bytes the dropped response did not deliver.
+    assert starts == [0, 100 * 1024, 200 * 1024]
+
+
+def test_interrupted_download_resumes_with_if_range(range_server, tmp_path):
+    data = payload()
+    url = f"{range_server.url}/setup.exe"
+    range_server.serve("/setup.exe", data, '"v1"')
+    range_server.drops, range_server.drop_after = 100, 200 * 1024
+    dest = tmp_path / "setup.exe"
+
+    with pytest.raises(DownloadError):
+        downloader(retries=0).download(url, dest)
+    journal = DownloadJournal.load(f"{dest}.part.json")
+    assert journal is not None and journal.etag == '"v1"'
+    assert 0 < journal.completed < SIZE
+    missing = journal.missing()
+
+    range_server.drops = 0
+    range_server.requests.clear()
+    downloader().download(url, dest)
+
+    assert dest.read_bytes() == data
+    resumed = range_server.ranges("/setup.exe")
+    assert [r for r, _ in resumed] == [f"bytes={lo}-{hi}" for lo, hi in missing]
+    assert all(if_range == '"v1"' for _, if_range in resumed)
+
+
+def test_changed_file_restarts_from_scratch(range_server, tmp_path):
+    url = f"{range_server.url}/setup.exe"
+    range_server.serve("/setup.exe", payload(), '"v1"')
+    range_server.drops, range_server.drop_after = 100, 200 * 1024
+    dest = tmp_path / "setup.exe"
+    with pytest.raises(DownloadError):
+        downloader(retries=0).download(url, dest)
+
+    # The probe sees the new ETag, so the stale journal is not reused.
+    fresh = payload(seed=1)
+    range_server.serve("/setup.exe", fresh, '"v2"')
+    range_server.drops = 0
+    downloader().download(url, dest)
+    assert dest.read_bytes() == fresh
+
+
+def test_if_range_mismatch_mid_download_starts_over(range_server, tmp_path):
+    data = payload()
+    url = f"{range_server.url}/setup.exe"
+    range_server.serve("/setup.exe", data, '"v1"')
+    d = downloader()
+    remote, sources = d.locate(url)
+
+    # Replaced between the probe and the range requests: If-Range gets a 200.
+    part = f"{tmp_path / 'setup.exe'}.part"
+    journal = DownloadJournal(f"{part}.json", remote.url, remote.size, remote.etag)
+    journal.add(0, CHUNK - 1)
+    journal.save()
+    with open(part, "wb") as fh:
+        fh.truncate(SIZE)
+    fresh = payload(seed=1)
+    range_server.serve("/setup.exe", fresh, '"v2"')
+
+    progress = []
+    d.download(url, tmp_path / "setup.exe", remote=remote, sources=sources, on_progress=progress.append)
+    assert (tmp_path / "setup.exe").read_bytes() == fresh
+    # The resumed chunk is reported, then taken back when the download starts over.
+    assert progress[:2] == [CHUNK, -CHUNK]
+    assert sum(progress) == SIZE
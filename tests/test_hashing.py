@@ -0,0 +1,79 @@
+# This Python file uses the following encoding: utf-8
+import hashlib
+import os
+import time
+
+import pytest
+
+from downloader import SegmentedDownloader
+from hashing import Hashes, HashMismatch, OrderedHasher, load_manifest
+from scheduler import DONE, FAILED, DownloadScheduler
+
+SIZE = 8 * 1024 * 1024  # two segments of the minimum size
+CHUNK = 64 * 1024
+DATA = (bytes(range(251)) * (SIZE // 251 + 1))[:SIZE]
+SHA256 = hashlib.sha256(DATA).hexdigest()
+BLAKE2B = hashlib.blake2b(DATA).hexdigest()
+
+
+def corrupted() -> bytes:
+    # One flipped byte in the second of two segments.
+    data = bytearray(DATA)
+    data[3 * SIZE // 4] ^= 0xFF
+    return bytes(data)
+
+
+def test_manifest_formats(tmp_path):
+    path = tmp_path / "installers.sha256"
+    path.write_text(f"# comment\n"
+                    f"{SHA256}  setup.exe\n"
+                    f"{BLAKE2B} *dist/setup.exe\n"
+                    f"sha256:{SHA256.upper()} tool.msi\n"
+                    f"SHA256 (other tool.zip) = {SHA256}\n"
+                    f"md5:{hashlib.md5(DATA).hexdigest()} weak.zip\n")
+    manifest = load_manifest(path)
+    assert sorted(manifest) == ["other tool.zip", "setup.exe", "tool.msi"]
+    assert manifest["setup.exe"].algorithms == ["blake2b", "sha256"]
+    assert manifest["setup.exe"].is_hash_allowed("blake2b", BLAKE2B)
+    assert manifest["tool.msi"].digests("sha256") == [SHA256]
+
+
+def test_out_of_order_writes_hash_in_file_order(tmp_path):
+    path = tmp_path / "file.part"
+    path.write_bytes(DATA)
+    hasher = OrderedHasher(["sha256", "blake2b"], str(path), SIZE, max_buffer=8 * CHUNK)
+    offsets = list(range(0, SIZE, CHUNK))
+    for offset in offsets[1::2] + offsets[::2]:  # past the buffer, some are read back
+        hasher.update(offset, DATA[offset:offset + CHUNK])
+    hasher.finish()
+    assert hasher.hexdigests() == {"sha256": SHA256, "blake2b": BLAKE2B}
+
+
+def test_corrupted_segment_is_discarded(range_server, tmp_path):
+    range_server.serve("/setup.exe", corrupted(), '"v1"')
+    dest = tmp_path / "setup.exe"
+    downloader = SegmentedDownloader(segments=2, chunk_size=CHUNK)
+    with pytest.raises(HashMismatch) as info:
+        downloader.download(f"{range_server.url}/setup.exe", dest, hashes=Hashes({"sha256": [SHA256]}))
+    assert info.value.got["sha256"] == hashlib.sha256(corrupted()).hexdigest()
+    assert len(range_server.ranges("/setup.exe")) >= 2  # fetched as segments
+    assert not os.path.exists(dest)
+    assert not os.path.exists(f"{dest}.part")
+    assert not os.path.exists(f"{dest}.part.json")
+
+
+def test_scheduler_checks_jobs_against_the_manifest(range_server, tmp_path):
+    range_server.serve("/good.exe", DATA, '"g"')
+    range_server.serve("/bad.exe", corrupted(), '"b"')
+    manifest = tmp_path / "installers.sha256"
+    manifest.write_text(f"{SHA256}  good.exe\n{SHA256}  bad.exe\n")
+    scheduler = DownloadScheduler(max_jobs=2, segments=2)
+    scheduler.manifest = load_manifest(manifest)
+    good = scheduler.submit(f"{range_server.url}/good.exe", tmp_path / "good.exe")
+    bad = scheduler.submit(f"{range_server.url}/bad.exe", tmp_path / "bad.exe")
+    while not (good.finished and bad.finished):
+        time.sleep(0.01)
+    scheduler.shutdown()
+    assert good.state == DONE and (tmp_path / "good.exe").read_bytes() == DATA
+    assert bad.state == FAILED and "hashes do not match" in bad.error
+    assert not os.path.exists(tmp_path / "bad.exe") and not os.path.exists(tmp_path / "bad.exe.part")
@@ -0,0 +1,71 @@
+# This Python file uses the following encoding: utf-8
+import json
+
+import pytest
+from pip._internal.utils.hashes import Hashes
+
+from indexcache import IndexCache
+from indexfetch import IndexFetcher, offline_finder
+
+FILES = [
+    ("demo-1.0-py3-none-any.whl", False),
+    ("demo-1.0.tar.gz", False),
+    ("demo-2.0.tar.gz", False),
+    ("demo-2.5-py3-none-any.whl", True),
+    ("demo-3.0b1-py3-none-any.whl", False),
+]
+
+
+def digest(filename: str) -> str:
+    return f"{sum(filename.encode()):064x}"
+
+
+@pytest.fixture
+def cache(range_server, tmp_path):
+    page = {
+        "meta": {"api-version": "1.0"},
+        "name": "demo",
+        "files": [{"filename": name, "url": f"../../files/{name}", "hashes": {"sha256": digest(name)},
+                   "yanked": yanked} for name, yanked in FILES],
+    }
+    range_server.serve("/simple/demo/", json.dumps(page).encode(), '"page"',
+                       "application/vnd.pypi.simple.v1+json")
+    cache = IndexCache(tmp_path / "index.sqlite3", f"{range_server.url}/simple/")
+    yield cache
+    cache.close()
+
+
+def pip_pick(fetcher: IndexFetcher, cache: IndexCache, hashes=None):
+    project = cache.get("demo")
+    evaluator = fetcher.finder.make_candidate_evaluator("demo", hashes=hashes)
+    return evaluator.compute_best_candidate(fetcher.candidates(project)).best_candidate
+
+
+def test_newest_final_release_wins_by_default(cache):
+    fetcher = IndexFetcher(cache)
+    best = fetcher.best_candidates(["demo"])["demo"]
+    assert best.link.filename == "demo-2.0.tar.gz"
+    assert best.link == pip_pick(fetcher, cache).link
+
+
+def test_prefer_binary_ranks_wheels_above_newer_sdists(cache):
+    finder = offline_finder()
+    finder.set_prefer_binary()
+    fetcher = IndexFetcher(cache, finder)
+    best = fetcher.best_candidates(["demo"])["demo"]
+    assert best.link.filename == "demo-1.0-py3-none-any.whl"
+    assert best.link == pip_pick(fetcher, cache).link
+
+
+def test_allowed_hashes_rank_above_versions(cache):
+    fetcher = IndexFetcher(cache)
+    fetcher.best_candidates(["demo"])
+    hashes = Hashes({"sha256": [digest("demo-1.0.tar.gz")]})
+    best = fetcher.best_candidate(cache.get("demo"), hashes)
+    assert best.link.filename == "demo-1.0.tar.gz"
+    assert best.link == pip_pick(fetcher, cache, hashes).link
+
+
+def test_prereleases_only_when_allowed(cache):
+    fetcher = IndexFetcher(cache, offline_finder(allow_prereleases=True))
+    assert fetcher.latest_versions(["demo"]) == {"demo": "3.0b1"}
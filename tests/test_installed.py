@@ -0,0 +1,68 @@
+# This Python file uses the following encoding: utf-8
+import os
+import shutil
+
+import installed
+from installed import InstalledIndex
+
+
+def install(site, name: str, version: str, requires=()):
+    info = site / f"{name}-{version}.dist-info"
+    info.mkdir()
+    headers = [f"Name: {name}", f"Version: {version}"] + [f"Requires-Dist: {req}" for req in requires]
+    (info / "METADATA").write_text("\n".join(headers) + "\n\nlong description\nName: not-a-header\n")
+    return info
+
+
+def touch(directory, step: int):
+    # Filesystems with coarse mtimes would not notice a change within the same tick.
+    stat = os.stat(directory)
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + step * 1_000_000_000))
+
+
+def test_installs_and_removals_are_noticed(tmp_path, monkeypatch):
+    site = tmp_path / "site-packages"
+    site.mkdir()
+    install(site, "Foo_Bar", "1.0", ["six>=1.0", "colorama; sys_platform == 'win32'"])
+    index = InstalledIndex(tmp_path / "installed.json", [str(site)])
+    assert index.version("foo-bar") == "1.0"
+    assert index.get("FOO.BAR").requires == ["six>=1.0", "colorama; sys_platform == 'win32'"]
+
+    scans = []
+    monkeypatch.setattr(installed, "scan_directory", lambda d: scans.append(d) or {})
+    assert index.version("six") is None and not index.refresh()
+    assert scans == []
+    monkeypatch.undo()
+
+    six = install(site, "six", "1.16.0")
+    touch(site, 1)
+    assert index.version("six") == "1.16.0"
+    shutil.rmtree(six)
+    touch(site, 2)
+    assert index.get("six") is None
+    assert sorted(index.snapshot()) == ["foo-bar"]
+
+
+def test_stored_index_is_reused(tmp_path, monkeypatch):
+    site = tmp_path / "site-packages"
+    site.mkdir()
+    install(site, "six", "1.16.0")
+    InstalledIndex(tmp_path / "installed.json", [str(site)]).refresh()
+
+    monkeypatch.setattr(installed, "scan_directory", lambda d: {})
+    reopened = InstalledIndex(tmp_path / "installed.json", [str(site)])
+    assert reopened.version("six") == "1.16.0"
+    touch(site, 1)
+    assert reopened.version("six") is None  # rescanned, with the stub
+
+
+def test_first_directory_wins(tmp_path):
+    first, second = tmp_path / "user", tmp_path / "site"
+    first.mkdir()
+    second.mkdir()
+    install(first, "six", "1.16.0")
+    install(second, "six", "1.15.0")
+    install(second, "idna", "3.4")
+    index = InstalledIndex(directories=[str(first), str(second), str(tmp_path / "missing")])
+    assert {key: dist.version for key, dist in index.snapshot().items()} == {"six": "1.16.0", "idna": "3.4"}
+    assert index.get("six").location == str(first)
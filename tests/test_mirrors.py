@@ -0,0 +1,104 @@
+# This Python file uses the following encoding: utf-8
+import json
+
+from mirrors import PROBE_BYTES, REFERENCE_SIZE, MirrorRegistry
+
+ROUTE = ["https://a.test/pub/", "https://b.test/mirror/pub/", "https://c.test/"]
+URL = "https://a.test/pub/tool/setup.exe"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StubRegistry(MirrorRegistry):
+    """Probes answer from ``speeds`` (host -> rtt, throughput) instead of the network."""
+
+    def __init__(self, speeds: dict, **kwargs):
+        super().__init__([ROUTE], **kwargs)
+        self.speeds = speeds
+        self.probed: list[str] = []
+
+    def _measure(self, url: str) -> dict:
+        host = url.split("/")[2]
+        self.probed.append(host)
+        rtt, throughput = self.speeds[host]
+        return {"rtt": rtt, "throughput": throughput, "probed": self.clock()}
+
+
+def test_alternatives_use_the_longest_prefix():
+    registry = MirrorRegistry([ROUTE, ["https://a.test/", "https://d.test/"]])
+    assert registry.alternatives(URL) == [URL, "https://b.test/mirror/pub/tool/setup.exe",
+                                          "https://c.test/tool/setup.exe"]
+    assert registry.alternatives("https://a.test/other") == ["https://a.test/other", "https://d.test/other"]
+    assert registry.alternatives("https://elsewhere.test/x") == ["https://elsewhere.test/x"]
+
+
+def test_probe_ranks_by_expected_download_time(tmp_path):
+    clock = FakeClock()
+    # b answers fastest but is slow to stream; c wins on a REFERENCE_SIZE file.
+    registry = StubRegistry({"a.test": (0.2, 1e6), "b.test": (0.01, 1e5), "c.test": (0.3, 1e7)},
+                            cache_path=str(tmp_path / "mirrors.json"), clock=clock)
+    assert registry.stale(registry.alternatives(URL))
+    registry.probe(registry.alternatives(URL))
+    assert registry.candidates(URL) == ["https://c.test/tool/setup.exe", URL,
+                                        "https://b.test/mirror/pub/tool/setup.exe"]
+    assert registry.score("https://c.test/") == 0.3 + REFERENCE_SIZE / 1e7
+    assert json.loads((tmp_path / "mirrors.json").read_text())["c.test"]["probed"] == clock.now
+
+    # The next start reads the ranking instead of probing.
+    reopened = StubRegistry({}, cache_path=str(tmp_path / "mirrors.json"), clock=clock)
+    assert reopened.candidates(URL)[0] == "https://c.test/tool/setup.exe"
+    assert reopened.probed == []
+
+
+def test_measurements_expire_after_the_ttl():
+    clock = FakeClock()
+    registry = StubRegistry({"a.test": (0.1, 1e6), "b.test": (0.1, 2e6), "c.test": (0.1, 3e6)},
+                            ttl=60, clock=clock)
+    urls = registry.alternatives(URL)
+    registry.probe(urls)
+    clock.now += 60
+    assert not registry.stale(urls)
+    registry.candidates(URL)
+    assert registry._probing is None
+
+    clock.now += 1
+    registry.speeds["a.test"] = (0.1, 9e6)
+    assert registry.stale(urls)
+    # The stale ranking is answered at once and refreshed for next time.
+    assert registry.candidates(URL)[0] == "https://c.test/tool/setup.exe"
+    registry._probing.join()
+    assert not registry.stale(urls)
+    assert registry.candidates(URL)[0] == URL
+
+
+def test_report_failure_demotes_a_host_until_it_is_probed_again():
+    clock = FakeClock()
+    registry = StubRegistry({"a.test": (0.1, 9e6), "b.test": (0.1, 2e6), "c.test": (0.1, 1e6)},
+                            ttl=60, clock=clock)
+    registry.probe(registry.alternatives(URL))
+    registry.report_failure("https://a.test/pub/other.zip")
+    assert registry.candidates(URL) == ["https://b.test/mirror/pub/tool/setup.exe",
+                                        "https://c.test/tool/setup.exe", URL]
+    assert registry._probing is None  # a failure is a measurement, not a reason to probe
+
+    clock.now += 61
+    registry.candidates(URL)
+    registry._probing.join()
+    assert registry.candidates(URL)[0] == URL
+
+
+def test_measure_reads_a_small_range(range_server):
+    range_server.serve("/pub/setup.exe", b"x" * (2 * PROBE_BYTES), '"x"')
+    registry = MirrorRegistry([])
+    stats = registry._measure(f"{range_server.url}/pub/setup.exe")
+    assert stats["rtt"] is not None and stats["throughput"] > 0
+    assert range_server.ranges("/pub/setup.exe") == [(f"bytes=0-{PROBE_BYTES - 1}", None)]
+    missing = registry._measure(f"{range_server.url}/missing")
+    assert missing["rtt"] is not None and missing["throughput"] == 0.0
+    assert registry.score(f"{range_server.url}/never-probed") == float("inf")
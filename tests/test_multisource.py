@@ -0,0 +1,80 @@
+# This Python file uses the following encoding: utf-8
+from downloader import SegmentedDownloader
+from multisource import SegmentPlanner
+
+SIZE = 8 * 1024 * 1024
+CHUNK = 64 * 1024
+DATA = (bytes(range(251)) * (SIZE // 251 + 1))[:SIZE]
+
+
+def record_claims(monkeypatch) -> list[tuple[int, int, str]]:
+    claims = []
+    claim = SegmentPlanner.claim
+
+    def recording(self, piece, amount):
+        offset, count = claim(self, piece, amount)
+        if count:
+            claims.append((offset, count, piece.source))
+        return offset, count
+
+    monkeypatch.setattr(SegmentPlanner, "claim", recording)
+    return claims
+
+
+def assert_written_once(claims):
+    position = 0
+    for offset, count, _ in sorted(claims):
+        assert offset == position, f"gap or overlap at {position}"
+        position += count
+    assert position == SIZE
+
+
+def served(claims, url: str) -> int:
+    return sum(count for _, count, source in claims if source == url)
+
+
+def download(range_server, mirror_server, tmp_path):
+    range_server.serve("/setup.exe", DATA, '"a"')
+    mirror_server.serve("/mirror/setup.exe", DATA, '"b"')
+    urls = [f"{range_server.url}/setup.exe", f"{mirror_server.url}/mirror/setup.exe"]
+    downloader = SegmentedDownloader(segments=4, chunk_size=CHUNK, retries=1, stall_timeout=5)
+    progress = []
+    remote = downloader.probe(urls[0])
+    downloader.download(urls[0], tmp_path / "setup.exe", progress.append, remote=remote, sources=urls)
+    assert (tmp_path / "setup.exe").read_bytes() == DATA
+    assert sum(progress) == SIZE
+    return urls
+
+
+def test_slow_mirror_loses_its_tail(range_server, mirror_server, tmp_path, monkeypatch):
+    claims = record_claims(monkeypatch)
+    mirror_server.delay = 0.5
+    fast, slow = download(range_server, mirror_server, tmp_path)
+    assert_written_once(claims)
+    # The mirror started on half of the file; most of it was taken over.
+    assert 0 < served(claims, slow) < SIZE // 4 and served(claims, fast) > 3 * SIZE // 4
+
+
+def test_failing_mirror_is_retired_and_its_bytes_refetched(range_server, mirror_server, tmp_path, monkeypatch):
+    claims = record_claims(monkeypatch)
+    mirror_server.drops, mirror_server.drop_after = 100, 300 * 1024
+    fast, failing = download(range_server, mirror_server, tmp_path)
+    assert_written_once(claims)
+    assert served(claims, failing) > 0
+    # One try and one retry, then the mirror is retired for good.
+    assert len(mirror_server.ranges("/mirror/setup.exe")) <= 2 * 2
+
+
+def test_plan_covers_the_file_once():
+    planner = SegmentPlanner([(0, SIZE - 1)], ["a", "b"], min_steal=1024 * 1024)
+    first = planner.take("a")
+    assert planner.claim(first, CHUNK) == (0, CHUNK)
+    stolen = planner.take("b")  # the queue is empty: b takes a's tail
+    assert stolen.source == "b" and stolen.end == SIZE - 1 and first.end == stolen.pos - 1
+    assert planner.claim(first, SIZE)[1] == first.end + 1 - CHUNK
+    assert planner.claim(first, CHUNK) == (first.end + 1, 0)
+    planner.retire("b", OSError("gone"))
+    planner.release(stolen)  # unwritten bytes go back to the queue
+    again = planner.take("b")
+    assert (again.pos, again.end, again.source) == (stolen.pos, SIZE - 1, "a")
+    assert planner.unfinished() is not None
@@ -0,0 +1,101 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+import pytest
+from pip._vendor.packaging.version import Version
+
+from indexcache import IndexCache, ProjectFile, ProjectIndex
+from indexfetch import IndexFetcher
+from installed import InstalledIndex
+from outdated import MAJOR, MINOR, OTHER, PATCH, dependency_closure, format_report, outdated_report, severity
+
+
+def install(site, name: str, version: str, requires=()):
+    info = site / f"{name}-{version}.dist-info"
+    info.mkdir(parents=True)
+    headers = [f"Name: {name}", f"Version: {version}"] + [f"Requires-Dist: {req}" for req in requires]
+    (info / "METADATA").write_text("\n".join(headers) + "\n\n")
+
+
+def publish(cache: IndexCache, name: str, *versions: str):
+    stem = name.replace("-", "_")
+    files = [ProjectFile(f"{stem}-{v}-py3-none-any.whl", f"https://files.test/{stem}-{v}-py3-none-any.whl", v)
+             for v in versions]
+    cache._store(ProjectIndex(name, cache.project_url(name), files, fetched=time.time()))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = IndexCache(tmp_path / "index.sqlite3", "https://index.test/simple/")
+    yield cache
+    cache.close()
+
+
+@pytest.mark.parametrize("installed, latest, level", [
+    ("1.2.3", "2.0", MAJOR),
+    ("1.2.3", "1.3.0", MINOR),
+    ("1.2", "1.2.1", PATCH),
+    ("1.2.3", "1.2.3.post1", OTHER),
+    ("2.0b1", "2.0", OTHER),
+    ("1.9", "2.0rc1", MAJOR),
+])
+def test_severity(installed, latest, level):
+    assert severity(Version(installed), Version(latest)) == level
+
+
+def test_closure_follows_extras_and_markers(tmp_path):
+    site = tmp_path / "site"
+    install(site, "app", "1.0", ["lib[fast]>=1", "winonly; sys_platform == 'nonexistent'", "missing"])
+    install(site, "lib", "1.0", ["base", "speedups; extra == 'fast'", "sphinx; extra == 'docs'"])
+    for name in ("base", "speedups", "sphinx", "winonly", "other"):
+        install(site, name, "1.0")
+    install(site, "other-root", "1.0", ["lib[docs]", "app"])
+    snapshot = InstalledIndex(directories=[str(site)]).snapshot()
+    assert dependency_closure(snapshot, ["App", "not-installed"]) == {
+        "app": None, "lib": "app", "base": "app", "speedups": "app"}
+    # Extras asked for later are followed on top of what was already found.
+    assert dependency_closure(snapshot, ["app", "other-root"]) == {
+        "app": None, "lib": "app", "base": "app", "speedups": "app", "other-root": None, "sphinx": "other-root"}
+
+
+def test_report_is_sorted_by_severity(tmp_path, cache):
+    site = tmp_path / "site"
+    install(site, "app", "1.0", ["dep", "pre"])
+    install(site, "dep", "1.2.3")
+    install(site, "pre", "2.0b1")
+    install(site, "tool", "3.1")
+    install(site, "current", "1.0")
+    publish(cache, "app", "1.0", "2.0")
+    publish(cache, "dep", "1.2.3", "1.2.4", "1.3.0a1")  # pre-releases are not offered
+    publish(cache, "pre", "2.0b1", "2.0")
+    publish(cache, "tool", "3.1", "3.2")
+    publish(cache, "current", "1.0", "1.1.dev0")
+    entries = outdated_report(["app", "tool", "current", "uncached"], cache,
+                              InstalledIndex(directories=[str(site)]))
+    assert [(e.name, e.installed, e.latest, e.severity_name, e.required_by) for e in entries] == [
+        ("app", "1.0", "2.0", "major", None),
+        ("tool", "3.1", "3.2", "minor", None),
+        ("dep", "1.2.3", "1.2.4", "patch", "app"),
+        ("pre", "2.0b1", "2.0", "other", "app"),
+    ]
+    assert format_report(entries).splitlines()[2] == "dep   1.2.3 -> 1.2.4  patch  (via app)"
+    assert format_report([]) == "Everything is up to date."
+
+
+def test_warm_report_takes_well_under_a_second(tmp_path, cache):
+    # About the catalog's pip libraries plus what they pull in.
+    site = tmp_path / "site"
+    names = [f"project-{i}" for i in range(300)]
+    for i, name in enumerate(names):
+        install(site, name, "1.0", [f"project-{i + 1}"] if i % 2 == 0 else [])
+        publish(cache, name, *(f"1.{minor}" for minor in range(20)))
+    installed = InstalledIndex(directories=[str(site)])
+    installed.refresh()
+    fetcher = IndexFetcher(cache)
+    elapsed = []
+    for _ in range(3):
+        start = time.perf_counter()
+        entries = outdated_report(names[::2], cache, installed, fetcher)
+        elapsed.append(time.perf_counter() - start)
+    assert len(entries) == len(names) and {e.latest for e in entries} == {"1.19"}
+    assert min(elapsed) < 0.5, f"{min(elapsed):.2f} s"
@@ -0,0 +1,75 @@
+# This Python file uses the following encoding: utf-8
+import io
+import json
+import logging
+import zipfile
+
+import pytest
+
+from indexcache import IndexCache
+from installed import InstalledIndex
+from pipbatch import BatchInstaller, install_waves
+from resolvecache import ResolutionCache
+
+PROJECTS = {
+    "app": ["lib", "tool"],
+    "tool": ["lib"],
+    "lib": ["base"],
+    "base": [],
+}
+
+
+def test_waves_follow_dependencies():
+    edges = {"app": {"lib", "tool", "python"}, "tool": {"lib"}, "lib": {"base"}, "cli": set()}
+    assert install_waves(["app", "tool", "lib", "base", "cli"], edges) == [
+        ["base", "cli"], ["lib"], ["tool"], ["app"]]
+
+
+def test_waves_break_cycles_at_the_least_blocked_package():
+    edges = {"a": {"b"}, "b": {"c", "a"}, "c": {"a"}, "d": {"c"}, "self": {"self"}}
+    assert install_waves(["a", "b", "c", "d", "self"], edges) == [["self"], ["a"], ["c"], ["b", "d"]]
+
+
+def wheel(name: str, metadata: bytes) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr(f"{name}-1.0.dist-info/METADATA", metadata)
+        zf.writestr(f"{name}-1.0.dist-info/WHEEL", "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n")
+        zf.writestr(f"{name}-1.0.dist-info/RECORD", "")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def installer(range_server, tmp_path, monkeypatch):
+    monkeypatch.delenv("PIP_EXTRA_INDEX_URL", raising=False)
+    for name, requires in PROJECTS.items():
+        filename = f"{name}-1.0-py3-none-any.whl"
+        entry = {"filename": filename, "url": f"../../files/{filename}", "hashes": {}, "core-metadata": True}
+        lines = ["Metadata-Version: 2.1", f"Name: {name}", "Version: 1.0"]
+        lines += [f"Requires-Dist: {req}" for req in requires]
+        metadata = ("\n".join(lines) + "\n\n").encode()
+        range_server.serve(f"/files/{filename}", wheel(name, metadata), '"w"')
+        range_server.serve(f"/files/{filename}.metadata", metadata, '"m"')
+        page = {"meta": {"api-version": "1.0"}, "name": name, "files": [entry]}
+        range_server.serve(f"/simple/{name}/", json.dumps(page).encode(), '"p"',
+                           "application/vnd.pypi.simple.v1+json")
+    index = IndexCache(tmp_path / "index.sqlite3", f"{range_server.url}/simple/")
+    cache = ResolutionCache(tmp_path / "resolutions.sqlite3", index, InstalledIndex(directories=[]))
+    installer = BatchInstaller(["--index-url", f"{range_server.url}/simple/", "--no-cache-dir"],
+                               resolve_cache=cache)
+    yield installer
+    installer.close()
+    cache.close()
+    index.close()
+
+
+def test_second_resolve_comes_from_the_cache(installer, range_server, caplog):
+    expected = [("app", "1.0"), ("base", "1.0"), ("lib", "1.0"), ("tool", "1.0")]
+    with caplog.at_level(logging.INFO, logger="pipbatch"):
+        assert installer.install(["app"], dry_run=True) == expected
+        assert "Reusing" not in caplog.text
+        range_server.requests.clear()
+        assert installer.install(["app"], dry_run=True) == expected
+    assert "Reusing the resolution of app" in caplog.text
+    # Candidates came from the cached pages; pip asked the index for nothing.
+    assert not [path for path, _ in range_server.requests if path.startswith("/simple/")]
@@ -0,0 +1,61 @@
+# This Python file uses the following encoding: utf-8
+import threading
+import time
+
+import pytest
+
+from pipservice import OperationCancelled, PipService
+
+
+@pytest.fixture
+def service():
+    service = PipService()
+    yield service
+    service.shutdown(cancel_pending=True, cancel_current=True)
+
+
+def until_cancelled(service: PipService, started: threading.Event):
+    started.set()
+    while True:
+        service._checkpoint()
+        time.sleep(0.01)
+
+
+def test_requests_run_in_submission_order(service):
+    seen = []
+    futures = [service._submit(seen.append, i) for i in range(5)]
+    for future in futures:
+        future.result(timeout=5)
+    assert seen == list(range(5))
+
+
+def test_cancel_drops_queued_and_stops_running_requests(service):
+    started = threading.Event()
+    running = service._submit(until_cancelled, service, started)
+    queued = service._submit(lambda: "ran")
+    after = service._submit(lambda: "ran")
+    assert started.wait(5)
+    assert service.cancel(queued) and queued.cancelled()
+    assert service.cancel(running)
+    with pytest.raises(OperationCancelled):
+        running.result(timeout=5)
+    assert after.result(timeout=5) == "ran"
+
+
+def test_errors_reach_the_future(service):
+    future = service._submit(lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        future.result(timeout=5)
+    assert service._submit(lambda: "still serving").result(timeout=5) == "still serving"
+
+
+def test_shutdown_waits_for_the_running_request_to_stop():
+    service = PipService()
+    started = threading.Event()
+    running = service._submit(until_cancelled, service, started)
+    queued = service._submit(lambda: "ran")
+    assert started.wait(5)
+    service.shutdown(wait=True, cancel_pending=True, cancel_current=True)
+    assert not service._thread.is_alive()
+    assert isinstance(running.exception(timeout=0), OperationCancelled)
+    assert queued.cancelled()
@@ -0,0 +1,14 @@
+# This Python file uses the following encoding: utf-8
+import os
+
+from prefetch import WheelBundle
+
+
+def test_requirements_files_stay_inside_the_bundle(tmp_path):
+    bundle = WheelBundle(tmp_path / "bundle")
+    paths = {label: bundle.requirements_path(label) for label in ("linux", "../../escape", "a/b", "a-b")}
+
+    assert paths["linux"] == os.path.join(bundle.root, "requirements-linux.txt")
+    for path in paths.values():
+        assert os.path.dirname(path) == bundle.root
+    assert len(set(paths.values())) == len(paths)
@@ -0,0 +1,89 @@
+# This Python file uses the following encoding: utf-8
+import math
+import time
+
+import pytest
+
+from progress import ProgressAggregator, RateEstimator
+from scheduler import DownloadScheduler
+
+
+def test_rate_converges_with_the_time_constant():
+    estimator = RateEstimator(tau=2.0)
+    assert estimator.sample(0.0, 0) == 0.0  # the first sample only sets the origin
+    # A step to 1 MB/s reaches 1 - 1/e of it after one time constant.
+    for i in range(1, 21):
+        estimator.sample(i * 0.1, i * 100_000)
+    assert estimator.rate == pytest.approx(1e6 * (1 - math.exp(-1)))
+    for i in range(21, 201):
+        estimator.sample(i * 0.1, i * 100_000)
+    assert estimator.rate == pytest.approx(1e6, rel=1e-3)
+
+
+def test_rate_smooths_out_bursts():
+    estimator = RateEstimator(tau=2.0)
+    done = 0
+    for i in range(200):
+        done += 200_000 if i % 2 else 0  # 1 MB/s on average, in bursts
+        estimator.sample(i * 0.1, done)
+    assert estimator.rate == pytest.approx(1e6, rel=0.05)
+    # A stall shows up as the rate decays, even without new bytes.
+    before = estimator.rate
+    estimator.sample(19.9 + 2.0, done)
+    assert estimator.rate == pytest.approx(before * math.exp(-1))
+
+
+def test_restart_rebases_instead_of_going_negative():
+    estimator = RateEstimator()
+    estimator.sample(0.0, 0)
+    estimator.sample(1.0, 500_000)
+    rate = estimator.rate
+    assert estimator.sample(1.5, 0) == rate
+    estimator.sample(2.5, 100_000)
+    assert 0 < estimator.rate < rate
+
+
+def test_eta():
+    estimator = RateEstimator()
+    assert estimator.eta(1000) == -1.0  # no rate yet
+    assert estimator.eta(0) == 0.0
+    estimator.rate = 250_000.0
+    assert estimator.eta(1_000_000) == 4.0
+
+
+def test_aggregator_coalesces_and_forgets_finished_jobs():
+    progress = ProgressAggregator()
+    progress.add(1, "a.exe")
+    progress.add(2, "b.exe", total=100)
+    assert [key for key, _ in sorted(progress.drain())] == [1, 2]
+    for _ in range(10):
+        progress.advance(1, 5)
+    progress.update(1, state="running", total=50)
+    assert progress.drain() == [(1, {"name": "a.exe", "done": 50, "total": 50, "state": "running", "error": ""})]
+    assert progress.drain() == []
+
+    progress.update(1, state="done")
+    progress.update(2, state="cancelled")
+    assert sorted((key, entry["state"]) for key, entry in progress.drain()) == [(1, "done"), (2, "cancelled")]
+    assert progress._entries == {}
+    progress.advance(1, 5)  # a chunk that raced the cancellation
+    progress.update(2, state="cancelled")
+    assert progress.drain() == []
+
+
+def test_scheduler_jobs_leave_the_aggregator(range_server, tmp_path):
+    range_server.serve("/a.exe", b"a" * 4096, '"a"')
+    range_server.serve("/b.exe", b"b" * 4096, '"b"')
+    range_server.delay = 0.2
+    progress = ProgressAggregator()
+    scheduler = DownloadScheduler(max_jobs=1, progress=progress)
+    first = scheduler.submit(f"{range_server.url}/a.exe", tmp_path / "a.exe")
+    second = scheduler.submit(f"{range_server.url}/b.exe", tmp_path / "b.exe")
+    scheduler.cancel(second)
+    while not first.finished:
+        time.sleep(0.01)
+    scheduler.shutdown()
+    final = dict(progress.drain())
+    assert final[first.id]["state"] == "done" and final[first.id]["done"] == 4096
+    assert final[second.id]["state"] == "cancelled"
+    assert progress._entries == {}
@@ -0,0 +1,133 @@
+# This Python file uses the following encoding: utf-8
+import json
+import threading
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from pypisync import LAST_SERIAL_HEADER, PyPISync
+
+
+class PyPIStandIn(ThreadingHTTPServer):
+    """The parts of PyPI that ``PyPISync`` uses: XML-RPC at ``/pypi``, the
+    JSON API and the serial header of ``/simple/``.
+
+    ``projects`` maps display names to their last serial and ``changelog``
+    holds ``(name, version, timestamp, action, serial)`` rows.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _PyPIHandler)
+        self.projects: dict[str, int] = {}
+        self.changelog: list[tuple] = []
+        self.requests: list[str] = []  # "GET /path", "HEAD /path" or the XML-RPC method
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}/"
+
+    @property
+    def serial(self) -> int:
+        return max([serial for *_, serial in self.changelog] + list(self.projects.values()))
+
+    def change(self, name: str, action: str):
+        serial = self.serial + 1
+        self.changelog.append((name, "", 0, action, serial))
+        if action == "remove project":
+            del self.projects[name]
+        else:
+            self.projects[name] = serial
+
+
+class _PyPIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header(LAST_SERIAL_HEADER, str(self.server.serial))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.server.requests.append(f"HEAD {self.path}")
+        self._reply(200 if self.path == "/simple/" else 404)
+
+    def do_GET(self):
+        server: PyPIStandIn = self.server
+        server.requests.append(f"GET {self.path}")
+        names = {name.lower(): name for name in server.projects}
+        name = names.get(self.path.removeprefix("/pypi/").removesuffix("/json"))
+        if name is None:
+            self._reply(404)
+            return
+        info = {"name": name, "summary": f"{name} at {server.projects[name]}", "version": "1.0"}
+        self._reply(200, json.dumps({"info": info}).encode())
+
+    def do_POST(self):
+        server: PyPIStandIn = self.server
+        params, method = xmlrpc.client.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.requests.append(method)
+        if method == "changelog_last_serial":
+            result = server.serial
+        elif method == "list_packages_with_serial":
+            result = dict(server.projects)
+        else:
+            result = [row for row in server.changelog if row[-1] > params[0]]
+        self._reply(200, xmlrpc.client.dumps((result,), methodresponse=True).encode(), "text/xml")
+
+
+@pytest.fixture
+def pypi():
+    server = PyPIStandIn()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_only_changed_projects_are_refetched(pypi, tmp_path):
+    pypi.projects.update({"Foo-Bar": 3, "baz": 5, "qux": 4})
+    sync = PyPISync(tmp_path / "pypi.sqlite3", pypi.url)
+    assert sync.sync() == []
+    assert sync.serial == 5 and sync.refresh_summaries() == 3
+
+    pypi.change("Foo-Bar", "new release")
+    pypi.change("baz", "remove project")
+    pypi.requests.clear()
+    assert sync.sync() == ["baz", "foo-bar"]
+    assert sync.serial == 7 and sync.stale() == ["foo-bar"]
+    assert sync.refresh_summaries() == 1
+    assert [r for r in pypi.requests if r.startswith("GET")] == ["GET /pypi/foo-bar/json"]
+    assert [(entry.name, entry.description) for entry in sync.catalog()] == [
+        ("Foo-Bar", "Foo-Bar at 6"), ("qux", "qux at 4")]
+
+    pypi.requests.clear()
+    assert sync.sync() == []
+    assert pypi.requests == ["HEAD /simple/"]
+    sync.close()
+
+
+def test_bulk_load_recovers_from_a_failed_load(pypi, tmp_path, monkeypatch):
+    pypi.projects.update({"foo": 1, "bar": 2})
+    sync = PyPISync(tmp_path / "pypi.sqlite3", pypi.url)
+
+    def fail(serial):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sync, "_set_serial", fail)
+    with pytest.raises(OSError):
+        sync.bulk_load()
+    monkeypatch.undo()
+    assert sync.bulk_load() == 2
+    assert sorted(entry.name for entry in sync.catalog()) == ["bar", "foo"]
+    sync.close()
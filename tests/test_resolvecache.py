@@ -0,0 +1,61 @@
+# This Python file uses the following encoding: utf-8
+import json
+import zlib
+
+import pytest
+from pip._internal.models.target_python import TargetPython
+
+from indexcache import IndexCache
+from installed import InstalledIndex
+from resolvecache import Pin, ResolutionCache
+
+PROJECTS = {"python-dateutil": "2.8.2", "six": "1.16.0"}
+
+
+@pytest.fixture
+def cache(range_server, tmp_path):
+    for name, version in PROJECTS.items():
+        filename = f"{name.replace('-', '_')}-{version}-py2.py3-none-any.whl"
+        page = {"meta": {"api-version": "1.0"}, "name": name,
+                "files": [{"filename": filename, "url": f"../../files/{filename}", "hashes": {}}]}
+        range_server.serve(f"/simple/{name}/", json.dumps(page).encode(), '"p"',
+                           "application/vnd.pypi.simple.v1+json")
+    site = tmp_path / "site-packages"
+    (site / "six-1.16.0.dist-info").mkdir(parents=True)
+    (site / "six-1.16.0.dist-info" / "METADATA").write_text("Name: six\nVersion: 1.16.0\n\n")
+    index = IndexCache(tmp_path / "index.sqlite3", f"{range_server.url}/simple/")
+    cache = ResolutionCache(tmp_path / "resolutions.sqlite3", index,
+                            InstalledIndex(directories=[str(site)]))
+    yield cache
+    cache.close()
+    index.close()
+
+
+DATEUTIL = Pin("python-dateutil", "2.8.2", "python_dateutil-2.8.2-py2.py3-none-any.whl")
+SIX = Pin("six", "1.16.0", installed=True)
+
+
+def test_installed_dependencies_are_replayed(cache):
+    target = TargetPython()
+    assert cache.store("k", ["python-dateutil"], [DATEUTIL, SIX], {"python-dateutil": {"six"}}, target)
+    resolution = cache.lookup("k", target)
+    assert [pin.requirement for pin in resolution.pins] == ["python-dateutil==2.8.2", "six==1.16.0"]
+
+
+def test_open_closures_are_not_stored(cache):
+    target = TargetPython()
+    assert cache.store("k", ["python-dateutil"], [DATEUTIL], {"python-dateutil": {"six"}}, target) is None
+    assert cache.store("k", ["python-dateutil<2.8"], [DATEUTIL, SIX], {"python-dateutil": {"six"}},
+                       target) is None
+    assert cache.lookup("k", target) is None
+
+
+def test_entries_that_lost_their_closure_are_dropped(cache):
+    target = TargetPython()
+    cache.store("k", ["python-dateutil"], [DATEUTIL, SIX], {"python-dateutil": {"six"}}, target)
+    # As a FORMAT 1 entry built from ``to_install`` would be: six is missing.
+    cache._db.execute("UPDATE resolutions SET resolution = ?", (zlib.compress(json.dumps({
+        "pins": [vars(DATEUTIL)], "edges": {"python-dateutil": ["six"]}, "fingerprint": "",
+        "created": 0.0, "requirements": ["python-dateutil"]}).encode()),))
+    assert cache.lookup("k", target) is None
+    assert cache._db.execute("SELECT COUNT(*) FROM resolutions").fetchone() == (0,)
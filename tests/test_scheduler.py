@@ -0,0 +1,42 @@
+# This Python file uses the following encoding: utf-8
+import time
+
+import pytest
+
+from scheduler import DONE, DownloadScheduler, JobQueue
+
+
+def test_same_url_and_dest_share_one_job(range_server, tmp_path):
+    range_server.serve("/a.exe", b"a" * 4096, '"a"')
+    range_server.serve("/other/a.exe", b"b" * 4096, '"b"')
+    range_server.delay = 0.2  # keep the first job running while the others are submitted
+    scheduler = DownloadScheduler(max_jobs=2)
+    dest = tmp_path / "a.exe"
+    try:
+        first = scheduler.submit(f"{range_server.url}/a.exe", dest)
+        assert scheduler.submit(f"{range_server.url}/a.exe", dest) is first
+        with pytest.raises(ValueError):
+            scheduler.submit(f"{range_server.url}/other/a.exe", dest)
+    finally:
+        scheduler.shutdown()
+    assert first.state == DONE
+    assert scheduler.jobs() == [first]
+    assert dest.read_bytes() == b"a" * 4096
+
+
+def test_finished_job_can_be_submitted_again(range_server, tmp_path):
+    range_server.serve("/a.exe", b"a" * 4096, '"a"')
+    scheduler = DownloadScheduler(max_jobs=1)
+    dest = tmp_path / "a.exe"
+    first = scheduler.submit(f"{range_server.url}/a.exe", dest)
+    while not first.finished:
+        time.sleep(0.01)
+    assert first.state == DONE
+    second = scheduler.submit(f"{range_server.url}/a.exe", dest)
+    scheduler.shutdown()
+    assert second is not first and second.state == DONE
+
+
+def test_job_queue_needs_a_wake_up():
+    with pytest.raises(TypeError):
+        JobQueue()
@@ -0,0 +1,74 @@
+# This Python file uses the following encoding: utf-8
+import random
+import time
+
+import pytest
+
+from catalog import Catalog
+from search import SearchIndex, SearchSession
+
+NAMES = {"pandas": "Python 数据分析库", "django": "高性能 Python Web 框架", "requests": "Python HTTP 库",
+         "numpy": "Python 科学计算库"}
+
+
+def catalog(size: int = 20000) -> Catalog:
+    rng = random.Random(1)
+    parts = ["py", "data", "web", "req", "pan", "das", "num", "dj", "ango", "test", "http", "cli"]
+    names = dict(NAMES)
+    while len(names) < size:
+        names.setdefault("-".join(rng.choice(parts) + rng.choice(parts) for _ in range(rng.randint(1, 3))), "")
+    return Catalog.from_mappings(names)
+
+
+def names(index: SearchIndex, query: str) -> list[str]:
+    return [index.catalog[row].name for row in index.search(query)]
+
+
+def test_exact_fuzzy_and_cjk_queries():
+    index = SearchIndex(catalog())
+    assert names(index, "pandas")[0] == "pandas"
+    assert names(index, "pandsa")[0] == "pandas"
+    assert names(index, "djanog")[0] == "django"
+    assert "numpy" in names(index, "科学计算")
+
+
+def test_typing_narrows_to_the_same_results():
+    index = SearchIndex(catalog())
+    for query in ("requests", "py-data", "http cli"):
+        session = SearchSession(index)
+        for end in range(1, len(query) + 1):
+            assert session.search(query[:end]) == index.search(query[:end])
+
+
+KEYSTROKE_BUDGET = 0.005  # seconds
+SYLLABLES = ["py", "thon", "dj", "ango", "flask", "req", "uests", "num", "pan", "das", "sci", "kit", "learn",
+             "torch", "tensor", "flow", "data", "web", "api", "client", "server", "tools", "util", "lib",
+             "core", "aws", "azure", "google", "cloud", "test", "mock", "json", "yaml", "xml", "http",
+             "async", "io", "db", "sql", "orm", "cli", "log", "auth", "crypto", "img", "plot", "ml", "nlp",
+             "text", "parse", "graph", "net", "ui", "qt", "gui", "fast", "lite", "mini", "micro", "open", "auto"]
+
+
+@pytest.fixture(scope="module")
+def large_index() -> SearchIndex:
+    rng = random.Random(1)
+    names = dict(NAMES)
+    while len(names) < 500_000:
+        words = ["".join(rng.choice(SYLLABLES) for _ in range(rng.choice([1, 2])))
+                 for _ in range(rng.choice([1, 2, 2, 3, 3, 4]))]
+        names.setdefault(rng.choice(["-", "_", ""]).join(words), "")
+    return SearchIndex(Catalog.from_mappings(names))
+
+
+def test_keystrokes_stay_under_budget(large_index):
+    slowest = {}
+    for query in ("flask-sql", "web async", "tensorflwo", "pandsa", "google cloud storage", "auth crypto",
+                  "python-dateutil", "ml nlp text", "科学计算"):
+        for _ in range(3):  # best of three, to ride out scheduler noise
+            session = SearchSession(large_index)
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                session.search(query[:end])
+                elapsed = time.perf_counter() - start
+                slowest[query[:end]] = min(elapsed, slowest.get(query[:end], elapsed))
+    over = {prefix: f"{elapsed * 1000:.1f} ms" for prefix, elapsed in slowest.items() if elapsed > KEYSTROKE_BUDGET}
+    assert not over
@@ -0,0 +1,40 @@
+# This Python file uses the following encoding: utf-8
+import os
+import sys
+
+import snapshot
+from catalog import Catalog
+from inf import pip_libraries
+from snapshot import CatalogSnapshot, LayeredCatalog, build_layer, build_snapshot, load_catalog
+
+
+def test_layer_rows_listed_in_the_base_appear_once(tmp_path):
+    build_snapshot(Catalog.from_mappings({"PyYAML": "YAML", "requests": "HTTP"}), tmp_path / "base")
+    build_layer(Catalog(["zope", "pyyaml", "Requests", "aiohttp"], ["", "", "", "async"]), tmp_path / "layer")
+    catalog = LayeredCatalog(CatalogSnapshot(tmp_path / "base"), CatalogSnapshot(tmp_path / "layer"))
+
+    assert [(entry.name, entry.description) for entry in catalog] == [
+        ("PyYAML", "YAML"), ("requests", "HTTP"), ("aiohttp", "async"), ("zope", "")]
+    assert catalog[-1].name == "zope"
+
+
+def test_rebuilding_inf_keeps_the_sync_layer(tmp_path):
+    base, layer = tmp_path / "catalog.snapshot", tmp_path / "catalog-pypi.snapshot"
+    build_layer(Catalog(["aiohttp", "zope"]), layer)
+    os.utime(layer, (0, 0))
+    build_snapshot(Catalog([]), base)
+    os.utime(base, (0, 0))  # older than inf.py
+
+    names = [entry.name for entry in load_catalog(base, layer)]
+    assert names[:len(pip_libraries)] == list(pip_libraries)
+    assert names[-2:] == ["aiohttp", "zope"]
+    assert [entry.name for entry in CatalogSnapshot(layer)] == ["aiohttp", "zope"]
+
+
+
+def test_other_byte_order_reads_what_it_wrote(tmp_path, monkeypatch):
+    # Both sides swap, so this runs the branch the host does not take.
+    monkeypatch.setattr(snapshot.sys, "byteorder", "big" if sys.byteorder == "little" else "little")
+    catalog = Catalog.from_mappings({"numpy": "arrays", "pandas": "frames"}, {"7-Zip": ["https://x/64", ""]})
+    build_snapshot(catalog, tmp_path / "swapped")
+    assert list(CatalogSnapshot(tmp_path / "swapped")) == list(catalog)
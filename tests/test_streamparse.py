@@ -0,0 +1,27 @@
+# This Python file uses the following encoding: utf-8
+from indexcache import ProjectFile
+from streamparse import find_best
+
+
+def wheel(filename: str, sha256: str | None = None) -> ProjectFile:
+    return ProjectFile(filename, f"https://files.example/{filename}", "1.0", sha256=sha256)
+
+
+def test_a_later_rebuild_wins_over_the_same_wheel():
+    files = [(wheel("demo-1.0-py3-none-any.whl"), 0), (wheel("demo-1.0-2-py3-none-any.whl"), 0),
+             (wheel("demo-1.0-10-py3-none-any.whl"), 0), (wheel("demo-1.0.tar.gz"), 5)]
+    assert find_best(files, "==1.0").filename == "demo-1.0-10-py3-none-any.whl"
+    assert find_best(files).filename == "demo-1.0-10-py3-none-any.whl"
+
+
+def test_a_pin_stops_reading_once_every_hash_was_seen():
+    read = []
+
+    def files():
+        for i, name in enumerate(["demo-1.0-py3-none-any.whl", "demo-1.0-1-py3-none-any.whl",
+                                  "demo-1.0-2-py3-none-any.whl"]):
+            read.append(name)
+            yield wheel(name, str(i)), 0
+
+    assert find_best(files(), "==1.0", hashes=["0", "1"]).filename == "demo-1.0-1-py3-none-any.whl"
+    assert len(read) == 2
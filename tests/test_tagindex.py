@@ -0,0 +1,63 @@
+# This Python file uses the following encoding: utf-8
+import pytest
+from pip._internal.models.target_python import TargetPython
+from pip._internal.models.wheel import Wheel
+from pip._vendor.packaging.version import Version
+
+from tagindex import TagIndex, is_free_threaded, parse_filename, supported_tags
+
+LINUX = TargetPython(platforms=["manylinux2014_x86_64", "linux_x86_64"], py_version_info=(3, 11),
+                     abis=["cp311"], implementation="cp")
+FREE_THREADED = TargetPython(platforms=["manylinux2014_x86_64", "linux_x86_64"], py_version_info=(3, 13),
+                             abis=["cp313t"], implementation="cp")
+
+FILENAMES = [
+    "demo-1.0-py3-none-any.whl",
+    "demo-1.0-py2.py3-none-any.whl",
+    "demo-1.0-cp311-cp311-manylinux2014_x86_64.whl",
+    "demo-1.0-cp311-cp311-linux_x86_64.whl",
+    "demo-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl",
+    "demo-1.0-cp37-abi3-manylinux2014_x86_64.whl",
+    "demo-1.0-cp311-none-any.whl",
+    "demo-1.0-cp313-cp313t-manylinux2014_x86_64.whl",
+    "demo-1.0-cp313-cp313-manylinux2014_x86_64.whl",
+    "demo-1.0-cp311-cp311-win_amd64.whl",
+    "demo-1.0-py3-none-macosx_11_0_arm64.whl",
+]
+
+
+def test_parse_filename():
+    wheel = parse_filename("Demo_Pkg-1.0-2-py2.py3-none-any.whl")
+    assert wheel.name == "demo-pkg" and wheel.version == Version("1.0")
+    assert wheel.tags == ("py2-none-any", "py3-none-any")
+    sdist = parse_filename("demo-pkg-2.0rc1.tar.gz")
+    assert sdist.name == "demo-pkg" and sdist.version == Version("2.0rc1") and sdist.tags is None
+    for bad in ("demo-1.0-x-py3-none-any.whl", "demo-notaversion-py3-none-any.whl", "demo-1.0.exe",
+                "demo.tar.gz"):
+        assert parse_filename(bad) is None, bad
+
+
+@pytest.mark.parametrize("target", [LINUX, FREE_THREADED, TargetPython()], ids=["cp311", "cp313t", "running"])
+def test_ranks_follow_pips_tag_priority(target):
+    index = TagIndex(target)
+    tags = supported_tags(target)
+    for filename in FILENAMES:
+        wheel = Wheel(filename)
+        expected = wheel.support_index_min(tags) if wheel.supported(tags) else None
+        assert index.rank(filename) == expected, filename
+        assert index.supports(filename) == (expected is not None)
+    assert index.rank("demo-1.0.tar.gz") == len(tags)
+    assert index.supports("demo-1.0.tar.gz")
+
+
+def test_free_threaded_targets_drop_abi3_and_gil_wheels():
+    assert is_free_threaded(FREE_THREADED) and not is_free_threaded(LINUX)
+    tags = {str(tag) for tag in supported_tags(FREE_THREADED)}
+    assert "cp313-cp313t-manylinux2014_x86_64" in tags
+    assert not any("-abi3-" in tag for tag in tags)
+    assert "cp313-cp313-manylinux2014_x86_64" not in tags
+    index = TagIndex(FREE_THREADED)
+    assert index.rank("demo-1.0-cp37-abi3-manylinux2014_x86_64.whl") is None
+    assert index.rank("demo-1.0-cp313-cp313-manylinux2014_x86_64.whl") is None
+    assert index.rank("demo-1.0-cp313-cp313t-manylinux2014_x86_64.whl") is not None
+    assert "cp37-abi3-manylinux2014_x86_64" in {str(tag) for tag in supported_tags(LINUX)}
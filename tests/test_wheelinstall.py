@@ -0,0 +1,79 @@
+# This Python file uses the following encoding: utf-8
+import base64
+import csv
+import hashlib
+import os
+import threading
+import warnings
+import zipfile
+
+import pytest
+from pip._internal.operations.install import wheel as pip_wheel
+
+from wheelinstall import _scheme, install_wheel
+
+MEMBERS = {
+    "demo/__init__.py": "from demo.mod import main\n",
+    "demo/mod.py": 'PATTERN = "\\d+"  # an invalid escape warns when compiled\n\ndef main():\n    pass\n',
+    "demo/sub/__init__.py": "",
+    "demo/sub/data.bin": "\x00\x01",
+    "demo-1.0.data/data/share/demo/readme.txt": "shared data\n",
+    "demo-1.0.data/scripts/demo-tool": "#!python\nprint('tool')\n",
+    "demo-1.0.dist-info/METADATA": "Metadata-Version: 2.1\nName: demo\nVersion: 1.0\n\n",
+    "demo-1.0.dist-info/WHEEL": "Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    "demo-1.0.dist-info/entry_points.txt": "[console_scripts]\ndemo = demo:main\n",
+}
+
+
+@pytest.fixture
+def wheel(tmp_path):
+    path = tmp_path / "demo-1.0-py3-none-any.whl"
+    rows = []
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, text in MEMBERS.items():
+            data = text.encode()
+            zf.writestr(name, data)
+            digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=").decode()
+            rows.append(f"{name},sha256={digest},{len(data)}")
+        zf.writestr("demo-1.0.dist-info/RECORD", "\n".join(rows + ["demo-1.0.dist-info/RECORD,,"]) + "\n")
+    return str(path)
+
+
+def installed_tree(root: str) -> dict[str, bytes | None]:
+    """Every file under ``root``; ``.pyc`` contents are left out, they embed the source mtime."""
+    tree = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            tree[os.path.relpath(path, root)] = None if name.endswith(".pyc") else open(path, "rb").read()
+    return tree
+
+
+def record(root: str) -> list[list[str]]:
+    with open(os.path.join(root, "lib", "demo-1.0.dist-info", "RECORD"), newline="") as fh:
+        return sorted([path, "" if path.endswith(".pyc") else digest, size]
+                      for path, digest, size in csv.reader(fh))
+
+
+def test_matches_pips_installer(wheel, tmp_path):
+    pip_root, root = str(tmp_path / "pip"), str(tmp_path / "parallel")
+    pip_wheel.install_wheel("demo", wheel, _scheme(pip_root), "demo", warn_script_location=False)
+    install_wheel("demo", wheel, _scheme(root), "demo", warn_script_location=False, jobs=4)
+    tree = installed_tree(root)
+    assert tree == installed_tree(pip_root)
+    assert os.path.join("lib", "demo", "__pycache__") in {os.path.dirname(p) for p in tree}
+    assert sorted(os.listdir(os.path.join(root, "lib", "demo-1.0.dist-info"))) == \
+        sorted(os.listdir(os.path.join(pip_root, "lib", "demo-1.0.dist-info")))
+    assert record(root) == record(pip_root)
+
+
+def test_concurrent_installs_leave_warning_filters_alone(wheel, tmp_path):
+    before = list(warnings.filters)
+    threads = [threading.Thread(target=install_wheel, args=("demo", wheel, _scheme(str(tmp_path / str(i))), "demo"),
+                                kwargs={"warn_script_location": False, "jobs": 2}) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert warnings.filters == before
+    assert all(os.path.exists(tmp_path / str(i) / "lib" / "demo-1.0.dist-info" / "RECORD") for i in range(8))
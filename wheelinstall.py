@@ -0,0 +1,298 @@
+# This Python file uses the following encoding: utf-8
+"""Wheel installation with parallel extraction and byte-compilation.
+
+pip's ``_install_wheel`` saves the archive members one after another and then
+byte-compiles the installed ``.py`` files one after another.  For large
+wheels (pandas, scipy, tensorflow) both loops dominate the install.
+``install_wheel`` here follows the same steps with pip's own helpers, but
+unpacks the members and compiles the sources on a thread pool.  zlib and
+file I/O release the GIL, so extraction scales with cores on any
+interpreter; compilation only scales on a free-threaded build whose
+warning filters are per context (``python3.14t``) and otherwise stays serial.  With one core, or
+``jobs=1``, nothing is threaded and the install is pip's loop again.
+
+Run ``python wheelinstall.py WHEEL...`` to compare against pip.
+"""
+import argparse
+import contextlib
+import csv
+import logging
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import filterfalse
+from zipfile import ZipFile
+
+from pip._internal.exceptions import InstallationError
+from pip._internal.locations import get_scheme
+from pip._internal.metadata import FilesystemWheel, get_wheel_distribution
+from pip._internal.models.direct_url import DIRECT_URL_METADATA_NAME, DirectUrl
+from pip._internal.models.scheme import SCHEME_KEYS, Scheme
+from pip._internal.operations.install import wheel as pip_wheel
+from pip._internal.operations.install.wheel import (PipScriptMaker, ScriptFile, ZipBackedFile,
+                                                    csv_io_kwargs, get_console_script_specs,
+                                                    get_csv_rows_for_installed, get_entrypoints,
+                                                    message_about_scripts_not_on_PATH,
+                                                    req_error_context, wheel_root_is_purelib)
+from pip._internal.req.req_install import InstallRequirement
+from pip._internal.utils.filesystem import adjacent_tmp_file, replace
+from pip._internal.utils.misc import partition
+from pip._internal.utils.unpacking import current_umask, is_within_directory
+from pip._internal.utils.wheel import parse_wheel
+from pip._vendor.packaging.utils import canonicalize_name
+
+logger = logging.getLogger(__name__)
+
+
+def free_threaded() -> bool:
+    """Whether the GIL is disabled in this process."""
+    return not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+
+# Without a GIL compilation scales with cores; with one, only I/O and zlib
+# do.  A single core gains nothing from threads (0.8x measured), so 1 there.
+EXTRACT_JOBS = (os.cpu_count() or 1) if free_threaded() else min(4, os.cpu_count() or 1)
+
+
+# ``catch_warnings`` saves and restores ``warnings.filters`` without locking.
+# Unless the filters are per context, they are process-wide, and overlapping
+# calls from concurrent installs would restore each other's state.
+_WARNINGS_LOCK = threading.Lock()
+
+
+def _warnings_guard():
+    if getattr(sys.flags, "context_aware_warnings", False):
+        return contextlib.nullcontext()
+    return _WARNINGS_LOCK
+
+
+def compile_source(path: str) -> str | None:
+    """Byte-compile ``path`` like ``compileall``; returns the .pyc path or ``None``.
+
+    Warnings from the compiler are silenced for this call only, as pip does.
+    """
+    # pip compiles inside ``captured_stdout()``, which swaps ``sys.stdout``
+    # for the whole process and so cannot run from several threads.
+    with _warnings_guard(), warnings.catch_warnings():
+        warnings.filterwarnings("ignore")
+        try:
+            return py_compile.compile(path, doraise=True)
+        except (py_compile.PyCompileError, OSError, ValueError):
+            logger.debug("Could not byte-compile %s", path)
+            return None
+
+
+def _install_wheel(name: str, wheel_zip: ZipFile, wheel_path: str, scheme: Scheme,
+                   executor: ThreadPoolExecutor | None, pycompile: bool = True,
+                   warn_script_location: bool = True, direct_url: DirectUrl | None = None,
+                   requested: bool = False):
+    # Mirrors pip's ``_install_wheel``; only the two loops differ.  Without
+    # an executor both run serially, as in pip.
+    run = executor.map if executor else map
+    info_dir, metadata = parse_wheel(wheel_zip, name)
+    lib_dir = scheme.purelib if wheel_root_is_purelib(metadata) else scheme.platlib
+    scheme_paths = {key: getattr(scheme, key) for key in SCHEME_KEYS}
+
+    installed: dict[str, str] = {}  # archive RECORD path -> installed RECORD path
+    changed: set[str] = set()
+    generated: list[str] = []
+
+    def record_installed(srcfile: str, destfile: str, modified: bool = False):
+        newpath = pip_wheel._fs_to_record_path(destfile, lib_dir)
+        installed[srcfile] = newpath
+        if modified:
+            changed.add(newpath)
+
+    def checked(dest_dir: str, dest_path: str) -> str:
+        if not is_within_directory(dest_dir, dest_path):
+            raise InstallationError(f"The wheel {wheel_path!r} has a file {dest_path!r} trying to "
+                                    f"install outside the target directory {dest_dir!r}")
+        return dest_path
+
+    def root_file(record_path: str) -> ZipBackedFile:
+        dest_path = checked(lib_dir, os.path.join(lib_dir, os.path.normpath(record_path)))
+        return ZipBackedFile(record_path, dest_path, wheel_zip)
+
+    def data_file(record_path: str) -> ZipBackedFile:
+        try:
+            _, scheme_key, dest_subpath = os.path.normpath(record_path).split(os.path.sep, 2)
+        except ValueError:
+            raise InstallationError(f"Unexpected file in {wheel_path}: {record_path!r}. .data directory "
+                                    f"contents should be named like: '<scheme key>/<path>'.")
+        if scheme_key not in scheme_paths:
+            raise InstallationError(f"Unknown scheme key used in {wheel_path}: {scheme_key} (for file "
+                                    f"{record_path!r}). .data directory contents should be in "
+                                    f"subdirectories named with a valid scheme key "
+                                    f"({', '.join(sorted(scheme_paths))})")
+        scheme_path = scheme_paths[scheme_key]
+        return ZipBackedFile(record_path, checked(scheme_path, os.path.join(scheme_path, dest_subpath)),
+                             wheel_zip)
+
+    def is_data_scheme_path(path: str) -> bool:
+        return path.split("/", 1)[0].endswith(".data")
+
+    def is_script_scheme_path(path: str) -> bool:
+        parts = path.split("/", 2)
+        return len(parts) > 2 and parts[0].endswith(".data") and parts[1] == "scripts"
+
+    file_paths = filterfalse(lambda path: path.endswith("/"), wheel_zip.namelist())
+    root_paths, data_paths = partition(is_data_scheme_path, file_paths)
+    other_paths, script_paths = partition(is_script_scheme_path, data_paths)
+
+    distribution = get_wheel_distribution(FilesystemWheel(wheel_path), canonicalize_name(name))
+    console, gui = get_entrypoints(distribution)
+
+    def is_entrypoint_wrapper(file) -> bool:
+        # EP, EP.exe and EP-script.py are scripts generated for entry point
+        # EP by setuptools.
+        base = os.path.basename(file.dest_path)
+        lower = base.lower()
+        for suffix in (".exe", "-script.py", ".pya"):
+            if lower.endswith(suffix):
+                base = base[:-len(suffix)]
+                break
+        return base in console or base in gui
+
+    files = [root_file(path) for path in root_paths] + [data_file(path) for path in other_paths]
+    files += [ScriptFile(f) for f in map(data_file, script_paths) if not is_entrypoint_wrapper(f)]
+
+    # Members that map to the same path are saved serially by pip, last one
+    # winning; keep only that one so the workers never share a file.
+    by_dest = {file.dest_path: file for file in files}
+    list(run(lambda file: file.save(), by_dest.values()))
+    for file in files:
+        record_installed(file.src_record_path, file.dest_path, file.changed)
+
+    if pycompile:
+        sources = sorted(path for path in (os.path.join(lib_dir, p) for p in set(installed.values()))
+                         if path.endswith(".py") and os.path.isfile(path))
+        # Compilation holds the GIL; threads only add overhead unless it is off.
+        compile_run = run if free_threaded() else map
+        for pyc_path in compile_run(compile_source, sources):
+            if pyc_path:
+                record_installed(pyc_path.replace(os.path.sep, "/"), pyc_path)
+
+    maker = PipScriptMaker(None, scheme.scripts)
+    maker.clobber = True
+    maker.variants = {""}
+    maker.set_mode = True
+    generated_console_scripts = maker.make_multiple(get_console_script_specs(console))
+    generated.extend(generated_console_scripts)
+    generated.extend(maker.make_multiple([f"{k} = {v}" for k, v in gui.items()], {"gui": True}))
+    if warn_script_location:
+        msg = message_about_scripts_not_on_PATH(generated_console_scripts)
+        if msg is not None:
+            logger.warning(msg)
+
+    generated_file_mode = 0o666 & ~current_umask()
+
+    @contextlib.contextmanager
+    def generate_file(path: str, **kwargs):
+        with adjacent_tmp_file(path, **kwargs) as f:
+            yield f
+        os.chmod(f.name, generated_file_mode)
+        replace(f.name, path)
+
+    dest_info_dir = os.path.join(lib_dir, info_dir)
+    installer_path = os.path.join(dest_info_dir, "INSTALLER")
+    with generate_file(installer_path) as fh:
+        fh.write(b"pip\n")
+    generated.append(installer_path)
+    if direct_url is not None:
+        direct_url_path = os.path.join(dest_info_dir, DIRECT_URL_METADATA_NAME)
+        with generate_file(direct_url_path) as fh:
+            fh.write(direct_url.to_json().encode("utf-8"))
+        generated.append(direct_url_path)
+    if requested:
+        requested_path = os.path.join(dest_info_dir, "REQUESTED")
+        open(requested_path, "wb").close()
+        generated.append(requested_path)
+
+    record_rows = list(csv.reader(distribution.read_text("RECORD").splitlines()))
+    rows = get_csv_rows_for_installed(record_rows, installed=installed, changed=changed,
+                                      generated=generated, lib_dir=lib_dir)
+    with generate_file(os.path.join(dest_info_dir, "RECORD"), **csv_io_kwargs("w")) as fh:
+        csv.writer(fh).writerows(pip_wheel._normalized_outrows(rows))
+
+
+def install_wheel(name: str, wheel_path: str, scheme: Scheme, req_description: str,
+                  pycompile: bool = True, warn_script_location: bool = True,
+                  direct_url: DirectUrl | None = None, requested: bool = False,
+                  jobs: int = EXTRACT_JOBS):
+    """Drop-in for pip's ``install_wheel`` that uses ``jobs`` threads; ``jobs=1`` is serial."""
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else contextlib.nullcontext()
+    with ZipFile(wheel_path, allowZip64=True) as z, pool as executor:
+        with req_error_context(req_description):
+            _install_wheel(name, z, wheel_path, scheme, executor, pycompile=pycompile,
+                           warn_script_location=warn_script_location, direct_url=direct_url,
+                           requested=requested)
+
+
+def install_requirement(req: InstallRequirement, root: str | None = None, prefix: str | None = None,
+                        warn_script_location: bool = True, use_user_site: bool = False,
+                        pycompile: bool = True, jobs: int = EXTRACT_JOBS):
+    """``req.install`` for a prepared wheel requirement, through ``install_wheel``.
+
+    Legacy editable installs are handed to pip unchanged.
+    """
+    if req.editable and not req.is_wheel:
+        req.install([], root=root, prefix=prefix, warn_script_location=warn_script_location,
+                    use_user_site=use_user_site, pycompile=pycompile)
+        return
+    scheme = get_scheme(req.name, user=use_user_site, home=None, root=root,
+                        isolated=req.isolated, prefix=prefix)
+    install_wheel(req.name, req.local_file_path, scheme, str(req.req), pycompile=pycompile,
+                  warn_script_location=warn_script_location,
+                  direct_url=req.download_info if req.is_direct else None,
+                  requested=req.user_supplied, jobs=jobs)
+    req.install_succeeded = True
+
+
+def _scheme(root: str) -> Scheme:
+    lib = os.path.join(root, "lib")
+    return Scheme(platlib=lib, purelib=lib, headers=os.path.join(root, "include"),
+                  scripts=os.path.join(root, "bin"), data=root)
+
+
+def benchmark(wheel_paths, jobs: int = EXTRACT_JOBS, repeat: int = 3) -> list[tuple[str, float, float]]:
+    """Best-of-``repeat`` seconds for pip's installer and ``install_wheel``.
+
+    Each run installs into a fresh temporary directory with byte-compilation
+    on; returns ``(wheel filename, pip seconds, parallel seconds)``.
+    """
+    results = []
+    for wheel_path in wheel_paths:
+        name = os.path.basename(wheel_path).split("-")[0]
+        timings = []
+        for install in (pip_wheel.install_wheel, partial(install_wheel, jobs=jobs)):
+            best = float("inf")
+            for _ in range(repeat):
+                root = tempfile.mkdtemp(prefix="wheelbench-")
+                try:
+                    start = time.perf_counter()
+                    install(name, wheel_path, _scheme(root), name, warn_script_location=False)
+                    best = min(best, time.perf_counter() - start)
+                finally:
+                    shutil.rmtree(root, ignore_errors=True)
+            timings.append(best)
+        results.append((os.path.basename(wheel_path), *timings))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare pip's wheel installer with install_wheel.")
+    parser.add_argument("wheels", nargs="+", metavar="WHEEL")
+    parser.add_argument("-j", "--jobs", type=int, default=EXTRACT_JOBS)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"Python {sys.version.split()[0]}, GIL {'disabled' if free_threaded() else 'enabled'}, "
+          f"{args.jobs} threads")
+    for filename, serial, parallel in benchmark(args.wheels, args.jobs, args.repeat):
+        print(f"{filename}: pip {serial:.2f}s, parallel {parallel:.2f}s, {serial / parallel:.1f}x")